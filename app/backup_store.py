@@ -0,0 +1,425 @@
+"""
+备份存储 - 按内容寻址、压缩保存、自动清理的数据文件备份
+版本: 1.0.0
+
+原来每次保存都把整个文件复制一份到 backup/，在技能页面连续点几下
+就会产生几十份内容完全相同的 employee_skills_*.json。现在：
+
+    backup/objects/ab/abcdef....json.gz   备份内容（gzip 压缩，按内容哈希命名，相同内容只存一份）
+    backup/backup_index.json              每个数据文件的备份记录（从旧到新）
+
+- 内容与该文件上一次备份相同时不备份
+- 同一文件在 coalesce_seconds 秒内的连续保存只保留第一次之前的内容
+  （一连串修改之前的状态），不读文件也不计算哈希
+- 每次备份后按保留策略清理：至少保留最近 keep_min 份；超过 keep_max 份
+  或早于 keep_days 天的删除；没有记录引用的内容文件随之删除
+  （从旧格式导入的备份不参与自动清理，只有手动执行 prune 时才按策略清理）
+
+保留策略可在 data/config.json 的 "backup" 中配置，例如：
+
+    "backup": {"coalesce_seconds": 30, "keep_min": 5, "keep_max": 50, "keep_days": 30}
+
+旧格式的备份（backup/ 下的 文件名_日期_时间_v版本.json）在首次使用时自动导入，
+原文件保留在 backup/ 中不删除。
+
+保存时的备份由 BackupWriter 在后台线程中写入：前台只读出即将被覆盖的内容，
+保存操作本身只写一次文件。
+
+查看与恢复：
+
+    python -m app.backup_store list [文件名]
+    python -m app.backup_store restore 文件名 备份ID
+    python -m app.backup_store prune                 # 手动按保留策略清理（含导入的旧备份）
+"""
+__version__ = "1.0.0"
+
+import atexit
+import gzip
+import hashlib
+import json
+import queue
+import re
+import sys
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app.file_lock import lock_for
+from app.storage import JsonStorage, write_atomic
+
+INDEX_FILE = "backup_index.json"
+OBJECTS_DIR = "objects"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+DEFAULT_POLICY = {
+    "coalesce_seconds": 30,  # 连续保存合并的时间窗口（秒），0 表示不合并
+    "keep_min": 5,           # 每个文件至少保留的份数
+    "keep_max": 50,          # 每个文件最多保留的份数
+    "keep_days": 30,         # 超过 keep_min 份时，早于这个天数的删除
+}
+
+# 旧格式备份文件名：文件名_YYYYMMDD_HHMMSS[_v版本].扩展名
+_LEGACY_NAME = re.compile(r"^(.+)_(\d{8})_(\d{6})(?:_v([\w.]+?))?(\.\w+)$")
+
+
+def content_hash(content: bytes) -> str:
+    """备份内容的哈希"""
+    return hashlib.sha256(content).hexdigest()[:32]
+
+
+class BackupStore:
+    """一个备份目录中的备份（多进程共用时以 backup_index.json 为准）"""
+
+    def __init__(self, backup_dir: Path, policy: dict = None):
+        self.backup_dir = Path(backup_dir)
+        self.policy = {**DEFAULT_POLICY, **(policy or {})}
+        self._index_storage = JsonStorage(self.backup_dir)
+        self._lock = lock_for(self.backup_dir / ".locks" / "backup_index.lock")
+        self._index = None
+        self._index_stamp = None
+
+    # ---------- 索引 ----------
+
+    def _load_index(self) -> dict:
+        """读取索引（文件没变时用内存中的副本）；首次使用时导入旧格式备份"""
+        stamp = self._index_storage.stamp(INDEX_FILE)
+        if self._index is None or stamp != self._index_stamp:
+            index = self._index_storage.read(INDEX_FILE)
+            if index is None:
+                index = {"version": 1, "files": {}}
+                self._import_legacy(index)
+                self._save_index(index)
+            self._index = index
+            self._index_stamp = self._index_storage.stamp(INDEX_FILE)
+        return self._index
+
+    def _save_index(self, index: dict):
+        self._index_storage.write(INDEX_FILE, index)
+        self._index = index
+        self._index_stamp = self._index_storage.stamp(INDEX_FILE)
+
+    def _object_path(self, digest: str) -> Path:
+        return self.backup_dir / OBJECTS_DIR / digest[:2] / f"{digest}.json.gz"
+
+    # ---------- 写入 ----------
+
+    def _add(self, index: dict, filename: str, content: bytes, when: datetime,
+             version: str = None, legacy: bool = False):
+        """登记一份备份；与该文件上一份内容相同时返回 None"""
+        entries = index["files"].setdefault(filename, [])
+        digest = content_hash(content)
+        if entries and entries[-1]["hash"] == digest:
+            return None
+
+        path = self._object_path(digest)
+        if not path.exists():
+            write_atomic(path, gzip.compress(content, compresslevel=6))
+
+        entry = {
+            "id": f"{when.strftime('%Y%m%d_%H%M%S')}_{digest[:8]}",
+            "time": when.strftime(TIME_FORMAT),
+            "hash": digest,
+            "size": len(content),
+        }
+        if version:
+            entry["version"] = version
+        if legacy:
+            entry["legacy"] = True
+        entries.append(entry)
+        return entry
+
+    def is_coalesced(self, filename: str, now: datetime) -> bool:
+        """该文件的上一份备份是否在合并时间窗口内（是则本次不需要备份）"""
+        window = self.policy["coalesce_seconds"]
+        if window <= 0:
+            return False
+        with self._lock:
+            entries = self._load_index()["files"].get(filename)
+        if not entries:
+            return False
+        last = datetime.strptime(entries[-1]["time"], TIME_FORMAT)
+        return now - last < timedelta(seconds=window)
+
+    def last_backup_times(self) -> dict:
+        """每个文件最近一份备份的时间 {文件名: datetime}"""
+        with self._lock:
+            files = self._load_index()["files"]
+        return {filename: datetime.strptime(entries[-1]["time"], TIME_FORMAT)
+                for filename, entries in files.items() if entries}
+
+    def add_backup(self, filename: str, content: bytes, version: str = None, when: datetime = None):
+        """保存一份备份内容并执行保留策略；返回新增的备份记录，内容未变时返回 None"""
+        when = when or datetime.now()
+        with self._lock:
+            index = self._load_index()
+            entry = self._add(index, filename, content, when, version)
+            if entry is None:
+                return None
+            self._apply_policy(index, [filename], when)
+            self._save_index(index)
+        print(f"[备份] 已备份文件: {filename}（{entry['id']}）")
+        return entry
+
+    def backup(self, filename: str, read_content, version: str = None, force: bool = False):
+        """
+        同步备份一个数据文件
+
+        read_content() 返回文件当前内容（bytes），只在确实需要备份时调用；
+        force=True 时不合并连续保存（如恢复前的备份）。
+        返回新增的备份记录，跳过时返回 None
+        """
+        now = datetime.now()
+        if not force and self.is_coalesced(filename, now):
+            return None
+        content = read_content()
+        if content is None:
+            return None
+        return self.add_backup(filename, content, version, now)
+
+    # ---------- 保留策略 ----------
+
+    def _apply_policy(self, index: dict, filenames: list, now: datetime,
+                      include_legacy: bool = False) -> int:
+        """
+        按保留策略清理 filenames 的旧备份，返回删除的备份数
+
+        自动清理（include_legacy=False）时从旧格式导入的备份一律保留、也不计入份数，
+        只有手动 prune 才清理它们
+        """
+        keep_min = self.policy["keep_min"]
+        keep_max = self.policy["keep_max"]
+        oldest = now - timedelta(days=self.policy["keep_days"])
+
+        removed = []
+        for filename in filenames:
+            entries = index["files"].get(filename, [])
+            kept = []
+            rank = 0
+            # 从新到旧：前 keep_min 份一定保留，之后超过份数或过期的删除
+            for entry in reversed(entries):
+                if entry.get("legacy") and not include_legacy:
+                    kept.append(entry)
+                    continue
+                rank += 1
+                if rank <= keep_min or (
+                        rank <= keep_max and datetime.strptime(entry["time"], TIME_FORMAT) >= oldest):
+                    kept.append(entry)
+                else:
+                    removed.append(entry)
+            index["files"][filename] = kept[::-1]
+
+        if removed:
+            used = {e["hash"] for entries in index["files"].values() for e in entries}
+            for digest in {e["hash"] for e in removed} - used:
+                self._object_path(digest).unlink(missing_ok=True)
+        return len(removed)
+
+    def prune(self) -> int:
+        """手动对所有文件执行一次保留策略（包括从旧格式导入的备份），返回删除的备份数"""
+        with self._lock:
+            index = self._load_index()
+            removed = self._apply_policy(index, list(index["files"]), datetime.now(), include_legacy=True)
+            if removed:
+                self._save_index(index)
+                print(f"[备份] 按保留策略清理旧备份 {removed} 份")
+        return removed
+
+    # ---------- 查询与读取 ----------
+
+    def list_backups(self, filename: str = None) -> list:
+        """
+        列出备份（从新到旧）
+
+        返回: [{"filename", "id", "time", "hash", "size", "version"}, ...]
+        """
+        with self._lock:
+            files = self._load_index()["files"]
+        names = [filename] if filename else sorted(files)
+        backups = [{"filename": name, **entry} for name in names for entry in files.get(name, [])]
+        backups.sort(key=lambda b: b["time"], reverse=True)
+        return backups
+
+    def read_backup(self, filename: str, backup_id: str) -> bytes:
+        """读取一份备份的内容，备份不存在时抛出 KeyError"""
+        for entry in self.list_backups(filename):
+            if entry["id"] == backup_id:
+                with open(self._object_path(entry["hash"]), 'rb') as f:
+                    return gzip.decompress(f.read())
+        raise KeyError(f"备份不存在: {filename} {backup_id}")
+
+    # ---------- 旧格式导入 ----------
+
+    def _import_legacy(self, index: dict) -> int:
+        """
+        导入 backup/ 下旧格式的整文件备份
+
+        导入时不执行保留策略，原文件也保留不动；只有手动 prune 才会清理导入的备份
+        """
+        legacy = []
+        for path in self.backup_dir.glob("*.json"):
+            match = _LEGACY_NAME.match(path.name)
+            if match and path.name != INDEX_FILE:
+                stem, day, clock, version, suffix = match.groups()
+                when = datetime.strptime(day + clock, "%Y%m%d%H%M%S")
+                legacy.append((when, path.name, stem + suffix, version, path))
+        if not legacy:
+            return 0
+
+        print(f"[迁移] 正在导入旧格式备份，共 {len(legacy)} 份...")
+        for when, _, filename, version, path in sorted(legacy):
+            self._add(index, filename, path.read_bytes(), when, version, legacy=True)
+
+        count = sum(len(entries) for entries in index["files"].values())
+        print(f"[迁移] 旧格式备份导入完成，去重后 {count} 份（原文件保留在 {self.backup_dir}）")
+        return len(legacy)
+
+
+class BackupWriter:
+    """
+    后台备份线程：保存时只在前台取出被覆盖的内容，压缩、写入、清理都在后台完成
+
+    队列有上限（max_pending），队列满时在前台同步写入，不丢备份；
+    进程退出时自动 close()，把队列中的备份写完
+    """
+
+    def __init__(self, max_pending: int = 64):
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._recent = {}  # (备份目录, 文件名) → 最近一次提交的时间，用于合并连续保存
+        self._seeded = set()  # 已从索引读入最近备份时间的备份目录
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="backup-writer", daemon=True)
+        self._closed = False
+        self.written = 0
+        self.skipped = 0
+        self.overflows = 0
+        self.failures = 0
+        self.last_error = None
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, store: BackupStore, filename: str, read_content,
+               version: str = None, force: bool = False) -> bool:
+        """
+        提交一个文件的备份，返回是否需要备份（合并窗口内或文件不存在时为 False）
+
+        read_content() 在前台调用，取出即将被覆盖的内容。
+        是否在合并窗口内只看内存中的记录（每个备份目录首次提交时从索引读入一次），
+        前台不等待后台写备份时持有的索引锁
+        """
+        now = datetime.now()
+        key = (str(store.backup_dir), filename)
+        if not force:
+            self._seed(store)
+            window = timedelta(seconds=store.policy["coalesce_seconds"])
+            recent = self._recent.get(key)
+            if recent and now - recent < window:
+                with self._lock:
+                    self.skipped += 1
+                return False
+
+        content = read_content()
+        if content is None:
+            return False
+        self._recent[key] = now
+
+        job = (store, filename, content, version, now)
+        if self._closed or not self._thread.is_alive():
+            self._write(job)
+            return True
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self.overflows += 1
+            self._write(job)
+        return True
+
+    def _seed(self, store: BackupStore):
+        """从索引读入该备份目录中各文件最近一份备份的时间（每个目录一次）"""
+        backup_dir = str(store.backup_dir)
+        if backup_dir in self._seeded:
+            return
+        times = store.last_backup_times()
+        with self._lock:
+            for filename, when in times.items():
+                key = (backup_dir, filename)
+                if key not in self._recent or self._recent[key] < when:
+                    self._recent[key] = when
+            self._seeded.add(backup_dir)
+
+    def _write(self, job: tuple):
+        store, filename, content, version, when = job
+        try:
+            store.add_backup(filename, content, version, when)
+            with self._lock:
+                self.written += 1
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+                self.last_error = f"{filename}: {e}"
+            print(f"[错误] 备份失败: {filename} - {e}")
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._write(job)
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """等待队列中的备份全部写完"""
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        """写完队列中的备份并停止后台线程"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def stats(self) -> dict:
+        """后台备份的运行状态：积压数量、已写入、合并跳过、队列满时同步写入、失败次数"""
+        with self._lock:
+            return {
+                "alive": self._thread.is_alive(),
+                "pending": self._queue.qsize(),
+                "written": self.written,
+                "skipped": self.skipped,
+                "overflows": self.overflows,
+                "failures": self.failures,
+                "last_error": self.last_error,
+            }
+
+
+def load_policy(data_dir: Path) -> dict:
+    """读取 data/config.json 中的保留策略（未配置的项用默认值）"""
+    try:
+        with open(Path(data_dir) / "config.json", 'r', encoding='utf-8') as f:
+            policy = json.load(f).get("backup") or {}
+    except Exception:
+        policy = {}
+    return {**DEFAULT_POLICY, **{k: v for k, v in policy.items() if k in DEFAULT_POLICY}}
+
+
+if __name__ == "__main__":
+    from app import data_manager
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "list":
+        backups = data_manager.list_backups(sys.argv[2] if len(sys.argv) >= 3 else None)
+        for b in backups:
+            print(f"{b['time'][:19]}  {b['filename']:<32} {b['id']}  {b['size']:>10,} 字节")
+        print(f"共 {len(backups)} 份备份")
+    elif len(sys.argv) == 4 and sys.argv[1] == "restore":
+        data_manager.restore_backup(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) == 2 and sys.argv[1] == "prune":
+        print(f"共清理 {data_manager.prune_backups()} 份备份")
+    else:
+        print("用法: python -m app.backup_store list [文件名]\n"
+              "      python -m app.backup_store restore 文件名 备份ID\n"
+              "      python -m app.backup_store prune")
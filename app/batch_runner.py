@@ -0,0 +1,246 @@
+"""
+命令行批量计算 - 不打开界面按期间、方案计算工资，保存结果并导出 Excel
+版本: 1.0.0
+
+用法:
+    python -m app.batch_runner 2025-12                         # 用当前配置计算一个期间
+    python -m app.batch_runner 2025-01:2025-12 --scheme scheme_002
+    python -m app.batch_runner all --scheme all --export out/  # 所有期间 × 所有方案
+    python -m app.batch_runner 2025-12 --shard-by employee --workers 8
+
+- 期间可以是单个期间、逗号分隔的多个期间、"起:止" 区间（含两端）或 all
+- --scheme 可重复指定或用 all；指定方案时用方案快照在内存中计算，不改动当前配置。
+  保存名称默认为 "期间"（当前配置）或 "期间-方案名"，可用 --name 指定格式
+- 已锁定的保存名称会跳过，与界面上的锁定规则一致
+- 并行方式：
+    --shard-by period    每个 期间×方案 一个任务，分给多个进程（默认）
+    --shard-by employee  每个任务的员工分成几段分给多个进程计算基础工资，
+                         合并后在主进程计算排名奖金（适合单个期间人数很多的情况）
+  两种方式的结果都与界面上的计算完全一致；结果统一在主进程保存
+"""
+__version__ = "1.0.0"
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app import data_manager
+from app.excel_export import frame_rows, write_xlsx
+from app.scheme_store import has_snapshot
+from app.calculation import (
+    calculate_base, calculate_with_inputs, export_rows, finish_results,
+    get_period_records, get_scheme_snapshot, list_periods, load_inputs, save_results
+)
+
+
+def parse_periods(spec: str, available: list) -> list:
+    """解析期间参数，返回按时间顺序排列的期间列表"""
+    if spec == "all":
+        return sorted(available)
+    periods = []
+    for part in spec.split(","):
+        part = part.strip()
+        if ":" in part:
+            start, end = part.split(":", 1)
+            periods.extend(p for p in sorted(available) if start <= p <= end)
+        elif part:
+            periods.append(part)
+    return list(dict.fromkeys(periods))
+
+
+def parse_schemes(values: list) -> list:
+    """解析方案参数，返回方案列表（None 表示当前配置）"""
+    if not values:
+        return [None]
+    if "all" in values:
+        return [s for s in data_manager.get_schemes() if has_snapshot(s)]
+    schemes = []
+    for scheme_id in values:
+        scheme = data_manager.get_scheme_by_id(scheme_id)
+        if not scheme:
+            raise ValueError(f"方案不存在: {scheme_id}")
+        schemes.append(scheme)
+    return schemes
+
+
+def export_excel(results: list, regions: list, save_name: str, export_dir: Path) -> Path:
+    """导出与计算页面下载按钮相同格式的 Excel"""
+    import pandas as pd
+
+    export_dir.mkdir(parents=True, exist_ok=True)
+    path = export_dir / f"绩效工资_{save_name}.xlsx"
+    header, rows = frame_rows(pd.DataFrame(export_rows(results, regions)))
+    write_xlsx(path, [(f'{save_name}绩效工资', header, rows)])
+    return path
+
+
+# ---------- 子进程 ----------
+
+def _init_worker(data_dir: str, backup_dir: str):
+    """子进程使用与主进程相同的数据目录"""
+    data_manager.DATA_DIR = Path(data_dir)
+    data_manager.BACKUP_DIR = Path(backup_dir)
+    data_manager._storage = None
+    data_manager.clear_cache()
+
+
+def _run_job(job: dict) -> dict:
+    """计算一个 期间×方案（在子进程或主进程中执行）"""
+    start = time.perf_counter()
+    snapshot = get_scheme_snapshot(job["scheme_id"]) if job["scheme_id"] else None
+    inputs = load_inputs(job["period"], snapshot)
+    records = get_period_records(job["period"])
+    results = calculate_with_inputs(records, job["save_name"], inputs)
+
+    exported = None
+    if job["export_dir"]:
+        exported = export_excel(results, inputs["regions"], job["save_name"], Path(job["export_dir"]))
+    return {**job, "results": results, "exported": exported,
+            "seconds": time.perf_counter() - start}
+
+
+def _run_shard(args: tuple) -> list:
+    """计算一段员工的基础工资"""
+    records, save_name, inputs = args
+    return calculate_base(records, save_name, inputs)
+
+
+def _run_job_sharded(job: dict, pool, shards: int) -> dict:
+    """把一个任务的员工分段，交给进程池计算基础工资，在主进程合并并计算排名奖金"""
+    start = time.perf_counter()
+    snapshot = get_scheme_snapshot(job["scheme_id"]) if job["scheme_id"] else None
+    inputs = load_inputs(job["period"], snapshot)
+    records = get_period_records(job["period"])
+
+    size = max(1, -(-len(records) // shards))
+    chunks = []
+    for i in range(0, len(records), size):
+        part = records[i:i + size]
+        # 每段只带本段员工的技能指派，减少进程间传输的数据
+        emp_ids = {r["employee_id"] for r in part}
+        part_inputs = {**inputs, "emp_skills": [es for es in inputs["emp_skills"]
+                                                if es["employee_id"] in emp_ids]}
+        chunks.append((part, job["save_name"], part_inputs))
+
+    results = []
+    for part_results in pool.map(_run_shard, chunks):
+        results.extend(part_results)
+    results = finish_results(results, inputs)
+
+    exported = None
+    if job["export_dir"]:
+        exported = export_excel(results, inputs["regions"], job["save_name"], Path(job["export_dir"]))
+    return {**job, "results": results, "exported": exported,
+            "seconds": time.perf_counter() - start}
+
+
+# ---------- 入口 ----------
+
+def build_jobs(periods: list, schemes: list, name_format: str, export_dir: str) -> list:
+    jobs = []
+    for scheme in schemes:
+        for period in periods:
+            scheme_name = scheme["name"] if scheme else ""
+            fmt = name_format or ("{period}-{scheme}" if scheme else "{period}")
+            jobs.append({
+                "period": period,
+                "scheme_id": scheme["id"] if scheme else None,
+                "scheme_name": scheme_name,
+                "save_name": fmt.format(period=period, scheme=scheme_name),
+                "export_dir": export_dir,
+            })
+    return jobs
+
+
+def run_jobs(jobs: list, workers: int = 1, shard_by: str = "period", save: bool = True):
+    """执行所有任务并（按任务顺序）保存结果，返回 (完成的任务, 出错的任务)"""
+    done, failed = [], []
+
+    def finish(job_result):
+        if save:
+            save_results(job_result["results"], job_result["save_name"])
+        total = sum(r["total_salary"] for r in job_result["results"])
+        note = f"，已导出 {job_result['exported']}" if job_result["exported"] else ""
+        print(f"[批处理] {job_result['save_name']}: {len(job_result['results'])} 人，"
+              f"总额 {total:,.2f}，用时 {job_result['seconds']:.2f}s{note}")
+        done.append(job_result)
+
+    def fail(job, error):
+        print(f"[错误] {job['save_name']} 计算失败: {error}")
+        failed.append({**job, "error": str(error)})
+
+    if workers <= 1:
+        for job in jobs:
+            try:
+                finish(_run_job(job))
+            except Exception as e:
+                fail(job, e)
+        return done, failed
+
+    initargs = (str(data_manager.DATA_DIR), str(data_manager.BACKUP_DIR))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        if shard_by == "employee":
+            for job in jobs:
+                try:
+                    finish(_run_job_sharded(job, pool, workers))
+                except Exception as e:
+                    fail(job, e)
+        else:
+            futures = [pool.submit(_run_job, job) for job in jobs]
+            for job, future in zip(jobs, futures):
+                try:
+                    finish(future.result())
+                except Exception as e:
+                    fail(job, e)
+    return done, failed
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="命令行批量计算绩效工资")
+    parser.add_argument("periods", help="期间：2025-12 / 2025-01,2025-02 / 2025-01:2025-12 / all")
+    parser.add_argument("--scheme", action="append", default=[],
+                        help="方案ID，可重复指定，all 表示所有方案；不指定时用当前配置")
+    parser.add_argument("--name", default="",
+                        help="保存名称格式，可用 {period} 和 {scheme}（方案名）")
+    parser.add_argument("--export", default="", help="导出 Excel 的目录")
+    parser.add_argument("--no-save", action="store_true", help="不保存到计算历史")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="并行进程数")
+    parser.add_argument("--shard-by", choices=["period", "employee"], default="period",
+                        help="按 期间×方案 或按员工分段并行")
+    args = parser.parse_args(argv)
+
+    try:
+        periods = parse_periods(args.periods, list_periods())
+        schemes = parse_schemes(args.scheme)
+    except ValueError as e:
+        print(f"[错误] {e}")
+        return 1
+
+    if not periods:
+        print("[错误] 没有可计算的期间，请先导入绩效")
+        return 1
+
+    jobs = []
+    for job in build_jobs(periods, schemes, args.name, args.export):
+        if not get_period_records(job["period"]):
+            print(f"[跳过] {job['period']} 没有绩效记录")
+        elif not args.no_save and data_manager.is_calculation_locked(job["save_name"]):
+            print(f"[跳过] 「{job['save_name']}」已锁定")
+        else:
+            jobs.append(job)
+
+    start = time.perf_counter()
+    workers = min(args.workers, len(jobs)) if args.shard_by == "period" else args.workers
+    done, failed = run_jobs(jobs, workers, args.shard_by, save=not args.no_save)
+    print(f"[批处理] 完成 {len(done)} 个，失败 {len(failed)} 个，"
+          f"总用时 {time.perf_counter() - start:.2f}s（{max(workers, 1)} 个进程）")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,453 @@
+"""
+绩效计算核心 - 不依赖任何界面库的计算入口
+版本: 1.0.0
+
+逐人计算、整期计算（批量引擎 / 增量计算）、排名奖金、保存结果都在这里，
+只依赖 data_manager 和 app.engine，不导入 streamlit、pandas。
+绩效计算页面、命令行批处理、基准测试、定时任务都调用这里的函数。
+
+NumPy 只在真正执行批量计算时才导入，导入本模块本身只需几毫秒。
+"""
+__version__ = "1.0.0"
+
+from datetime import datetime
+
+from app.data_manager import (
+    get_employees, get_regions, get_skills, get_employee_skills,
+    get_roles, get_role_by_id, get_external_data, get_bonus_pools,
+    load_json, get_scheme_snapshot as _load_scheme_snapshot
+)
+from app.engine.ladder import compile_ladder, compile_region_ladders
+from app.engine.profiles import ProfileTable
+from app.engine.ranking import calculate_ranking_bonus as rank_all_pools
+
+
+def calculate_ladder_bonus(score: float, ladder_rules: list) -> float:
+    """
+    计算阶梯奖金
+    按区间累计计算，在区间内按比例
+    （规则按内容编译缓存，查分为二分查找 + 一次插值）
+    """
+    if not ladder_rules:
+        return 0
+
+    return compile_ladder(ladder_rules).bonus(score)
+
+
+def get_employee_role_info(emp_id: str, employees: list) -> dict:
+    """获取员工的角色信息"""
+    emp = next((e for e in employees if e["id"] == emp_id), None)
+    if not emp:
+        return None
+
+    role_id = emp.get("role_id")
+    if not role_id:
+        return None
+
+    return get_role_by_id(role_id)
+
+
+def calculate_employee_threshold(emp_id: str, region_id: str, base_threshold: float, employees: list) -> float:
+    """
+    计算员工在指定区域的个性化达标线
+    优先级：员工自定义 > 角色倍率 > 区域默认值
+    """
+    emp = next((e for e in employees if e["id"] == emp_id), None)
+    if not emp:
+        return base_threshold
+
+    # 检查员工是否有自定义达标线
+    custom_settings = emp.get("custom_settings", {})
+    if custom_settings.get("custom_threshold"):
+        custom = custom_settings.get("thresholds", {}).get(region_id)
+        if custom is not None:
+            return custom
+
+    # 检查角色倍率
+    role_id = emp.get("role_id")
+    if role_id:
+        role = get_role_by_id(role_id)
+        if role:
+            multiplier = role.get("threshold_multiplier", 1.0)
+            return base_threshold * multiplier
+
+    return base_threshold
+
+
+def calculate_employee_salary(emp_id: str, emp_name: str, scores: dict, mid_detail: dict,
+                               regions: list, skills: list, emp_skills: list,
+                               employees: list = None, external_data: dict = None,
+                               profile=None) -> dict:
+    """
+    计算单个员工的绩效工资（支持角色达标线和多元收入）
+
+    profile 为本次计算的 ProfileTable 中该员工的档案；整期计算时由调用方
+    建一次表传入，单独调用时不传，在这里为该员工解析角色和达标线
+
+    返回:
+    {
+        "employee_id": ...,
+        "employee_name": ...,
+        "role_name": ...,  # 新增：角色名称
+        "regions": {
+            "region_001": {
+                "score": 绩效分,
+                "threshold": 个性化达标线,  # 新增
+                "is_on_duty": 是否在岗,
+                "skill_salary": 技能工资,
+                "skill_details": [{"name": ..., "on_duty": ..., "salary": ...}],
+                "ladder_bonus": 阶梯奖金,
+                "total": 小计
+            },
+            ...
+        },
+        "mid_detail": {"drawing": ..., "digital": ...},
+        "extra_income": {...},  # 新增：额外收入明细
+        "total_salary": 总工资
+    }
+    """
+    if profile is None:
+        profile = ProfileTable(employees or get_employees(), get_roles(), regions).get(emp_id)
+
+    # 角色信息
+    role_name = profile.role_name
+    income_types = profile.income_types
+    role_settings = profile.settings
+
+    result = {
+        "employee_id": emp_id,
+        "employee_name": emp_name,
+        "role_name": role_name,
+        "regions": {},
+        "mid_detail": mid_detail or {"drawing": 0, "digital": 0},
+        "extra_income": {},
+        "total_salary": 0
+    }
+
+    # 获取该员工的技能关联（同一技能有多条时取第一条）
+    my_skills = {}
+    for es in emp_skills:
+        if es["employee_id"] == emp_id:
+            my_skills.setdefault(es["skill_id"], es)
+
+    # 各区域的技能（保持技能列表中的顺序）
+    skills_by_region = {}
+    if "skill_salary" in income_types:
+        for skill in skills:
+            skills_by_region.setdefault(skill.get("region_id"), []).append(skill)
+
+    # 按区域计算
+    for i, region in enumerate(regions):
+        region_id = region["id"]
+        score = scores.get(region_id, 0)
+        ladder_rules = region.get("ladder_rules", [])
+
+        # 个性化达标线（查档案）
+        threshold = profile.thresholds[i]
+
+        # 判断是否在岗
+        is_on_duty = score >= threshold
+
+        # 计算技能工资（记录明细）
+        skill_salary = 0
+        skill_details = []
+
+        if "skill_salary" in income_types:
+            for skill in skills_by_region.get(region_id, []):
+                es = my_skills.get(skill["id"])
+                if es and es.get("passed_exam", False):
+                    if is_on_duty:
+                        if es.get("use_system_price", True):
+                            salary = skill.get("salary_on_duty", 200)
+                        else:
+                            salary = es.get("custom_price_on_duty") or skill.get("salary_on_duty", 200)
+                    else:
+                        salary = skill.get("salary_off_duty", 100)
+
+                    skill_salary += salary
+                    skill_details.append({
+                        "name": skill["name"],
+                        "on_duty": is_on_duty,
+                        "salary": salary
+                    })
+
+        # 计算阶梯奖金
+        ladder_bonus = 0
+        if "ladder_bonus" in income_types:
+            ladder_bonus = calculate_ladder_bonus(score, ladder_rules)
+
+        # 区域小计
+        region_total = skill_salary + ladder_bonus
+
+        result["regions"][region_id] = {
+            "name": region["name"],
+            "score": score,
+            "threshold": threshold,
+            "is_on_duty": is_on_duty,
+            "skill_salary": skill_salary,
+            "skill_details": skill_details,
+            "ladder_bonus": ladder_bonus,
+            "total": region_total
+        }
+
+        result["total_salary"] += region_total
+
+    # 计算额外收入（基于角色配置）
+    extra_income = {}
+
+    # 开单奖励
+    if "order_bonus" in income_types and external_data:
+        order_count = external_data.get("order_count", 0)
+        bonus_per_unit = role_settings.get("order_bonus_per_unit", 2)
+        order_bonus = order_count * bonus_per_unit
+        extra_income["order_bonus"] = {
+            "name": "开单奖励",
+            "count": order_count,
+            "unit_price": bonus_per_unit,
+            "amount": order_bonus
+        }
+        result["total_salary"] += order_bonus
+
+    # 管理津贴
+    if "management_allowance" in income_types:
+        allowance = role_settings.get("management_allowance", 0)
+        if allowance > 0:
+            extra_income["management_allowance"] = {
+                "name": "管理津贴",
+                "amount": allowance
+            }
+            result["total_salary"] += allowance
+
+    # 业绩提成
+    if "revenue_commission" in income_types and external_data:
+        revenue = external_data.get("store_revenue", 0)
+        rate = role_settings.get("commission_rate", 0.01)
+        commission = revenue * rate
+        extra_income["revenue_commission"] = {
+            "name": "业绩提成",
+            "revenue": revenue,
+            "rate": rate,
+            "amount": commission
+        }
+        result["total_salary"] += commission
+
+    result["extra_income"] = extra_income
+    result["total_salary"] = round(result["total_salary"], 2)
+    return result
+
+
+
+def record_period(record: dict) -> str:
+    """绩效记录所属期间（兼容旧数据的 month 字段）"""
+    return record.get("period") or record.get("month")
+
+
+def list_periods(records: list = None) -> list:
+    """有绩效记录的期间，按时间倒序"""
+    if records is None:
+        records = load_json("performance.json").get("records", [])
+    return sorted({p for p in map(record_period, records) if p}, reverse=True)
+
+
+def get_period_records(period: str, records: list = None) -> list:
+    """某期间的绩效记录（兼容 period 和 month 字段）"""
+    if records is None:
+        records = load_json("performance.json").get("records", [])
+    return [r for r in records if r.get("period") == period or r.get("month") == period]
+
+
+def calculate_ranking_bonus(results: list, employees: list) -> list:
+    """
+    计算排名奖金
+    根据奖金池配置，按排名分配奖金
+    """
+    return rank_all_pools(results, employees, get_bonus_pools())
+
+
+def get_scheme_snapshot(scheme_id: str) -> dict:
+    """方案的配置快照（skills / regions / employee_skills），方案不存在或无快照时报错"""
+    snapshot = _load_scheme_snapshot(scheme_id)
+    if snapshot is None:
+        raise ValueError(f"方案不存在或无快照: {scheme_id}")
+    return snapshot
+
+
+def load_inputs(period: str, snapshot: dict = None) -> dict:
+    """
+    读取一次计算需要的全部数据
+
+    snapshot 为方案快照，传入时用快照中的技能、区域、技能指派代替当前配置
+    （只在内存中替换，不读写当前配置文件）；员工、角色、奖金池、外部数据总是取当前数据
+    """
+    external_data_map = {}
+    for ext in get_external_data(period):
+        external_data_map[ext.get("employee_id")] = ext
+
+    inputs = {
+        "regions": get_regions(),
+        "skills": get_skills(),
+        "emp_skills": get_employee_skills(),
+        "employees": get_employees(),
+        "roles": get_roles(),
+        "bonus_pools": get_bonus_pools(),
+        "external_data_map": external_data_map,
+    }
+    return apply_snapshot(inputs, snapshot) if snapshot else inputs
+
+
+def apply_snapshot(inputs: dict, snapshot: dict) -> dict:
+    """用方案快照替换计算数据中的技能、区域、技能指派（返回新的字典，快照中没有的部分不变）"""
+    inputs = dict(inputs)
+    if "regions" in snapshot:
+        inputs["regions"] = snapshot["regions"]
+    if "skills" in snapshot:
+        inputs["skills"] = snapshot["skills"]
+    if "employee_skills" in snapshot:
+        inputs["emp_skills"] = snapshot["employee_skills"]
+    return inputs
+
+
+def do_calculate(period_records: list, period: str, batch: bool = True,
+                 calculator=None) -> list:
+    """执行计算（支持角色达标线和多元收入）
+
+    Args:
+        period_records: 该期间的绩效记录
+        period: 期间/保存名称
+        batch: 是否使用批量矩阵引擎（结果与逐人计算一致，人数多时快得多）
+        calculator: 增量计算器，传入时只重算上次计算后受配置修改影响的员工和奖金池
+    """
+    return calculate_with_inputs(period_records, period, load_inputs(period),
+                                 batch=batch, calculator=calculator)
+
+
+def calculate_with_inputs(period_records: list, period: str, inputs: dict,
+                          batch: bool = True, calculator=None) -> list:
+    """用 load_inputs 读好的数据计算一个期间（含排名奖金），参数同 do_calculate"""
+    regions = inputs["regions"]
+    skills = inputs["skills"]
+    emp_skills = inputs["emp_skills"]
+    employees = inputs["employees"]
+    external_data_map = inputs["external_data_map"]
+
+    # 每次计算先编译一次所有区域的阶梯规则（规则有误时在这里报错）
+    ladders = compile_region_ladders(regions)
+    # 员工的角色、达标线只解析一次，之后按员工ID直接查表
+    profiles = ProfileTable(employees, inputs["roles"], regions)
+
+    if calculator is not None:
+        return calculator.calculate(
+            period, period_records, regions, skills, emp_skills,
+            employees, inputs["roles"], inputs["bonus_pools"], external_data_map,
+            ladders=ladders
+        )
+
+    if batch:
+        results = calculate_base(period_records, period, inputs, ladders=ladders, profiles=profiles)
+        return finish_results(results, inputs, profiles)
+
+    emp_skills_by_emp = {}
+    for es in emp_skills:
+        emp_skills_by_emp.setdefault(es["employee_id"], []).append(es)
+
+    results = []
+
+    for record in period_records:
+        emp_id = record["employee_id"]
+        emp_name = record["employee_name"]
+        scores = record.get("scores", {})
+        mid_detail = record.get("mid_detail", {"drawing": 0, "digital": 0})
+
+        # 获取该员工的外部数据
+        ext_data = external_data_map.get(emp_id)
+
+        result = calculate_employee_salary(
+            emp_id, emp_name, scores, mid_detail,
+            regions, skills, emp_skills_by_emp.get(emp_id, []),
+            employees=employees,
+            external_data=ext_data,
+            profile=profiles.get(emp_id)
+        )
+        result["period"] = period
+        results.append(result)
+
+    return finish_results(results, inputs, profiles)
+
+
+def calculate_base(period_records: list, period: str, inputs: dict, ladders: dict = None,
+                   profiles: ProfileTable = None) -> list:
+    """
+    用批量引擎计算基础工资（不含排名奖金，顺序同绩效记录）
+
+    每个员工独立计算，可以把绩效记录分成几段分别计算后按原顺序拼接，
+    再调用 finish_results，结果与整期计算相同
+    """
+    from app.engine.batch import calculate_batch
+
+    results = calculate_batch(
+        period_records, inputs["regions"], inputs["skills"], inputs["emp_skills"],
+        inputs["employees"], inputs["roles"], inputs["external_data_map"],
+        ladders=ladders, profiles=profiles
+    )
+    for result in results:
+        result["period"] = period
+    return results
+
+
+def finish_results(results: list, inputs: dict, profiles: ProfileTable = None) -> list:
+    """计算排名奖金并按总工资排序（profiles 传入时直接用其中的员工索引）"""
+    # 计算排名奖金（在基础工资计算完成后）
+    emp_map = profiles.employees if profiles is not None else None
+    results = rank_all_pools(results, inputs["employees"], inputs["bonus_pools"], emp_map=emp_map)
+
+    # 按总工资排序
+    results.sort(key=lambda x: x["total_salary"], reverse=True)
+
+    return results
+
+
+def save_results(results: list, period: str):
+    """保存计算结果（只写该期间的分片文件和历史清单）"""
+    from app.history_store import save_calculation
+
+    save_calculation({
+        "period": period,
+        "calculated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "employee_count": len(results),
+        "total_salary": sum(r["total_salary"] for r in results),
+        "results": results
+    })
+
+
+def export_rows(results: list, regions: list) -> list:
+    """导出 Excel 的表格行（每个员工一行，列名为中文）"""
+    export_data = []
+
+    for r in results:
+        row = {
+            "期间": r.get("period", ""),
+            "员工ID": r["employee_id"],
+            "姓名": r["employee_name"],
+        }
+
+        for region in regions:
+            region_id = region["id"]
+            region_name = region["name"]
+            if region_id in r["regions"]:
+                rd = r["regions"][region_id]
+                row[f"{region_name}_绩效分"] = rd["score"]
+                row[f"{region_name}_在岗"] = "是" if rd["is_on_duty"] else "否"
+                row[f"{region_name}_技能工资"] = rd["skill_salary"]
+                row[f"{region_name}_阶梯奖金"] = rd["ladder_bonus"]
+                row[f"{region_name}_小计"] = rd["total"]
+
+                # 印中特殊处理
+                if region_id == "region_002":
+                    mid_detail = r.get("mid_detail", {})
+                    row["印中_图纸印中"] = mid_detail.get("drawing", 0)
+                    row["印中_数码印中"] = mid_detail.get("digital", 0)
+
+        row["总工资"] = r["total_salary"]
+        export_data.append(row)
+
+    return export_data
@@ -1,24 +1,49 @@
 """
 数据管理模块 - 负责JSON文件的读写和备份
 版本: 1.0.0
+
+底层存储由 app.storage 提供（默认 JSON 文件，可切换为 SQLite），
+页面和其他模块只通过这里的函数读写数据，不关心具体存储方式。
 """
 __version__ = "1.0.0"
 
 import json
 import os
-import shutil
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-import streamlit as st
+
+from app.backup_store import BackupStore, BackupWriter, load_policy
+from app.file_cache import FileCache
+from app.file_lock import LockTimeoutError, lock_for
+from app.repository import COLLECTIONS, Repository
+from app.storage import ConcurrentModificationError, create_storage
 
 # 数据目录
 DATA_DIR = Path(__file__).parent.parent / "data"
 BACKUP_DIR = Path(__file__).parent.parent / "backup"
 
 
+_storage = None
+
+
+def get_storage():
+    """获取当前存储后端（首次使用时按配置创建）"""
+    global _storage
+    if _storage is None:
+        _storage = create_storage(DATA_DIR)
+    return _storage
+
+
 def clear_cache():
-    """清除所有 Streamlit 数据缓存"""
-    st.cache_data.clear()
+    """清除所有数据文件缓存"""
+    _file_cache.clear()
+
+
+def get_cache_stats() -> dict:
+    """数据文件缓存的统计信息（命中、未命中、淘汰次数等），用于调优"""
+    return _file_cache.stats()
 
 
 def ensure_dirs():
@@ -27,34 +52,88 @@ def ensure_dirs():
     BACKUP_DIR.mkdir(exist_ok=True)
 
 
-def backup_file(file_path: Path, version: str = None):
-    """
-    备份文件
-    命名格式：原文件名_YYYYMMDD_HHMMSS_v版本.扩展名
-    """
-    if not file_path.exists():
-        return None
+_backup_store = None
+_backup_writer = None
 
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    version_str = f"_v{version}" if version else ""
-    backup_name = f"{file_path.stem}_{timestamp}{version_str}{file_path.suffix}"
-    backup_path = BACKUP_DIR / backup_name
 
-    shutil.copy2(file_path, backup_path)
-    print(f"[备份] 已备份文件: {backup_name}")
-    return backup_path
+def get_backup_store() -> BackupStore:
+    """获取备份存储（BACKUP_DIR 改变后重新创建）"""
+    global _backup_store
+    if _backup_store is None or _backup_store.backup_dir != BACKUP_DIR:
+        _backup_store = BackupStore(BACKUP_DIR, load_policy(DATA_DIR))
+    return _backup_store
 
 
-@st.cache_data(ttl=300)  # 缓存5分钟
-def load_json(filename: str) -> dict:
-    """读取JSON文件（带Streamlit缓存）"""
-    file_path = DATA_DIR / filename
-    if not file_path.exists():
-        return {}
+def _get_backup_writer() -> BackupWriter:
+    global _backup_writer
+    if _backup_writer is None:
+        _backup_writer = BackupWriter()
+    return _backup_writer
+
+
+def flush_backups():
+    """等待后台备份全部写完"""
+    if _backup_writer is not None:
+        _backup_writer.flush()
+
+
+def get_backup_stats() -> dict:
+    """后台备份的运行状态（积压数量、写入、跳过、失败次数等），用于监控"""
+    return _get_backup_writer().stats()
+
 
+def backup_document(filename: str, version: str = None, force: bool = False) -> bool:
+    """
+    备份一个数据文件的当前内容（在后台写入）
+
+    前台只读出即将被覆盖的内容；内容与上一份备份相同、或在合并时间窗口内
+    （force=True 时不合并）时不产生新备份，见 app.backup_store。
+    返回是否提交了备份
+    """
+    storage = get_storage()
+
+    def read_content():
+        file_path = storage.path_of(filename)
+        if file_path is not None:
+            return file_path.read_bytes() if file_path.exists() else None
+        # 其他后端把当前内容导出为 JSON
+        data = storage.read(filename)
+        if data is None:
+            return None
+        return json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+
+    return _get_backup_writer().submit(get_backup_store(), filename, read_content, version, force)
+
+
+def list_backups(filename: str = None) -> list:
+    """列出备份（从新到旧），filename 为空时列出所有数据文件的备份"""
+    flush_backups()
+    return get_backup_store().list_backups(filename)
+
+
+def prune_backups() -> int:
+    """手动按保留策略清理所有数据文件的旧备份（包括从旧格式导入的），返回删除的份数"""
+    flush_backups()
+    return get_backup_store().prune()
+
+
+def restore_backup(filename: str, backup_id: str) -> bool:
+    """把数据文件恢复为某一份备份（恢复前先备份当前内容，可以撤销）"""
+    flush_backups()
+    data = json.loads(get_backup_store().read_backup(filename, backup_id))
+    with locked(filename):
+        backup_document(filename, __version__, force=True)
+        if not save_json(filename, data, backup=False):
+            return False
+    print(f"[恢复] 已将 {filename} 恢复到备份 {backup_id}")
+    return True
+
+
+def _read_file(filename: str) -> dict:
+    """从存储后端读取数据文件（不经过缓存）"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        data = get_storage().read(filename)
+        return data if data is not None else {}
     except json.JSONDecodeError as e:
         print(f"[错误] JSON格式错误: {filename} - {e}")
         return {}
@@ -63,26 +142,366 @@ def load_json(filename: str) -> dict:
         return {}
 
 
-def save_json(filename: str, data: dict, backup: bool = True):
-    """保存JSON文件，默认先备份"""
+# 按文件缓存：写入只淘汰该文件；JSON 后端还会比对文件的修改时间和大小
+_file_cache = FileCache(_read_file, lambda filename: get_storage().stamp(filename))
+
+
+def load_json(filename: str, cache: bool = True) -> dict:
+    """读取JSON文件（带缓存，每次返回独立的副本）
+
+    当前线程在该文件的 transaction() 中时返回的不是副本，而是事务内的工作数据本身：
+    对它的修改即使没有调用 save_json，也会随事务中其他的修改一起写入，
+    事务中只读的调用方不要修改返回的数据。这样事务中的多次修改不用每次复制整个文件。
+
+    cache=False 时直接从存储后端读取、不放入缓存，用于只读一次的大文件（如导出报表）
+    """
+    tx = _transaction_for(filename)
+    if tx is not None:
+        return tx.data
+    if not cache:
+        return _read_file(filename)
+    return _file_cache.get(filename)
+
+
+# 内存索引仓库：按数据版本缓存 id → 记录 的哈希索引，save_json 写入或文件被外部修改时失效
+_repo = Repository(load_json, lambda filename: (_file_cache.version(filename),
+                                                get_storage().stamp(filename)))
+
+
+def _mark_written(filename: str, data: dict = None):
+    """数据写入后只淘汰该文件的缓存，确保下次读取是最新数据；配置文件同时更新配置状态"""
+    _file_cache.evict(filename)
+    _repo.invalidate(filename)
+    if filename in CONFIG_FILES:
+        _record_config_write(filename, data)
+
+
+# ============ 配置状态 ============
+# 方案快照包含的三个配置文件，每次写入时在 config_state.json 中记录
+# 版本号和该分区的摘要，判断"当前配置是否修改"只需比较摘要
+
+CONFIG_STATE_FILE = "config_state.json"
+CONFIG_FILES = {
+    "skills.json": "skills",
+    "regions.json": "regions",
+    "employee_skills.json": "employee_skills",
+}
+
+
+def _file_stamp(filename: str):
+    stamp = get_storage().stamp(filename)
+    return list(stamp) if isinstance(stamp, tuple) else stamp
+
+
+def _record_config_write(filename: str, data: dict = None):
+    """
+    记录一次配置文件写入：版本号加一，更新该分区的摘要
+
+    整体保存时 data 为写入的内容，直接计算摘要；
+    行级写入（SQLite）没有完整内容，摘要置空，下次查询时再计算
+    """
+    from app.scheme_store import section_digest
+
+    section = CONFIG_FILES[filename]
+    entry = {
+        "digest": section_digest(data.get(section, [])) if data is not None else None,
+        "stamp": _file_stamp(filename),
+    }
+
+    def mutate(state):
+        state["version"] = state.get("version", 0) + 1
+        state.setdefault("sections", {})[section] = entry
+
+    update_json(CONFIG_STATE_FILE, mutate, backup=False)
+
+
+def get_config_version() -> int:
+    """配置版本号（技能、区域、技能指派每次写入加一）"""
+    return load_json(CONFIG_STATE_FILE).get("version", 0)
+
+
+def get_config_digests() -> dict:
+    """
+    当前配置各分区的摘要 {分区: 摘要}
+
+    平时直接取 config_state.json 中记录的摘要；摘要缺失，
+    或文件在程序之外被改动（文件戳不同）时才重新计算该分区
+    """
+    from app.scheme_store import section_digest
+
+    sections = load_json(CONFIG_STATE_FILE).get("sections", {})
+    digests = {}
+    recomputed = {}
+    for filename, section in CONFIG_FILES.items():
+        entry = sections.get(section) or {}
+        stamp = _file_stamp(filename)
+        if entry.get("digest") is None or entry.get("stamp") != stamp:
+            entry = {"digest": section_digest(load_json(filename).get(section, [])), "stamp": stamp}
+            recomputed[section] = entry
+        digests[section] = entry["digest"]
+
+    if recomputed:
+        update_json(CONFIG_STATE_FILE, lambda state: state.setdefault("sections", {}).update(recomputed),
+                    backup=False)
+    return digests
+
+
+# ============ 并发控制 ============
+# 写入本身是原子的（JSON 后端先写临时文件再重命名，SQLite 在事务内写入）；
+# 读-改-写整个文件的操作（如 add_employee 的 next_id）要在 locked() 内完成，
+# 多个会话、多个进程按顺序执行，不会互相覆盖。
+# 等锁超时（其他会话长时间持有锁）时 save_json / delete_json 返回 False，
+# update_json、transaction 等抛出 LockTimeoutError，页面显示 BUSY_MESSAGE
+
+_ANY_REVISION = object()
+BUSY_MESSAGE = "其他用户正在保存，请稍后重试"
+
+
+class SaveError(RuntimeError):
+    """update_json / transaction 保存数据文件失败（原因已由 save_json 输出）"""
+
+
+def locked(filename: str):
+    """
+    数据文件的互斥锁（线程间 + 进程间，同一线程可重入）
+
+    用法：
+        with locked("employees.json"):
+            data = load_json("employees.json")
+            ...
+            save_json("employees.json", data)
+    """
+    lock_name = filename.replace("/", "__") + ".lock"
+    return lock_for(DATA_DIR / ".locks" / lock_name)
+
+
+def get_revision(filename: str):
+    """数据文件的当前版本（每次写入都会变化），用于乐观并发检查"""
+    return get_storage().stamp(filename)
+
+
+def save_json(filename: str, data: dict, backup: bool = True, expected_revision=_ANY_REVISION):
+    """保存JSON文件，默认先备份
+
+    expected_revision 为读取时的 get_revision()，传入时先检查文件在读取后
+    没有被其他会话修改，否则抛出 ConcurrentModificationError
+    """
+    tx = _transaction_for(filename)
+    if tx is not None:
+        tx.touch(data)  # 事务结束时统一写入
+        return True
+
     ensure_dirs()
-    file_path = DATA_DIR / filename
+    storage = get_storage()
 
-    # 备份现有文件
-    if backup and file_path.exists():
-        backup_file(file_path, __version__)
+    try:
+        with locked(filename):
+            if expected_revision is not _ANY_REVISION and storage.stamp(filename) != expected_revision:
+                raise ConcurrentModificationError(f"{filename} 在读取后已被其他会话修改")
+
+            # 备份现有文件
+            if backup and storage.exists(filename):
+                backup_document(filename, __version__)
+
+            try:
+                storage.write(filename, data)
+                _mark_written(filename, data)
+                return True
+            except Exception as e:
+                print(f"[错误] 保存失败: {filename} - {e}")
+                return False
+    except LockTimeoutError:
+        print(f"[并发] 保存失败: {filename} - {BUSY_MESSAGE}")
+        return False
+
+
+def update_json(filename: str, mutate, backup: bool = True, retries: int = 3):
+    """
+    加锁读-改-写一个数据文件，返回 mutate 的返回值
 
+    mutate(data) 直接修改传入的数据，返回 False 时不保存。
+    保存时检查版本：读取后文件仍被改动（没有加锁的写入者，如外部程序）时
+    重新读取并再次执行 mutate，最多重试 retries 次；保存失败时抛出 SaveError
+    """
+    for attempt in range(retries + 1):
+        with locked(filename):
+            revision = get_revision(filename)
+            data = load_json(filename)
+            result = mutate(data)
+            if result is False:
+                return result
+            try:
+                saved = save_json(filename, data, backup, expected_revision=revision)
+            except ConcurrentModificationError:
+                if attempt == retries:
+                    raise
+                print(f"[并发] {filename} 读取后被修改，第 {attempt + 1} 次重试")
+                continue
+            if not saved:
+                raise SaveError(f"保存失败: {filename}")
+            return result
+
+
+def delete_json(filename: str, backup: bool = True) -> bool:
+    """删除数据文件，默认先备份"""
+    ensure_dirs()
+    storage = get_storage()
     try:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        # 清除缓存，确保下次读取是最新数据
-        clear_cache()
-        return True
-    except Exception as e:
-        print(f"[错误] 保存失败: {filename} - {e}")
+        with locked(filename):
+            if not storage.exists(filename):
+                return False
+
+            if backup:
+                backup_document(filename, __version__)
+            storage.delete(filename)
+            _mark_written(filename)
+            return True
+    except LockTimeoutError:
+        print(f"[并发] 删除失败: {filename} - {BUSY_MESSAGE}")
         return False
 
 
+# ============ 工作单元（事务） ============
+# 页面上的批量操作（如一键通过所有技能考核）原来每改一条就整文件写一次；
+# 在 transaction() 中执行时，所有修改作用于内存中的同一份数据，结束时只写一次
+
+_local = threading.local()
+
+
+class _Transaction:
+    """一个数据文件上进行中的事务"""
+
+    def __init__(self, filename: str, data: dict):
+        self.filename = filename
+        self.data = data
+        self.dirty = False
+        # 事务内的查询用事务内数据的索引，未提交的修改不会进入全局索引
+        self.repo = Repository(lambda _: self.data)
+
+    def touch(self, data: dict):
+        self.data = data
+        self.dirty = True
+        self.repo.invalidate(self.filename)
+
+
+def _transaction_for(filename: str):
+    """当前线程在该文件上进行中的事务，没有则返回 None"""
+    return getattr(_local, "transactions", {}).get(filename)
+
+
+def _index(filename: str) -> Repository:
+    """文件对应的索引仓库（事务中为事务内数据的索引）"""
+    tx = _transaction_for(filename)
+    return tx.repo if tx is not None else _repo
+
+
+@contextmanager
+def transaction(filename: str, backup: bool = True):
+    """
+    工作单元：把对一个数据文件的多次修改合并为一次写入
+
+    用法：
+        with transaction("employee_skills.json"):
+            for skill_id in skill_ids:
+                update_employee_skill(emp_id, skill_id, {"passed_exam": True})
+
+    - 事务内当前线程对该文件的 load_json / save_json / update_json 以及
+      单条记录的增删改都作用于内存中的同一份数据，事务结束时有修改才写入一次；
+      load_json 返回的就是这份数据（不是副本），只读的调用方不要修改它
+    - 块内抛出异常时放弃全部修改（st.rerun() 也是异常，要放在事务之外调用）；
+      结束时保存失败抛出 SaveError
+    - 事务期间持有文件锁，其他会话对该文件的修改排队等待
+    - 同一线程中嵌套的同名事务并入外层事务
+
+    返回事务内的数据；直接修改它的调用方最后调用一次 save_json 标记即可
+    """
+    tx = _transaction_for(filename)
+    if tx is not None:
+        yield tx.data
+        return
+
+    transactions = _local.__dict__.setdefault("transactions", {})
+    with locked(filename):
+        revision = get_revision(filename)
+        tx = _Transaction(filename, load_json(filename))
+        transactions[filename] = tx
+        try:
+            yield tx.data
+        finally:
+            del transactions[filename]
+        if tx.dirty and not save_json(filename, tx.data, backup, expected_revision=revision):
+            raise SaveError(f"保存失败: {filename}")
+
+
+# ============ 单条记录读写 ============
+# 支持行级写入的后端（SQLite）只改动相关的那一行，改动前与 save_json 一样先备份
+# （合并窗口内不重复备份），两种后端都可以用 restore_backup 恢复；
+# JSON 后端读出整个文件修改后再整体保存（与原来的做法相同）；
+# 事务中两种后端都只修改事务内的数据
+
+def _write_rows(filename: str, write):
+    """行级写入：加锁、备份当前内容后调用 write(storage)，返回它的返回值"""
+    storage = get_storage()
+    with locked(filename):
+        if storage.exists(filename):
+            backup_document(filename, __version__)
+        return write(storage)
+
+
+def _update_record(filename: str, key, updates: dict) -> dict:
+    """更新一条记录，返回更新后的记录；找不到返回 None"""
+    storage = get_storage()
+    if storage.supports_rows and _transaction_for(filename) is None:
+        record = _write_rows(filename, lambda s: s.update_row(filename, key, updates))
+        if record is not None:
+            _mark_written(filename)
+        return record
+
+    def mutate(data):
+        _, record = _index(filename).locate(filename, data.get(COLLECTIONS[filename][0], []), key)
+        if not record:
+            return False
+        record.update(updates)
+        return record
+
+    return update_json(filename, mutate) or None
+
+
+def _insert_records(filename: str, records: list, meta: dict = None):
+    """追加记录，meta 为需要同时写入的文件级字段（如 next_id）"""
+    storage = get_storage()
+    if storage.supports_rows and _transaction_for(filename) is None:
+        _write_rows(filename, lambda s: s.insert_rows(filename, records, meta))
+        _mark_written(filename)
+        return
+
+    def mutate(data):
+        list_key = COLLECTIONS[filename][0]
+        data[list_key] = data.get(list_key, []) + list(records)
+        data.update(meta or {})
+
+    update_json(filename, mutate)
+
+
+def _delete_record(filename: str, key) -> dict:
+    """删除一条记录，返回被删除的记录；找不到返回 None"""
+    storage = get_storage()
+    if storage.supports_rows and _transaction_for(filename) is None:
+        record = _write_rows(filename, lambda s: s.delete_row(filename, key))
+        if record is not None:
+            _mark_written(filename)
+        return record
+
+    def mutate(data):
+        records = data.get(COLLECTIONS[filename][0], [])
+        i, _ = _index(filename).locate(filename, records, key)
+        if i is None:
+            return False
+        return records.pop(i)
+
+    return update_json(filename, mutate) or None
+
+
 # ============ 员工管理 ============
 
 def get_employees() -> list:
@@ -91,6 +510,11 @@ def get_employees() -> list:
     return data.get("employees", [])
 
 
+def get_employee_by_id(emp_id: str) -> dict:
+    """根据ID获取员工"""
+    return _index("employees.json").get("employees.json", emp_id)
+
+
 def add_employee(name: str, employee_no: str = None, mode_id: str = None) -> dict:
     """添加员工
 
@@ -99,45 +523,74 @@ def add_employee(name: str, employee_no: str = None, mode_id: str = None) -> dic
         employee_no: 工号（可选）
         mode_id: 所属模式ID
     """
-    data = load_json("employees.json")
-    employees = data.get("employees", [])
-    next_id = data.get("next_id", 1)
-
-    # 检查是否已存在同名员工
-    for emp in employees:
-        if emp["name"] == name:
-            print(f"[提示] 员工已存在: {name}")
-            return emp
-
-    new_employee = {
-        "id": f"emp_{next_id:04d}",
-        "name": name,
-        "employee_no": employee_no or f"E{next_id:04d}",
-        "mode_id": mode_id,
-        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
+    with locked("employees.json"):
+        data = load_json("employees.json")
+        employees = data.get("employees", [])
+        next_id = data.get("next_id", 1)
+
+        # 检查是否已存在同名员工
+        for emp in employees:
+            if emp["name"] == name:
+                print(f"[提示] 员工已存在: {name}")
+                return emp
+
+        new_employee = {
+            "id": f"emp_{next_id:04d}",
+            "name": name,
+            "employee_no": employee_no or f"E{next_id:04d}",
+            "mode_id": mode_id,
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
 
-    employees.append(new_employee)
-    data["employees"] = employees
-    data["next_id"] = next_id + 1
+        _insert_records("employees.json", [new_employee], {"next_id": next_id + 1})
+        print(f"[添加] 新增员工: {name}")
+        return new_employee
 
-    save_json("employees.json", data)
-    print(f"[添加] 新增员工: {name}")
-    return new_employee
+
+def add_employees(names: list, mode_id: str = None) -> dict:
+    """批量添加员工（一次写入），已存在的同名员工直接返回
+
+    Returns:
+        dict: {姓名: 员工记录}
+    """
+    with locked("employees.json"):
+        data = load_json("employees.json")
+        next_id = data.get("next_id", 1)
+        wanted = set(names)
+        result = {}
+        for emp in data.get("employees", []):
+            if emp["name"] in wanted:
+                result.setdefault(emp["name"], emp)
+
+        new_employees = []
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for name in names:
+            if name in result:
+                continue
+            new_employee = {
+                "id": f"emp_{next_id:04d}",
+                "name": name,
+                "employee_no": f"E{next_id:04d}",
+                "mode_id": mode_id,
+                "created_at": now
+            }
+            next_id += 1
+            new_employees.append(new_employee)
+            result[name] = new_employee
+
+        if new_employees:
+            _insert_records("employees.json", new_employees, {"next_id": next_id})
+            print(f"[批量添加] 新增 {len(new_employees)} 名员工")
+        return result
 
 
 def update_employee(emp_id: str, updates: dict) -> bool:
     """更新员工信息"""
-    data = load_json("employees.json")
-    employees = data.get("employees", [])
-
-    for emp in employees:
-        if emp["id"] == emp_id:
-            emp.update(updates)
-            emp["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            save_json("employees.json", data)
-            print(f"[更新] 已更新员工: {emp['name']}")
-            return True
+    emp = _update_record("employees.json", emp_id,
+                         dict(updates, updated_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    if emp:
+        print(f"[更新] 已更新员工: {emp['name']}")
+        return True
 
     print(f"[错误] 未找到员工: {emp_id}")
     return False
@@ -145,15 +598,10 @@ def update_employee(emp_id: str, updates: dict) -> bool:
 
 def delete_employee(emp_id: str) -> bool:
     """删除员工"""
-    data = load_json("employees.json")
-    employees = data.get("employees", [])
-
-    for i, emp in enumerate(employees):
-        if emp["id"] == emp_id:
-            deleted = employees.pop(i)
-            save_json("employees.json", data)
-            print(f"[删除] 已删除员工: {deleted['name']}")
-            return True
+    deleted = _delete_record("employees.json", emp_id)
+    if deleted:
+        print(f"[删除] 已删除员工: {deleted['name']}")
+        return True
 
     print(f"[错误] 未找到员工: {emp_id}")
     return False
@@ -169,11 +617,7 @@ def get_modes() -> list:
 
 def get_mode_by_id(mode_id: str) -> dict:
     """根据ID获取模式"""
-    modes = get_modes()
-    for mode in modes:
-        if mode["id"] == mode_id:
-            return mode
-    return None
+    return _index("modes.json").get("modes.json", mode_id)
 
 
 # ============ 大区域管理 ============
@@ -186,54 +630,46 @@ def get_regions() -> list:
 
 def get_region_by_id(region_id: str) -> dict:
     """根据ID获取大区域"""
-    regions = get_regions()
-    for region in regions:
-        if region["id"] == region_id:
-            return region
-    return None
+    return _index("regions.json").get("regions.json", region_id)
 
 
 def update_region(region_id: str, updates: dict) -> bool:
     """更新大区域信息"""
-    data = load_json("regions.json")
-    regions = data.get("regions", [])
-
-    for region in regions:
-        if region["id"] == region_id:
-            region.update(updates)
-            save_json("regions.json", data)
-            print(f"[更新] 已更新区域: {region['name']}")
-            return True
+    region = _update_record("regions.json", region_id, updates)
+    if region:
+        print(f"[更新] 已更新区域: {region['name']}")
+        return True
 
     return False
 
 
 def add_region(name: str, erp_column: str = None) -> dict:
     """添加大区域"""
-    data = load_json("regions.json")
-    regions = data.get("regions", [])
-
-    # 生成新ID
-    max_num = 0
-    for r in regions:
-        num = int(r["id"].split("_")[1])
-        if num > max_num:
-            max_num = num
-
-    new_region = {
-        "id": f"region_{max_num + 1:03d}",
-        "name": name,
-        "erp_column": erp_column,
-        "threshold": 30000,
-        "ladder_rules": [],
-        "created_at": datetime.now().strftime("%Y-%m-%d")
-    }
+    with locked("regions.json"):
+        data = load_json("regions.json")
+        regions = data.get("regions", [])
+
+        # 生成新ID
+        max_num = 0
+        for r in regions:
+            num = int(r["id"].split("_")[1])
+            if num > max_num:
+                max_num = num
+
+        new_region = {
+            "id": f"region_{max_num + 1:03d}",
+            "name": name,
+            "erp_column": erp_column,
+            "threshold": 30000,
+            "ladder_rules": [],
+            "created_at": datetime.now().strftime("%Y-%m-%d")
+        }
 
-    regions.append(new_region)
-    data["regions"] = regions
-    save_json("regions.json", data)
-    print(f"[添加] 新增区域: {name}")
-    return new_region
+        regions.append(new_region)
+        data["regions"] = regions
+        save_json("regions.json", data)
+        print(f"[添加] 新增区域: {name}")
+        return new_region
 
 
 # ============ 小技能管理 ============
@@ -246,115 +682,100 @@ def get_skills() -> list:
 
 def get_skills_by_mode(mode_id: str) -> list:
     """获取指定模式下的技能"""
-    skills = get_skills()
-    return [s for s in skills if s.get("mode_id") == mode_id]
+    return list(_index("skills.json").group("skills.json", "mode_id", mode_id))
 
 
 def get_skills_by_region(region_id: str) -> list:
     """获取指定区域下的技能"""
-    skills = get_skills()
-    return [s for s in skills if s.get("region_id") == region_id]
+    return list(_index("skills.json").group("skills.json", "region_id", region_id))
 
 
 def add_skill(name: str, mode_id: str, region_id: str,
               salary_on_duty: int = 200, salary_off_duty: int = 100) -> dict:
     """添加小技能"""
-    data = load_json("skills.json")
-    skills = data.get("skills", [])
-    next_id = data.get("next_id", 1)
-
-    new_skill = {
-        "id": f"skill_{next_id:03d}",
-        "name": name,
-        "mode_id": mode_id,
-        "region_id": region_id,
-        "salary_on_duty": salary_on_duty,
-        "salary_off_duty": salary_off_duty,
-        "created_at": datetime.now().strftime("%Y-%m-%d")
-    }
-
-    skills.append(new_skill)
-    data["skills"] = skills
-    data["next_id"] = next_id + 1
+    with locked("skills.json"):
+        next_id = load_json("skills.json").get("next_id", 1)
+
+        new_skill = {
+            "id": f"skill_{next_id:03d}",
+            "name": name,
+            "mode_id": mode_id,
+            "region_id": region_id,
+            "salary_on_duty": salary_on_duty,
+            "salary_off_duty": salary_off_duty,
+            "created_at": datetime.now().strftime("%Y-%m-%d")
+        }
 
-    save_json("skills.json", data)
-    print(f"[添加] 新增技能: {name}")
-    return new_skill
+        _insert_records("skills.json", [new_skill], {"next_id": next_id + 1})
+        print(f"[添加] 新增技能: {name}")
+        return new_skill
 
 
 def update_skill(skill_id: str, updates: dict) -> bool:
     """更新技能信息"""
-    data = load_json("skills.json")
-    skills = data.get("skills", [])
-
-    for skill in skills:
-        if skill["id"] == skill_id:
-            skill.update(updates)
-            save_json("skills.json", data)
-            print(f"[更新] 已更新技能: {skill['name']}")
-            return True
+    skill = _update_record("skills.json", skill_id, updates)
+    if skill:
+        print(f"[更新] 已更新技能: {skill['name']}")
+        return True
 
     return False
 
 
 def batch_update_skills(skill_ids: list, updates: dict) -> int:
     """批量更新技能"""
-    data = load_json("skills.json")
-    skills = data.get("skills", [])
-    count = 0
-
-    for skill in skills:
-        if skill["id"] in skill_ids:
-            skill.update(updates)
-            count += 1
-
-    if count > 0:
-        save_json("skills.json", data)
-        print(f"[批量更新] 已更新 {count} 个技能")
+    with locked("skills.json"):
+        data = load_json("skills.json")
+        skills = data.get("skills", [])
+        count = 0
+        skill_ids = set(skill_ids)
+
+        for skill in skills:
+            if skill["id"] in skill_ids:
+                skill.update(updates)
+                count += 1
+
+        if count > 0:
+            save_json("skills.json", data)
+            print(f"[批量更新] 已更新 {count} 个技能")
 
-    return count
+        return count
 
 
 # ============ 员工-技能关联 ============
 
 def get_employee_skills(emp_id: str = None) -> list:
     """获取员工技能关联"""
-    data = load_json("employee_skills.json")
-    all_skills = data.get("employee_skills", [])
-
     if emp_id:
-        return [s for s in all_skills if s.get("employee_id") == emp_id]
-    return all_skills
+        return list(_index("employee_skills.json").group("employee_skills.json", "employee_id", emp_id))
+
+    data = load_json("employee_skills.json")
+    return data.get("employee_skills", [])
 
 
 def assign_skill_to_employee(emp_id: str, skill_id: str, passed_exam: bool = False,
                               custom_threshold: int = None) -> dict:
     """给员工分配技能"""
-    data = load_json("employee_skills.json")
-    emp_skills = data.get("employee_skills", [])
-
-    # 检查是否已存在
-    for es in emp_skills:
-        if es["employee_id"] == emp_id and es["skill_id"] == skill_id:
+    with locked("employee_skills.json"):
+        # 检查是否已存在
+        es = _index("employee_skills.json").get("employee_skills.json", (emp_id, skill_id))
+        if es:
             print(f"[提示] 技能已分配")
             return es
 
-    new_assignment = {
-        "employee_id": emp_id,
-        "skill_id": skill_id,
-        "passed_exam": passed_exam,
-        "use_system_threshold": custom_threshold is None,
-        "custom_threshold": custom_threshold,
-        "use_system_price": True,  # 默认使用系统价格
-        "custom_price_on_duty": None,  # 自定义在岗价格
-        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
+        new_assignment = {
+            "employee_id": emp_id,
+            "skill_id": skill_id,
+            "passed_exam": passed_exam,
+            "use_system_threshold": custom_threshold is None,
+            "custom_threshold": custom_threshold,
+            "use_system_price": True,  # 默认使用系统价格
+            "custom_price_on_duty": None,  # 自定义在岗价格
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
 
-    emp_skills.append(new_assignment)
-    data["employee_skills"] = emp_skills
-    save_json("employee_skills.json", data)
-    print(f"[分配] 已分配技能")
-    return new_assignment
+        _insert_records("employee_skills.json", [new_assignment])
+        print(f"[分配] 已分配技能")
+        return new_assignment
 
 
 def batch_assign_skills_to_employee(emp_id: str, skill_ids: list, passed_exam: bool = False) -> dict:
@@ -368,73 +789,67 @@ def batch_assign_skills_to_employee(emp_id: str, skill_ids: list, passed_exam: b
     Returns:
         dict: {"success": [...], "skipped": [...]} 分配结果
     """
-    data = load_json("employee_skills.json")
-    emp_skills = data.get("employee_skills", [])
-
-    results = {"success": [], "skipped": []}
-
-    for skill_id in skill_ids:
-        # 检查是否已存在
-        exists = any(es["employee_id"] == emp_id and es["skill_id"] == skill_id for es in emp_skills)
-        if exists:
-            results["skipped"].append(skill_id)
-            continue
-
-        new_assignment = {
-            "employee_id": emp_id,
-            "skill_id": skill_id,
-            "passed_exam": passed_exam,
-            "use_system_threshold": True,
-            "custom_threshold": None,
-            "use_system_price": True,
-            "custom_price_on_duty": None,
-            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        emp_skills.append(new_assignment)
-        results["success"].append(skill_id)
-
-    if results["success"]:
-        data["employee_skills"] = emp_skills
-        save_json("employee_skills.json", data)
-        print(f"[批量分配] 成功分配 {len(results['success'])} 个技能")
-
-    return results
+    with locked("employee_skills.json"):
+        results = {"success": [], "skipped": []}
+        new_assignments = []
+        existing_ids = {es["skill_id"] for es in _index("employee_skills.json").group("employee_skills.json", "employee_id", emp_id)}
+
+        for skill_id in skill_ids:
+            # 检查是否已存在
+            if skill_id in existing_ids:
+                results["skipped"].append(skill_id)
+                continue
+            existing_ids.add(skill_id)
+
+            new_assignment = {
+                "employee_id": emp_id,
+                "skill_id": skill_id,
+                "passed_exam": passed_exam,
+                "use_system_threshold": True,
+                "custom_threshold": None,
+                "use_system_price": True,
+                "custom_price_on_duty": None,
+                "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            }
+            new_assignments.append(new_assignment)
+            results["success"].append(skill_id)
+
+        if new_assignments:
+            _insert_records("employee_skills.json", new_assignments)
+            print(f"[批量分配] 成功分配 {len(results['success'])} 个技能")
+
+        return results
 
 
 def update_employee_skill(emp_id: str, skill_id: str, updates: dict) -> bool:
     """更新员工技能关联"""
-    data = load_json("employee_skills.json")
-    emp_skills = data.get("employee_skills", [])
-
-    for es in emp_skills:
-        if es["employee_id"] == emp_id and es["skill_id"] == skill_id:
-            es.update(updates)
-            save_json("employee_skills.json", data)
-            return True
-
-    return False
+    return _update_record("employee_skills.json", (emp_id, skill_id), updates) is not None
 
 
 def remove_employee_skill(emp_id: str, skill_id: str) -> bool:
     """取消员工的技能分配"""
-    data = load_json("employee_skills.json")
-    emp_skills = data.get("employee_skills", [])
+    return _delete_record("employee_skills.json", (emp_id, skill_id)) is not None
 
-    for i, es in enumerate(emp_skills):
-        if es["employee_id"] == emp_id and es["skill_id"] == skill_id:
-            emp_skills.pop(i)
-            data["employee_skills"] = emp_skills
-            save_json("employee_skills.json", data)
-            return True
 
-    return False
+# ============ 方案管理 ============
 
+def _load_schemes_data() -> dict:
+    """读取 schemes.json（旧格式的内嵌快照在这里迁移为引用）"""
+    with locked("schemes.json"):
+        data = load_json("schemes.json")
+        schemes = data.get("schemes", [])
+        from app.scheme_store import migrate_embedded_snapshots, needs_migration
+
+        if needs_migration(schemes):
+            count = migrate_embedded_snapshots(schemes)
+            save_json("schemes.json", data)
+            print(f"[迁移] {count} 个方案的快照已改为共享实体引用")
+        return data
 
-# ============ 方案管理 ============
 
 def get_schemes() -> list:
     """获取所有方案"""
-    data = load_json("schemes.json")
+    data = _load_schemes_data()
     return data.get("schemes", [])
 
 
@@ -449,11 +864,18 @@ def get_active_scheme() -> dict:
 
 def get_scheme_by_id(scheme_id: str) -> dict:
     """根据ID获取方案"""
-    schemes = get_schemes()
-    for scheme in schemes:
-        if scheme["id"] == scheme_id:
-            return scheme
-    return None
+    _load_schemes_data()
+    return _index("schemes.json").get("schemes.json", scheme_id)
+
+
+def get_scheme_snapshot(scheme_id: str, sections: tuple = None) -> dict:
+    """还原方案的配置快照 {"skills": [...], "regions": [...], "employee_skills": [...]}，无快照时返回 None"""
+    from app.scheme_store import SECTIONS, has_snapshot, load_snapshot
+
+    scheme = get_scheme_by_id(scheme_id)
+    if not has_snapshot(scheme):
+        return None
+    return load_snapshot(scheme["snapshot_id"], sections or SECTIONS)
 
 
 def create_config_snapshot() -> dict:
@@ -467,193 +889,181 @@ def create_config_snapshot() -> dict:
 
 def save_as_scheme(name: str, description: str = "") -> dict:
     """将当前配置保存为新方案"""
-    data = load_json("schemes.json")
-    schemes = data.get("schemes", [])
-    next_id = data.get("next_id", 1)
-
-    # 创建快照
-    snapshot = create_config_snapshot()
-
-    new_scheme = {
-        "id": f"scheme_{next_id:03d}",
-        "name": name,
-        "is_active": False,
-        "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "description": description,
-        "snapshot": snapshot
-    }
+    with locked("schemes.json"):
+        from app.scheme_store import store_snapshot
+
+        data = _load_schemes_data()
+        schemes = data.get("schemes", [])
+        next_id = data.get("next_id", 1)
+
+        # 创建快照（实体存入共享存储，方案只保存引用）
+        stored = store_snapshot(create_config_snapshot())
+
+        new_scheme = {
+            "id": f"scheme_{next_id:03d}",
+            "name": name,
+            "is_active": False,
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "description": description,
+            **stored
+        }
 
-    schemes.append(new_scheme)
-    data["schemes"] = schemes
-    data["next_id"] = next_id + 1
+        schemes.append(new_scheme)
+        data["schemes"] = schemes
+        data["next_id"] = next_id + 1
 
-    save_json("schemes.json", data, backup=False)
-    print(f"[方案] 已保存方案: {name}")
-    return new_scheme
+        save_json("schemes.json", data, backup=False)
+        print(f"[方案] 已保存方案: {name}")
+        return new_scheme
 
 
 def update_scheme_snapshot(scheme_id: str) -> bool:
     """更新方案的快照为当前配置"""
-    data = load_json("schemes.json")
-    schemes = data.get("schemes", [])
+    with locked("schemes.json"):
+        from app.scheme_store import collect_garbage, store_snapshot
 
-    for scheme in schemes:
-        if scheme["id"] == scheme_id:
-            scheme["snapshot"] = create_config_snapshot()
+        data = _load_schemes_data()
+        schemes = data.get("schemes", [])
+
+        _, scheme = _index("schemes.json").locate("schemes.json", schemes, scheme_id)
+        if scheme:
+            scheme.update(store_snapshot(create_config_snapshot()))
             scheme["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             save_json("schemes.json", data, backup=False)
+            collect_garbage(schemes)
             print(f"[方案] 已更新方案快照: {scheme['name']}")
             return True
 
-    return False
+        return False
 
 
 def load_scheme_to_current(scheme_id: str) -> bool:
-    """将方案加载到当前配置（覆盖当前数据）"""
+    """将方案加载到当前配置（只覆盖与当前配置不同的部分）"""
+    from app.scheme_store import has_snapshot, load_snapshot
+
     scheme = get_scheme_by_id(scheme_id)
-    if not scheme or not scheme.get("snapshot"):
+    if not has_snapshot(scheme):
         print(f"[错误] 方案不存在或无快照: {scheme_id}")
         return False
 
-    snapshot = scheme["snapshot"]
-
-    # 恢复技能数据
-    skills_data = load_json("skills.json")
-    skills_data["skills"] = snapshot.get("skills", [])
-    save_json("skills.json", skills_data)
-
-    # 恢复区域数据
-    regions_data = load_json("regions.json")
-    regions_data["regions"] = snapshot.get("regions", [])
-    save_json("regions.json", regions_data)
+    # 比较分区摘要，只还原和写入不同的分区
+    current = get_config_digests()
+    changed = tuple(section for section, digest in current.items()
+                    if scheme["snapshot_digests"].get(section) != digest)
+    snapshot = load_snapshot(scheme["snapshot_id"], changed)
 
-    # 恢复员工技能数据
-    emp_skills_data = load_json("employee_skills.json")
-    emp_skills_data["employee_skills"] = snapshot.get("employee_skills", [])
-    save_json("employee_skills.json", emp_skills_data)
+    # 恢复技能、区域、员工技能数据（各文件加锁读-改-写，保留 next_id 等其他字段）
+    for section in changed:
+        update_json(f"{section}.json", lambda data, section=section: data.update({section: snapshot[section]}))
 
     # 设置为激活方案
     set_active_scheme(scheme_id)
 
-    print(f"[方案] 已加载方案: {scheme['name']}")
+    print(f"[方案] 已加载方案: {scheme['name']}（更新 {len(changed)} 个分区）")
     return True
 
 
 def set_active_scheme(scheme_id: str) -> bool:
     """设置激活方案"""
-    data = load_json("schemes.json")
-    schemes = data.get("schemes", [])
-
-    found = False
-    for scheme in schemes:
-        if scheme["id"] == scheme_id:
-            scheme["is_active"] = True
-            found = True
-        else:
-            scheme["is_active"] = False
-
-    if found:
-        save_json("schemes.json", data, backup=False)
-        return True
-    return False
+    with locked("schemes.json"):
+        data = _load_schemes_data()
+        schemes = data.get("schemes", [])
+
+        found = False
+        for scheme in schemes:
+            if scheme["id"] == scheme_id:
+                scheme["is_active"] = True
+                found = True
+            else:
+                scheme["is_active"] = False
+
+        if found:
+            save_json("schemes.json", data, backup=False)
+            return True
+        return False
 
 
 def update_scheme_info(scheme_id: str, updates: dict) -> bool:
     """更新方案基本信息（名称、描述）"""
-    data = load_json("schemes.json")
-    schemes = data.get("schemes", [])
-
-    for scheme in schemes:
-        if scheme["id"] == scheme_id:
-            if "name" in updates:
-                scheme["name"] = updates["name"]
-            if "description" in updates:
-                scheme["description"] = updates["description"]
-            scheme["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            save_json("schemes.json", data, backup=False)
-            print(f"[方案] 已更新方案信息: {scheme['name']}")
-            return True
+    with locked("schemes.json"):
+        data = _load_schemes_data()
+        schemes = data.get("schemes", [])
+
+        for scheme in schemes:
+            if scheme["id"] == scheme_id:
+                if "name" in updates:
+                    scheme["name"] = updates["name"]
+                if "description" in updates:
+                    scheme["description"] = updates["description"]
+                scheme["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                save_json("schemes.json", data, backup=False)
+                print(f"[方案] 已更新方案信息: {scheme['name']}")
+                return True
 
-    return False
+        return False
 
 
 def delete_scheme(scheme_id: str) -> bool:
     """删除方案"""
-    data = load_json("schemes.json")
-    schemes = data.get("schemes", [])
-
-    for i, scheme in enumerate(schemes):
-        if scheme["id"] == scheme_id:
-            # 不允许删除激活的方案
-            if scheme.get("is_active"):
-                print(f"[错误] 不能删除当前使用中的方案")
-                return False
-            deleted = schemes.pop(i)
-            save_json("schemes.json", data, backup=False)
-            print(f"[方案] 已删除方案: {deleted['name']}")
-            return True
+    with locked("schemes.json"):
+        from app.scheme_store import collect_garbage
+
+        data = _load_schemes_data()
+        schemes = data.get("schemes", [])
+
+        for i, scheme in enumerate(schemes):
+            if scheme["id"] == scheme_id:
+                # 不允许删除激活的方案
+                if scheme.get("is_active"):
+                    print(f"[错误] 不能删除当前使用中的方案")
+                    return False
+                deleted = schemes.pop(i)
+                save_json("schemes.json", data, backup=False)
+                collect_garbage(schemes)
+                print(f"[方案] 已删除方案: {deleted['name']}")
+                return True
 
-    return False
+        return False
 
 
 def get_config_hash() -> str:
     """获取当前配置的哈希值（用于判断是否修改）"""
     import hashlib
-    snapshot = create_config_snapshot()
-    content = json.dumps(snapshot, sort_keys=True, ensure_ascii=False)
+    content = json.dumps(get_config_digests(), sort_keys=True)
     return hashlib.md5(content.encode()).hexdigest()[:8]
 
 
 def is_config_modified() -> bool:
-    """检查当前配置是否与激活方案不同"""
+    """检查当前配置是否与激活方案不同（比较保存的分区摘要，不序列化配置）"""
+    from app.scheme_store import has_snapshot
+
     active = get_active_scheme()
-    if not active or not active.get("snapshot"):
+    if not has_snapshot(active):
         return False
 
-    current_hash = get_config_hash()
-
-    # 计算激活方案的哈希
-    import hashlib
-    snapshot_content = json.dumps(active["snapshot"], sort_keys=True, ensure_ascii=False)
-    active_hash = hashlib.md5(snapshot_content.encode()).hexdigest()[:8]
-
-    return current_hash != active_hash
+    return active["snapshot_digests"] != get_config_digests()
 
 
 # ============ 计算历史锁定管理 ============
 
 def is_calculation_locked(month: str) -> bool:
     """检查指定月份是否已锁定"""
-    data = load_json("calculation_history.json")
-    calculations = data.get("calculations", [])
+    from app.history_store import get_calculation_meta
 
-    for calc in calculations:
-        # 兼容 month 和 period 字段
-        if calc.get("month") == month or calc.get("period") == month:
-            return calc.get("locked", False)
-    return False
+    meta = get_calculation_meta(month)
+    return bool(meta and meta.get("locked", False))
 
 
 def lock_calculation(month: str) -> bool:
     """锁定指定月份的计算结果"""
-    data = load_json("calculation_history.json")
-    if not data:
-        return False
+    from app.history_store import set_locked
 
-    calculations = data.get("calculations", [])
-
-    for calc in calculations:
-        # 兼容 month 和 period 字段
-        if calc.get("month") == month or calc.get("period") == month:
-            calc["locked"] = True
-            calc["locked_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            active_scheme = get_active_scheme()
-            if active_scheme:
-                calc["locked_scheme_name"] = active_scheme.get("name", "")
-            save_json("calculation_history.json", data, backup=False)
-            print(f"[锁定] 已锁定: {month}")
-            return True
+    active_scheme = get_active_scheme()
+    scheme_name = active_scheme.get("name", "") if active_scheme else None
+    if set_locked(month, True, scheme_name):
+        print(f"[锁定] 已锁定: {month}")
+        return True
 
     print(f"[错误] 未找到记录: {month}")
     return False
@@ -661,20 +1071,11 @@ def lock_calculation(month: str) -> bool:
 
 def unlock_calculation(month: str) -> bool:
     """解锁指定月份的计算结果"""
-    data = load_json("calculation_history.json")
-    if not data:
-        return False
+    from app.history_store import set_locked
 
-    calculations = data.get("calculations", [])
-
-    for calc in calculations:
-        # 兼容 month 和 period 字段
-        if calc.get("month") == month or calc.get("period") == month:
-            calc["locked"] = False
-            calc.pop("locked_at", None)
-            save_json("calculation_history.json", data, backup=False)
-            print(f"[解锁] 已解锁: {month}")
-            return True
+    if set_locked(month, False):
+        print(f"[解锁] 已解锁: {month}")
+        return True
 
     print(f"[错误] 未找到记录: {month}")
     return False
@@ -690,66 +1091,53 @@ def get_roles() -> list:
 
 def get_role_by_id(role_id: str) -> dict:
     """根据ID获取角色"""
-    roles = get_roles()
-    for role in roles:
-        if role["id"] == role_id:
-            return role
-    return None
+    return _index("roles.json").get("roles.json", role_id)
 
 
 def add_role(name: str, description: str = "", threshold_multiplier: float = 1.0,
              income_types: list = None, settings: dict = None) -> dict:
     """添加新角色"""
-    data = load_json("roles.json")
-    roles = data.get("roles", [])
-    next_id = data.get("next_id", 1)
-
-    new_role = {
-        "id": f"role_{next_id:03d}",
-        "name": name,
-        "description": description,
-        "threshold_multiplier": threshold_multiplier,
-        "income_types": income_types or ["skill_salary", "ladder_bonus"],
-        "settings": settings or {},
-        "created_at": datetime.now().strftime("%Y-%m-%d")
-    }
+    with locked("roles.json"):
+        data = load_json("roles.json")
+        roles = data.get("roles", [])
+        next_id = data.get("next_id", 1)
+
+        new_role = {
+            "id": f"role_{next_id:03d}",
+            "name": name,
+            "description": description,
+            "threshold_multiplier": threshold_multiplier,
+            "income_types": income_types or ["skill_salary", "ladder_bonus"],
+            "settings": settings or {},
+            "created_at": datetime.now().strftime("%Y-%m-%d")
+        }
 
-    roles.append(new_role)
-    data["roles"] = roles
-    data["next_id"] = next_id + 1
+        roles.append(new_role)
+        data["roles"] = roles
+        data["next_id"] = next_id + 1
 
-    save_json("roles.json", data)
-    print(f"[添加] 新增角色: {name}")
-    return new_role
+        save_json("roles.json", data)
+        print(f"[添加] 新增角色: {name}")
+        return new_role
 
 
 def update_role(role_id: str, updates: dict) -> bool:
     """更新角色信息"""
-    data = load_json("roles.json")
-    roles = data.get("roles", [])
-
-    for role in roles:
-        if role["id"] == role_id:
-            role.update(updates)
-            role["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            save_json("roles.json", data)
-            print(f"[更新] 已更新角色: {role['name']}")
-            return True
+    role = _update_record("roles.json", role_id,
+                          dict(updates, updated_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    if role:
+        print(f"[更新] 已更新角色: {role['name']}")
+        return True
 
     return False
 
 
 def delete_role(role_id: str) -> bool:
     """删除角色"""
-    data = load_json("roles.json")
-    roles = data.get("roles", [])
-
-    for i, role in enumerate(roles):
-        if role["id"] == role_id:
-            deleted = roles.pop(i)
-            save_json("roles.json", data)
-            print(f"[删除] 已删除角色: {deleted['name']}")
-            return True
+    deleted = _delete_record("roles.json", role_id)
+    if deleted:
+        print(f"[删除] 已删除角色: {deleted['name']}")
+        return True
 
     return False
 
@@ -768,18 +1156,19 @@ def get_external_data(month: str = None) -> list:
 
 def save_external_data(records: list, month: str) -> bool:
     """保存外部数据"""
-    data = load_json("external_data.json")
-    if not data:
-        data = {"records": []}
+    with locked("external_data.json"):
+        data = load_json("external_data.json")
+        if not data:
+            data = {"records": []}
 
-    existing = data.get("records", [])
-    # 移除该月的旧数据
-    existing = [r for r in existing if r.get("month") != month]
-    # 添加新数据
-    existing.extend(records)
+        existing = data.get("records", [])
+        # 移除该月的旧数据
+        existing = [r for r in existing if r.get("month") != month]
+        # 添加新数据
+        existing.extend(records)
 
-    data["records"] = existing
-    return save_json("external_data.json", data)
+        data["records"] = existing
+        return save_json("external_data.json", data)
 
 
 # ============ 收入规则管理 ============
@@ -792,11 +1181,7 @@ def get_income_rules() -> list:
 
 def get_income_rule_by_type(income_type: str) -> dict:
     """根据类型获取收入规则"""
-    rules = get_income_rules()
-    for rule in rules:
-        if rule["type"] == income_type:
-            return rule
-    return None
+    return _index("income_rules.json").get("income_rules.json", income_type)
 
 
 # ============ 奖金池管理 ============
@@ -809,72 +1194,53 @@ def get_bonus_pools() -> list:
 
 def get_bonus_pool_by_id(pool_id: str) -> dict:
     """根据ID获取奖金池"""
-    pools = get_bonus_pools()
-    for pool in pools:
-        if pool["id"] == pool_id:
-            return pool
-    return None
+    return _index("bonus_pools.json").get("bonus_pools.json", pool_id)
 
 
 def add_bonus_pool(name: str, total_amount: float, distribution_rules: list) -> dict:
     """添加奖金池"""
-    data = load_json("bonus_pools.json")
-    if not data:
-        data = {"pools": [], "next_id": 1}
-
-    pools = data.get("pools", [])
-    next_id = data.get("next_id", 1)
-
-    new_pool = {
-        "id": f"pool_{next_id:03d}",
-        "name": name,
-        "total_amount": total_amount,
-        "distribution_rules": distribution_rules,
-        "created_at": datetime.now().strftime("%Y-%m-%d")
-    }
+    with locked("bonus_pools.json"):
+        data = load_json("bonus_pools.json")
+        if not data:
+            data = {"pools": [], "next_id": 1}
+
+        pools = data.get("pools", [])
+        next_id = data.get("next_id", 1)
+
+        new_pool = {
+            "id": f"pool_{next_id:03d}",
+            "name": name,
+            "total_amount": total_amount,
+            "distribution_rules": distribution_rules,
+            "created_at": datetime.now().strftime("%Y-%m-%d")
+        }
 
-    pools.append(new_pool)
-    data["pools"] = pools
-    data["next_id"] = next_id + 1
+        pools.append(new_pool)
+        data["pools"] = pools
+        data["next_id"] = next_id + 1
 
-    save_json("bonus_pools.json", data)
-    print(f"[添加] 新增奖金池: {name}")
-    return new_pool
+        save_json("bonus_pools.json", data)
+        print(f"[添加] 新增奖金池: {name}")
+        return new_pool
 
 
 def update_bonus_pool(pool_id: str, updates: dict) -> bool:
     """更新奖金池"""
-    data = load_json("bonus_pools.json")
-    if not data:
-        return False
-
-    pools = data.get("pools", [])
-
-    for pool in pools:
-        if pool["id"] == pool_id:
-            pool.update(updates)
-            pool["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            save_json("bonus_pools.json", data)
-            print(f"[更新] 已更新奖金池: {pool['name']}")
-            return True
+    pool = _update_record("bonus_pools.json", pool_id,
+                          dict(updates, updated_at=datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    if pool:
+        print(f"[更新] 已更新奖金池: {pool['name']}")
+        return True
 
     return False
 
 
 def delete_bonus_pool(pool_id: str) -> bool:
     """删除奖金池"""
-    data = load_json("bonus_pools.json")
-    if not data:
-        return False
-
-    pools = data.get("pools", [])
-
-    for i, pool in enumerate(pools):
-        if pool["id"] == pool_id:
-            deleted = pools.pop(i)
-            save_json("bonus_pools.json", data)
-            print(f"[删除] 已删除奖金池: {deleted['name']}")
-            return True
+    deleted = _delete_record("bonus_pools.json", pool_id)
+    if deleted:
+        print(f"[删除] 已删除奖金池: {deleted['name']}")
+        return True
 
     return False
 
@@ -886,8 +1252,6 @@ def get_employee_threshold(emp_id: str, region_id: str) -> float:
     获取员工在指定区域的达标线
     优先级：员工自定义 > 角色倍率 > 区域默认值
     """
-    from app.data_manager import get_employees, get_role_by_id, get_region_by_id
-
     # 获取区域默认达标线
     region = get_region_by_id(region_id)
     if not region:
@@ -896,8 +1260,7 @@ def get_employee_threshold(emp_id: str, region_id: str) -> float:
     base_threshold = region.get("threshold", 30000)
 
     # 查找员工
-    employees = get_employees()
-    emp = next((e for e in employees if e["id"] == emp_id), None)
+    emp = get_employee_by_id(emp_id)
     if not emp:
         return base_threshold
 
@@ -0,0 +1,437 @@
+"""
+绩效明细列式存储 - 每个期间一个列式文件 + 索引
+版本: 1.0.0
+
+原来导入的每条 ERP 明细都以字典追加到 performance.json 的 raw_details 里，
+文件越来越大，而计算页面每次读取 performance.json 只为了列出期间，
+却要解析所有历史明细。现在改为：
+
+    data/raw_details/index.json              索引：期间 → 文件、格式、行数、各员工所在行区间
+    data/raw_details/<期间>_<哈希>.parquet  该期间的明细（按员工ID排序后按列存储）
+
+- 安装了 pyarrow 时用 Parquet 格式（按列读取、按员工过滤时可跳过无关的行组）
+- 未安装时退回 NumPy 压缩格式 .npz（同样只解压需要的列）
+- 穿透查询只读取所需期间的文件和所需的列，按员工查询用索引中的行区间切片
+- 导入时用 PeriodDetailWriter 分块写入：明细超过 SPILL_ROWS 行后按员工分桶追加到暂存文件，
+  提交时逐桶补上员工ID、排序后写出，同一员工的明细仍然连续存放，
+  内存中最多只有 SPILL_ROWS 行或一个桶的明细，不随导入文件的行数增长
+
+首次访问时如果 performance.json 中还有 raw_details，会自动按期间迁移出来。
+"""
+__version__ = "1.0.0"
+
+import hashlib
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from app import data_manager
+from app.data_manager import load_json, locked, save_json
+
+DETAILS_DIR = "raw_details"
+INDEX_FILE = f"{DETAILS_DIR}/index.json"
+
+TEXT_COLUMNS = ('period', 'employee_id', 'employee_name', 'order_no', 'customer',
+                'process', 'business_type', 'item', 'register_time')
+NUMBER_COLUMNS = ('quantity', 'score')
+DETAIL_COLUMNS = TEXT_COLUMNS + NUMBER_COLUMNS
+
+ROW_GROUP_SIZE = 20000
+SPILL_ROWS = 100000          # 明细不超过这个行数时留在内存中，超过后写入暂存文件
+DETAIL_BUCKETS = 64          # 暂存时按员工分桶的数量（提交时逐桶排序写出）
+STAGING_DIR = f"{DETAILS_DIR}/.staging"
+STAGING_MAX_AGE = 24 * 3600  # 超过这个秒数的暂存目录视为中断导入留下的，自动清理
+
+
+def _has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _file_name(period: str, fmt: str) -> str:
+    """期间 → 明细文件名（保留可读部分，加短哈希避免重名）"""
+    readable = re.sub(r"[^\w\-]", "_", period)[:40]
+    digest = hashlib.md5(period.encode("utf-8")).hexdigest()[:8]
+    return f"{DETAILS_DIR}/{readable}_{digest}.{fmt}"
+
+
+def _load_index() -> dict:
+    index = load_json(INDEX_FILE)
+    index.setdefault("periods", {})
+    return index
+
+
+def _to_frame(records: list) -> pd.DataFrame:
+    """明细记录 → 固定列的 DataFrame（保持原顺序）"""
+    df = pd.DataFrame.from_records(records)
+    for col in TEXT_COLUMNS:
+        df[col] = df[col].fillna('').astype(str) if col in df else ''
+    for col in NUMBER_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(float) if col in df else 0.0
+    return df[list(DETAIL_COLUMNS)]
+
+
+def _employee_ranges(df: pd.DataFrame, offset: int = 0) -> dict:
+    """员工ID → [起始行, 结束行)（数据已按员工排序，每个员工的明细连续存放）"""
+    ids = df['employee_id'].to_numpy()
+    if len(ids) == 0:
+        return {}
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+    stops = np.r_[starts[1:], len(ids)]
+    return {str(ids[s]): [int(s) + offset, int(e) + offset] for s, e in zip(starts, stops)}
+
+
+def _read_pickles(path):
+    """依次读出追加写入同一文件的多个 pickle 对象"""
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def _write_npy(zf: zipfile.ZipFile, name: str, dtype, length: int, parts):
+    """把分段的一维数组写成 npz 中的一个 .npy 成员（与 np.savez 的格式相同）"""
+    dtype = np.dtype(dtype)
+    with zf.open(f"{name}.npy", 'w', force_zip64=True) as fh:
+        np.lib.format.write_array_header_1_0(fh, {
+            'descr': np.lib.format.dtype_to_descr(dtype),
+            'fortran_order': False,
+            'shape': (length,),
+        })
+        for part in parts:
+            fh.write(np.asarray(part, dtype=dtype).tobytes())
+
+
+class PeriodDetailWriter:
+    """
+    分块写入一个期间的明细，commit() 时替换该期间原有的明细
+
+        writer = PeriodDetailWriter("2025-12")
+        summarize_erp_file(f, "2025-12", detail_sink=writer.append)
+        writer.commit({姓名: 员工ID})
+
+    append 的明细可以还没有 employee_id（导入时新员工在汇总之后才创建），
+    提交时按姓名补上。未提交就放弃时调用 abort()（或用 with 语句自动放弃）。
+
+    和其他数据一起提交时先 prepare()：耗时的写出在临时文件中完成，
+    其他数据保存成功后再 commit()，只剩替换文件和更新索引；
+    中途失败时 abort()，该期间原有的明细不受影响
+    """
+
+    def __init__(self, period: str):
+        self.period = period
+        self.row_count = 0
+        self._pending = []  # 还没有写入暂存文件的明细块
+        self._pending_rows = 0
+        self._dir = None    # 暂存目录（明细超过 SPILL_ROWS 行时才创建）
+        self._prepared = None  # prepare() 写好的 (临时文件, 文件名, 格式, 员工行范围)
+
+    def append(self, records: list):
+        """追加一块明细（超过 SPILL_ROWS 行后按员工分桶写入暂存文件）"""
+        if not records:
+            return
+        df = _to_frame(records)
+        self.row_count += len(df)
+        if self._dir is None and self._pending_rows + len(df) <= SPILL_ROWS:
+            self._pending.append(df)
+            self._pending_rows += len(df)
+            return
+
+        if self._dir is None:
+            root = data_manager.DATA_DIR / STAGING_DIR
+            root.mkdir(parents=True, exist_ok=True)
+            _clean_stale_staging(root)
+            self._dir = tempfile.mkdtemp(prefix="import_", dir=root)
+            for pending in self._pending:
+                self._spill(pending)
+            self._pending = []
+        self._spill(df)
+
+    def _spill(self, df: pd.DataFrame):
+        """按员工分桶追加到暂存文件"""
+        # 同一员工必须落在同一个桶：已有员工ID时按ID，否则按姓名（提交时姓名 → ID 一一对应）
+        keys = df['employee_id'].where(df['employee_id'] != '', df['employee_name'])
+        buckets = pd.util.hash_array(keys.to_numpy(dtype=object)) % DETAIL_BUCKETS
+        for bucket, part in df.groupby(buckets, sort=False):
+            with open(os.path.join(self._dir, f"{bucket:03d}.pkl"), 'ab') as f:
+                pickle.dump({c: part[c].to_numpy() for c in DETAIL_COLUMNS}, f,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _buckets(self):
+        """依次取出各桶的明细（没有写入暂存文件时整个期间就是一个桶）"""
+        if self._dir is None:
+            if self._pending:
+                yield pd.concat(self._pending, ignore_index=True)
+            return
+        for name in sorted(os.listdir(self._dir)):
+            if name.endswith(".pkl"):
+                parts = list(_read_pickles(os.path.join(self._dir, name)))
+                yield pd.DataFrame({c: np.concatenate([p[c] for p in parts]) for c in DETAIL_COLUMNS})
+
+    def _sorted_buckets(self, employee_ids: dict):
+        """逐桶读出明细，补上员工ID并按员工ID稳定排序"""
+        for df in self._buckets():
+            if employee_ids:
+                missing = df['employee_id'] == ''
+                df.loc[missing, 'employee_id'] = df.loc[missing, 'employee_name'].map(employee_ids).fillna('')
+            yield df.sort_values('employee_id', kind='stable').reset_index(drop=True)
+
+    def _write_parquet(self, path, employee_ids: dict) -> dict:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        ranges = {}
+        offset = 0
+        batch, batch_rows = [], 0
+
+        def flush():
+            nonlocal writer
+            table = pa.Table.from_pandas(pd.concat(batch, ignore_index=True), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table, row_group_size=ROW_GROUP_SIZE)
+
+        try:
+            # 小桶合并到 ROW_GROUP_SIZE 行左右再写，避免产生很多很小的行组
+            for df in self._sorted_buckets(employee_ids):
+                ranges.update(_employee_ranges(df, offset))
+                offset += len(df)
+                batch.append(df)
+                batch_rows += len(df)
+                if batch_rows >= ROW_GROUP_SIZE:
+                    flush()
+                    batch, batch_rows = [], 0
+            if batch:
+                flush()
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            pd.DataFrame({c: [] for c in DETAIL_COLUMNS}).to_parquet(path, index=False)
+        return ranges
+
+    def _write_npz(self, path, employee_ids: dict) -> dict:
+        # 第一遍：逐桶排序，各列分别追加到暂存文件，同时得到文本列的最大长度
+        ranges = {}
+        offset = 0
+        widths = dict.fromkeys(TEXT_COLUMNS, 1)
+        column_dir = self._dir or tempfile.mkdtemp(prefix="npz_", dir=os.path.dirname(path))
+        column_files = {c: os.path.join(column_dir, f"col_{c}.bin") for c in DETAIL_COLUMNS}
+        handles = {c: open(p, 'ab') for c, p in column_files.items()}
+        try:
+            for df in self._sorted_buckets(employee_ids):
+                for col in DETAIL_COLUMNS:
+                    values = df[col].to_numpy(dtype=str if col in TEXT_COLUMNS else np.float64)
+                    if col in TEXT_COLUMNS:
+                        widths[col] = max(widths[col], values.dtype.itemsize // 4)
+                    pickle.dump(values, handles[col], protocol=pickle.HIGHEST_PROTOCOL)
+                ranges.update(_employee_ranges(df, offset))
+                offset += len(df)
+        finally:
+            for f in handles.values():
+                f.close()
+
+        # 第二遍：每列一个 .npy 成员，分段写入压缩包
+        try:
+            with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+                for col in DETAIL_COLUMNS:
+                    dtype = f"<U{widths[col]}" if col in TEXT_COLUMNS else np.float64
+                    _write_npy(zf, col, dtype, offset, _read_pickles(column_files[col]))
+        finally:
+            if column_dir != self._dir:
+                shutil.rmtree(column_dir, ignore_errors=True)
+        return ranges
+
+    def prepare(self, employee_ids: dict = None):
+        """
+        把明细写出到临时文件（还不替换该期间原有的明细）
+
+        employee_ids 为 姓名 → 员工ID，用于补上还没有 employee_id 的明细
+        """
+        fmt = "parquet" if _has_pyarrow() else "npz"
+        filename = _file_name(self.period, fmt)
+        path = data_manager.DATA_DIR / filename
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # 同一期间同时导入时各自写自己的临时文件；mkstemp 的文件只有本人可读写，改为 0644
+        fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+        os.close(fd)
+        tmp_path = Path(tmp)
+        os.chmod(tmp_path, 0o644)
+
+        try:
+            write = self._write_parquet if fmt == "parquet" else self._write_npz
+            ranges = write(tmp_path, employee_ids or {})
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            self.abort()
+            raise
+        self.abort()
+        self._prepared = (tmp_path, filename, fmt, ranges)
+
+    def commit(self, employee_ids: dict = None) -> int:
+        """
+        替换该期间的明细文件并更新索引，返回保存的行数
+
+        没有调用过 prepare() 时先按 employee_ids 写出
+        """
+        if self._prepared is None:
+            self.prepare(employee_ids)
+        tmp_path, filename, fmt, ranges = self._prepared
+        self._prepared = None
+        try:
+            os.replace(tmp_path, data_manager.DATA_DIR / filename)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        with locked(INDEX_FILE):
+            index = _load_index()
+            old = index["periods"].pop(self.period, None)
+            index["periods"][self.period] = {
+                "file": filename,
+                "format": fmt,
+                "row_count": self.row_count,
+                "employees": ranges,
+            }
+            save_json(INDEX_FILE, index, backup=False)
+
+        # 格式变化时（如新装了 pyarrow）删除旧文件
+        if old and old["file"] != filename:
+            (data_manager.DATA_DIR / old["file"]).unlink(missing_ok=True)
+
+        print(f"[明细] 已保存 {self.period} 的明细 {self.row_count} 条（{fmt}）")
+        return self.row_count
+
+    def abort(self):
+        """放弃写入，删除暂存文件和 prepare() 写好的临时文件"""
+        self._pending = []
+        if self._prepared is not None:
+            self._prepared[0].unlink(missing_ok=True)
+            self._prepared = None
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.abort()
+
+
+def _clean_stale_staging(root):
+    """删除中断的导入留下的暂存目录"""
+    cutoff = time.time() - STAGING_MAX_AGE
+    for entry in os.scandir(root):
+        if entry.is_dir() and entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def save_period_details(period: str, records: list) -> int:
+    """
+    保存（覆盖）一个期间的全部明细，返回保存的行数
+    """
+    with PeriodDetailWriter(period) as writer:
+        writer.append(records)
+        return writer.commit()
+
+
+def delete_period_details(period: str) -> bool:
+    """删除一个期间的明细"""
+    with locked(INDEX_FILE):
+        index = _load_index()
+        entry = index["periods"].pop(period, None)
+        if entry is None:
+            return False
+        save_json(INDEX_FILE, index, backup=False)
+    (data_manager.DATA_DIR / entry["file"]).unlink(missing_ok=True)
+    return True
+
+
+def list_detail_periods() -> dict:
+    """获取有明细的期间及行数：{期间: 行数}"""
+    migrate_json_raw_details()
+    return {period: entry["row_count"] for period, entry in _load_index()["periods"].items()}
+
+
+def _read_period(entry: dict, columns: list, employee_id: str = None) -> pd.DataFrame:
+    path = data_manager.DATA_DIR / entry["file"]
+    if employee_id is not None:
+        rows = entry["employees"].get(employee_id)
+        if rows is None:
+            return pd.DataFrame({c: [] for c in columns})
+
+    if entry["format"] == "parquet":
+        filters = [('employee_id', '==', employee_id)] if employee_id is not None else None
+        return pd.read_parquet(path, columns=columns, filters=filters)
+
+    with np.load(path) as data:
+        if employee_id is None:
+            return pd.DataFrame({c: data[c] for c in columns})
+        start, stop = rows
+        return pd.DataFrame({c: data[c][start:stop] for c in columns})
+
+
+def load_details(period: str = None, employee_id: str = None, columns: list = None) -> pd.DataFrame:
+    """
+    穿透查询明细
+
+    period 为空时查询所有期间；employee_id 为空时返回该期间全部员工；
+    columns 为需要的列（默认全部列），只读取这些列。
+    """
+    migrate_json_raw_details()
+    columns = list(columns or DETAIL_COLUMNS)
+    unknown = [c for c in columns if c not in DETAIL_COLUMNS]
+    if unknown:
+        raise ValueError(f"未知的明细列: {', '.join(unknown)}")
+
+    periods = _load_index()["periods"]
+    if period is not None:
+        entries = [periods[period]] if period in periods else []
+    else:
+        entries = list(periods.values())
+
+    frames = [_read_period(entry, columns, employee_id) for entry in entries]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame({c: [] for c in columns})
+    return pd.concat(frames, ignore_index=True)
+
+
+def migrate_json_raw_details() -> int:
+    """
+    把 performance.json 中的 raw_details 按期间迁移到列式存储
+
+    返回迁移的期间数；performance.json 中已没有 raw_details 时返回 0
+    """
+    with locked("performance.json"):
+        perf_data = load_json("performance.json")
+        if "raw_details" not in perf_data:
+            return 0
+
+        by_period = {}
+        for detail in perf_data["raw_details"]:
+            by_period.setdefault(detail.get("period", ""), []).append(detail)
+
+        print(f"[迁移] 正在迁移绩效明细，共 {len(perf_data['raw_details'])} 条...")
+        for period, details in by_period.items():
+            save_period_details(period, details)
+
+        # 原文件会先备份，再去掉 raw_details
+        perf_data.pop("raw_details")
+        save_json("performance.json", perf_data)
+        print(f"[迁移] 绩效明细迁移完成，共 {len(by_period)} 个期间")
+        return len(by_period)
@@ -0,0 +1,25 @@
+# 绩效计算引擎
+# 各子模块按需导入：只用到阶梯规则、排名时不会加载 NumPy
+import importlib
+
+_EXPORTS = {
+    "calculate_batch": "app.engine.batch",
+    "LadderRuleError": "app.engine.ladder",
+    "validate_ladder_rules": "app.engine.ladder",
+    "compile_ladder": "app.engine.ladder",
+    "compile_region_ladders": "app.engine.ladder",
+    "calculate_ranking_bonus": "app.engine.ranking",
+    "IncrementalCalculator": "app.engine.incremental",
+    "ProfileTable": "app.engine.profiles",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'app.engine' has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
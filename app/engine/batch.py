@@ -0,0 +1,263 @@
+"""
+批量计算引擎 - 用 NumPy 矩阵一次算完整个期间
+版本: 1.0.0
+
+与 app.calculation.calculate_employee_salary 逐人计算的结果完全一致，
+区别在于把整期数据组织成矩阵后按列运算：
+- 绩效分矩阵 scores[员工, 区域]
+- 达标线矩阵 thresholds[员工, 区域]
+- 技能指派矩阵 passed[员工, 技能]（已通过考核的指派）
+在岗判断、技能工资、阶梯奖金、区域小计都是整列的数组运算，
+不再对每个员工、每个区域重新筛选技能和查找角色。
+
+注意：浮点数的累加顺序与逐人计算保持一致（按区域、按技能、按阶梯档位
+依次相加），所以四舍五入后的金额逐分相同。另外用一组布尔矩阵记录每个金额
+在逐人计算中是否会变成小数，输出时还原成相同的 int/float 类型，
+保存到历史记录的 JSON 也逐字相同。
+"""
+__version__ = "1.0.0"
+
+import numpy as np
+
+from app.engine.ladder import compile_region_ladders
+from app.engine.profiles import ProfileTable
+
+
+def _to_python(values: list, is_float: list) -> list:
+    """把矩阵的一行还原成 Python 数值，逐人计算中是整数的位置转回 int"""
+    return [v if f else int(v) for v, f in zip(values, is_float)]
+
+
+def calculate_batch(period_records: list, regions: list, skills: list, emp_skills: list,
+                    employees: list, roles: list, external_data_map: dict = None,
+                    ladders: dict = None, profiles: ProfileTable = None) -> list:
+    """
+    批量计算一个期间所有员工的绩效工资（不含排名奖金）
+
+    参数与 do_calculate 中逐人计算所用的数据相同，roles 为全部角色列表，
+    external_data_map 为 员工ID → 外部数据，
+    ladders 为 compile_region_ladders 编译好的阶梯规则（不传则在这里编译），
+    profiles 为同一份员工、角色、区域建好的 ProfileTable（不传则在这里建表）。
+    返回的每条结果与 calculate_employee_salary 的返回格式一致，顺序与 period_records 相同。
+    """
+    external_data_map = external_data_map or {}
+    if ladders is None:
+        ladders = compile_region_ladders(regions)
+    n_emp = len(period_records)
+    if n_emp == 0:
+        return []
+
+    if profiles is None:
+        profiles = ProfileTable(employees, roles, regions)
+    region_ids = [r["id"] for r in regions]
+
+    # ---------- 每个员工的角色信息（查档案表） ----------
+    emp_ids = []
+    emp_profiles = []
+    threshold_rows = []
+
+    for record in period_records:
+        emp_id = record["employee_id"]
+        profile = profiles.get(emp_id)
+        emp_ids.append(emp_id)
+        emp_profiles.append(profile)
+        threshold_rows.append(profile.thresholds)
+    income_types_list = [p.income_types for p in emp_profiles]
+
+    scores_rows = []
+    for record in period_records:
+        scores = record.get("scores", {})
+        scores_rows.append([scores.get(rid, 0) for rid in region_ids])
+
+    score_mat = np.array(scores_rows, dtype=np.float64).reshape(n_emp, len(regions))
+    threshold_mat = np.array(threshold_rows, dtype=np.float64).reshape(n_emp, len(regions))
+    on_duty_mat = score_mat >= threshold_mat
+
+    has_skill_salary = np.array(["skill_salary" in t for t in income_types_list], dtype=bool)
+    has_ladder = np.array(["ladder_bonus" in t for t in income_types_list], dtype=bool)
+
+    # ---------- 技能指派矩阵 ----------
+    emp_row = {}
+    for i, emp_id in enumerate(emp_ids):
+        emp_row.setdefault(emp_id, []).append(i)
+
+    # 每个 (员工, 技能) 取第一条指派，与逐人计算的 next(...) 一致
+    first_assignment = {}
+    for es in emp_skills:
+        if es["employee_id"] in emp_row:
+            first_assignment.setdefault((es["employee_id"], es["skill_id"]), es)
+
+    region_pos = {rid: i for i, rid in enumerate(region_ids)}
+    skill_cols = [s for s in skills if s.get("region_id") in region_pos]
+    skill_col_index = {}
+    for k, skill in enumerate(skill_cols):
+        skill_col_index.setdefault(skill["id"], []).append(k)
+
+    n_skill = len(skill_cols)
+    off_prices = [s.get("salary_off_duty", 100) for s in skill_cols]
+    default_on = [s.get("salary_on_duty", 200) for s in skill_cols]
+    passed_mat = np.zeros((n_emp, n_skill), dtype=bool)
+    on_price_mat = np.tile(np.array(default_on, dtype=np.float64), (n_emp, 1))
+    on_float_mat = np.tile(np.array([isinstance(p, float) for p in default_on], dtype=bool), (n_emp, 1))
+    custom_prices = {}  # (行, 技能列) → 自定义在岗价格
+    # 每个员工通过考核的技能列号（按技能顺序），用于生成技能明细
+    passed_cols = [[] for _ in range(n_emp)]
+
+    for (emp_id, skill_id), es in first_assignment.items():
+        if not es.get("passed_exam", False):
+            continue
+        for k in skill_col_index.get(skill_id, []):
+            price = None
+            if not es.get("use_system_price", True):
+                price = es.get("custom_price_on_duty") or default_on[k]
+            for i in emp_row[emp_id]:
+                passed_mat[i, k] = True
+                passed_cols[i].append(k)
+                if price is not None:
+                    on_price_mat[i, k] = price
+                    on_float_mat[i, k] = isinstance(price, float)
+                    custom_prices[(i, k)] = price
+
+    off_price_vec = np.array(off_prices, dtype=np.float64)
+    off_float_vec = np.array([isinstance(p, float) for p in off_prices], dtype=bool)
+
+    # ---------- 按区域整列计算 ----------
+    n_region = len(regions)
+    skill_salary_mat = np.zeros((n_emp, n_region), dtype=np.float64)
+    skill_float_mat = np.zeros((n_emp, n_region), dtype=bool)
+    ladder_mat = np.zeros((n_emp, n_region), dtype=np.float64)
+    ladder_float_mat = np.zeros((n_emp, n_region), dtype=bool)
+    region_skill_cols = {}
+    for k, skill in enumerate(skill_cols):
+        region_skill_cols.setdefault(region_pos[skill["region_id"]], []).append(k)
+
+    for r, region in enumerate(regions):
+        on_duty = on_duty_mat[:, r]
+        salary = skill_salary_mat[:, r]
+        salary_float = skill_float_mat[:, r]
+        for k in region_skill_cols.get(r, []):
+            paid = passed_mat[:, k] & has_skill_salary
+            price = np.where(on_duty, on_price_mat[:, k], off_price_vec[k])
+            salary += np.where(paid, price, 0.0)
+            salary_float |= paid & np.where(on_duty, on_float_mat[:, k], off_float_vec[k])
+
+        ladder, ladder_float = ladders[region["id"]].bonus_column(score_mat[:, r])
+        # 四舍五入用 Python 的 round，保证与逐人计算逐分一致
+        ladder_mat[:, r] = [round(v, 2) for v in np.where(has_ladder, ladder, 0.0).tolist()]
+        ladder_float_mat[:, r] = ladder_float & has_ladder
+
+    region_total_mat = skill_salary_mat + ladder_mat
+    region_float_mat = skill_float_mat | ladder_float_mat
+
+    total_vec = np.zeros(n_emp, dtype=np.float64)
+    for r in range(n_region):
+        total_vec = total_vec + region_total_mat[:, r]
+    total_float = region_float_mat.any(axis=1).tolist()
+
+    # ---------- 额外收入 ----------
+    extra_list = []
+    for i, emp_id in enumerate(emp_ids):
+        income_types = income_types_list[i]
+        role_settings = emp_profiles[i].settings
+        external_data = external_data_map.get(emp_id)
+        extra_income = {}
+        amounts = []
+
+        if "order_bonus" in income_types and external_data:
+            order_count = external_data.get("order_count", 0)
+            bonus_per_unit = role_settings.get("order_bonus_per_unit", 2)
+            order_bonus = order_count * bonus_per_unit
+            extra_income["order_bonus"] = {
+                "name": "开单奖励",
+                "count": order_count,
+                "unit_price": bonus_per_unit,
+                "amount": order_bonus
+            }
+            amounts.append(order_bonus)
+
+        if "management_allowance" in income_types:
+            allowance = role_settings.get("management_allowance", 0)
+            if allowance > 0:
+                extra_income["management_allowance"] = {
+                    "name": "管理津贴",
+                    "amount": allowance
+                }
+                amounts.append(allowance)
+
+        if "revenue_commission" in income_types and external_data:
+            revenue = external_data.get("store_revenue", 0)
+            rate = role_settings.get("commission_rate", 0.01)
+            commission = revenue * rate
+            extra_income["revenue_commission"] = {
+                "name": "业绩提成",
+                "revenue": revenue,
+                "rate": rate,
+                "amount": commission
+            }
+            amounts.append(commission)
+
+        extra_list.append(extra_income)
+        if amounts:
+            # 按收入项顺序依次累加，与逐人计算一致
+            subtotal = total_vec[i].item()
+            for amount in amounts:
+                subtotal += amount
+                total_float[i] = total_float[i] or isinstance(amount, float)
+            total_vec[i] = subtotal
+
+    # ---------- 组装结果 ----------
+    scores_out = scores_rows
+    on_duty_out = on_duty_mat.tolist()
+    skill_salary_out = skill_salary_mat.tolist()
+    skill_float_out = skill_float_mat.tolist()
+    ladder_out = ladder_mat.tolist()
+    ladder_float_out = ladder_float_mat.tolist()
+    region_total_out = region_total_mat.tolist()
+    region_float_out = region_float_mat.tolist()
+    total_out = total_vec.tolist()
+
+    results = []
+    for i, record in enumerate(period_records):
+        details_by_region = {}
+        if has_skill_salary[i]:
+            for k in sorted(passed_cols[i]):
+                r = region_pos[skill_cols[k]["region_id"]]
+                on_duty = on_duty_out[i][r]
+                if on_duty:
+                    salary = custom_prices.get((i, k), default_on[k])
+                else:
+                    salary = off_prices[k]
+                details_by_region.setdefault(r, []).append({
+                    "name": skill_cols[k]["name"],
+                    "on_duty": on_duty,
+                    "salary": salary
+                })
+
+        skill_salary_row = _to_python(skill_salary_out[i], skill_float_out[i])
+        ladder_row = _to_python(ladder_out[i], ladder_float_out[i])
+        region_total_row = _to_python(region_total_out[i], region_float_out[i])
+
+        region_results = {}
+        for r, region in enumerate(regions):
+            region_results[region["id"]] = {
+                "name": region["name"],
+                "score": scores_out[i][r],
+                "threshold": threshold_rows[i][r],
+                "is_on_duty": on_duty_out[i][r],
+                "skill_salary": skill_salary_row[r],
+                "skill_details": details_by_region.get(r, []),
+                "ladder_bonus": ladder_row[r],
+                "total": region_total_row[r]
+            }
+
+        results.append({
+            "employee_id": record["employee_id"],
+            "employee_name": record["employee_name"],
+            "role_name": emp_profiles[i].role_name,
+            "regions": region_results,
+            "mid_detail": record.get("mid_detail", {"drawing": 0, "digital": 0}) or {"drawing": 0, "digital": 0},
+            "extra_income": extra_list[i],
+            "total_salary": round(total_out[i], 2) if total_float[i] else int(total_out[i])
+        })
+
+    return results
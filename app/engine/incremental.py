@@ -0,0 +1,244 @@
+"""
+增量计算 - 配置修改后只重算受影响的员工和奖金池
+版本: 1.0.0
+
+IncrementalCalculator 保存上一次计算的输入和结果，以及依赖关系：
+- 区域（阶梯规则、达标线） → 所有员工（区域变化时整期重算）
+- 技能 → 指派了该技能的员工
+- 角色 → 该角色的员工
+- 员工 → 本人的绩效记录、员工信息、技能指派、外部数据
+再次计算时先比较输入，只对受影响的员工调用批量引擎重算基础工资；
+奖金池只有在配置变化、参与排名的员工分数或资格变化时才重新排名，
+其余奖金池沿用上次的获奖名单。结果与整期重算完全一致。
+
+每次计算后 last_report 记录本次重算的范围和结果有变化的员工，
+便于在调整方案时快速看到影响。
+"""
+__version__ = "1.0.0"
+
+from app.engine.batch import calculate_batch
+from app.engine.ladder import compile_region_ladders
+from app.engine.ranking import RankingIndex, is_eligible, pool_is_active, ranking_score
+
+
+def _first_map(items: list, key_func) -> dict:
+    mapping = {}
+    for item in items:
+        mapping.setdefault(key_func(item), item)
+    return mapping
+
+
+def _group_by_employee(emp_skills: list) -> dict:
+    groups = {}
+    for es in emp_skills:
+        groups.setdefault(es["employee_id"], []).append(es)
+    return groups
+
+
+def _changed_keys(old: dict, new: dict) -> set:
+    """两个映射中新增、删除或内容不同的键"""
+    return {k for k in old.keys() | new.keys() if old.get(k) != new.get(k)}
+
+
+def _fresh_result(base: dict) -> dict:
+    """基础结果的副本（排名奖金只会修改额外收入和总工资）"""
+    result = dict(base)
+    result["extra_income"] = dict(base["extra_income"])
+    return result
+
+
+class _Snapshot:
+    """一次计算的全部输入，按实体建立映射便于比较"""
+
+    def __init__(self, period, period_records, regions, skills, emp_skills,
+                 employees, roles, bonus_pools, external_data_map):
+        self.period = period
+        self.records = period_records
+        self.record_ids = [r["employee_id"] for r in period_records]
+        self.regions = regions
+        self.skill_ids = [s["id"] for s in skills]
+        self.skills = _first_map(skills, lambda s: s["id"])
+        self.emp_skills = _group_by_employee(emp_skills)
+        self.employees = _first_map(employees, lambda e: e["id"])
+        self.roles = _first_map(roles, lambda r: r["id"])
+        self.bonus_pools = bonus_pools
+        self.external = external_data_map
+
+
+class IncrementalCalculator:
+    """保存上一次计算状态的计算器（每个会话一个）"""
+
+    def __init__(self):
+        self._snapshot = None
+        self._base = None         # 每条绩效记录的基础结果（不含排名奖金），顺序同绩效记录
+        self._allocations = None  # 每个奖金池的获奖名单
+        self._results = None      # 上一次的最终结果
+        self.last_report = None
+
+    def reset(self):
+        """丢弃保存的状态，下次计算整期重算"""
+        self.__init__()
+
+    # ---------- 依赖分析 ----------
+
+    def _needs_full(self, old: _Snapshot, new: _Snapshot) -> str:
+        """返回需要整期重算的原因，可以增量计算时返回空字符串"""
+        if old is None:
+            return "首次计算"
+        if old.period != new.period:
+            return "期间变化"
+        if old.record_ids != new.record_ids:
+            return "绩效记录的员工变化"
+        if old.regions != new.regions:
+            return "区域配置变化"
+        common = set(old.skill_ids) & set(new.skill_ids)
+        if [s for s in old.skill_ids if s in common] != [s for s in new.skill_ids if s in common]:
+            return "技能顺序变化"
+        return ""
+
+    def _affected_employees(self, old: _Snapshot, new: _Snapshot) -> set:
+        affected = set()
+
+        # 员工 → 本人的绩效记录、员工信息、技能指派、外部数据
+        for old_rec, new_rec in zip(old.records, new.records):
+            if old_rec != new_rec:
+                affected.add(new_rec["employee_id"])
+        affected |= _changed_keys(old.employees, new.employees)
+        affected |= _changed_keys(old.emp_skills, new.emp_skills)
+        affected |= _changed_keys(old.external, new.external)
+
+        # 角色 → 该角色的员工（修改前后的角色都算）
+        changed_roles = _changed_keys(old.roles, new.roles)
+        if changed_roles:
+            for emps in (old.employees, new.employees):
+                affected |= {emp_id for emp_id, emp in emps.items() if emp.get("role_id") in changed_roles}
+
+        # 技能 → 指派了该技能的员工
+        changed_skills = _changed_keys(old.skills, new.skills)
+        if changed_skills:
+            for groups in (old.emp_skills, new.emp_skills):
+                for emp_id, items in groups.items():
+                    if any(es["skill_id"] in changed_skills for es in items):
+                        affected.add(emp_id)
+
+        return affected & set(new.record_ids)
+
+    def _dirty_pools(self, old: _Snapshot, new: _Snapshot, old_base: list, new_base: list,
+                     rows: list) -> list:
+        """需要重新排名的奖金池（按奖金池顺序的布尔列表）"""
+        pools = new.bonus_pools
+        if len(pools) != len(old.bonus_pools):
+            return [True] * len(pools)
+
+        dirty = []
+        earlier_changed = False
+        for old_pool, pool in zip(old.bonus_pools, pools):
+            if old_pool != pool:
+                is_dirty = True
+            elif not pool_is_active(pool):
+                is_dirty = False
+            elif pool.get("ranking_basis", "total_score") == "total_salary" and earlier_changed:
+                # 按工资总额排名时，前面奖金池的分配会影响这里的分数
+                is_dirty = True
+            else:
+                basis = pool.get("ranking_basis", "total_score")
+                filter_roles = pool.get("filter_roles", [])
+                is_dirty = False
+                for i in rows:
+                    emp_id = new.record_ids[i]
+                    old_in = is_eligible(old.employees.get(emp_id), filter_roles)
+                    new_in = is_eligible(new.employees.get(emp_id), filter_roles)
+                    if old_in != new_in or (new_in and ranking_score(old_base[i], basis)
+                                            != ranking_score(new_base[i], basis)):
+                        is_dirty = True
+                        break
+            dirty.append(is_dirty)
+            earlier_changed = earlier_changed or is_dirty
+        return dirty
+
+    # ---------- 计算 ----------
+
+    def calculate(self, period: str, period_records: list, regions: list, skills: list,
+                  emp_skills: list, employees: list, roles: list, bonus_pools: list,
+                  external_data_map: dict = None, ladders: dict = None) -> list:
+        """
+        计算一个期间（含排名奖金），返回按总工资排序的结果
+
+        与 do_calculate 的结果完全一致；能增量计算时只重算受影响的部分
+        """
+        external_data_map = external_data_map or {}
+        if ladders is None:
+            ladders = compile_region_ladders(regions)
+
+        old = self._snapshot
+        new = _Snapshot(period, period_records, regions, skills, emp_skills,
+                        employees, roles, bonus_pools, external_data_map)
+        full_reason = self._needs_full(old, new)
+
+        if full_reason:
+            rows = list(range(len(period_records)))
+        else:
+            affected = self._affected_employees(old, new)
+            rows = [i for i, emp_id in enumerate(new.record_ids) if emp_id in affected]
+
+        # 只重算受影响的员工（批量引擎逐人独立计算，结果与整期计算相同）
+        row_emp_ids = {new.record_ids[i] for i in rows}
+        recalculated = calculate_batch(
+            [period_records[i] for i in rows], regions, skills,
+            [es for es in emp_skills if es["employee_id"] in row_emp_ids],
+            employees, roles, external_data_map, ladders=ladders
+        )
+        for result in recalculated:
+            result["period"] = period
+
+        old_base = self._base
+        if full_reason:
+            base = recalculated
+            dirty = [True] * len(bonus_pools)
+        else:
+            base = list(old_base)
+            for i, result in zip(rows, recalculated):
+                base[i] = result
+            dirty = self._dirty_pools(old, new, old_base, base, rows)
+
+        # 奖金池按顺序分配：需要重新排名的重新排名，其余沿用上次的获奖名单
+        results = [_fresh_result(b) for b in base]
+        index = RankingIndex(results, new.employees)
+        allocations = []
+        for k, pool in enumerate(bonus_pools):
+            if dirty[k]:
+                pool_allocations = index.rank(pool)
+            else:
+                pool_allocations = self._allocations[k]
+            index.apply(pool_allocations)
+            allocations.append(pool_allocations)
+
+        # 变化报告（与上一次的最终结果比较）
+        changes = []
+        if self._results is not None and not full_reason:
+            for old_result, result in zip(self._results, results):
+                if old_result != result:
+                    changes.append({
+                        "employee_id": result["employee_id"],
+                        "employee_name": result["employee_name"],
+                        "old_total": old_result["total_salary"],
+                        "new_total": result["total_salary"],
+                        "delta": round(result["total_salary"] - old_result["total_salary"], 2),
+                    })
+
+        self._snapshot = new
+        self._base = base
+        self._allocations = allocations
+        self._results = results
+        self.last_report = {
+            "mode": "full" if full_reason else "incremental",
+            "reason": full_reason,
+            "recalculated": len(rows),
+            "total": len(period_records),
+            "pools_reranked": [p.get("name", "排名奖金") for p, d in zip(bonus_pools, dirty)
+                               if d and pool_is_active(p)],
+            "changes": changes,
+        }
+
+        # 按总工资排序（同额保持绩效记录的顺序）
+        return sorted(results, key=lambda x: x["total_salary"], reverse=True)
@@ -0,0 +1,168 @@
+"""
+阶梯规则编译器 - 把区域的阶梯规则预编译成查找表
+版本: 1.0.0
+
+原来的 calculate_ladder_bonus 对每个员工、每个区域都从第一档开始逐条累加。
+这里把一个区域的规则编译一次：
+- mins / maxs / bonuses：按下限排好的断点数组
+- prefix：前缀累加奖金，prefix[i] = 前 i 档整档奖金之和
+查分时用二分查找（整列用 numpy.searchsorted）定位所在档位，
+再加上前缀和与一次按比例插值即可。
+
+编译时会校验规则：下限必须递增、不能重叠、下限不能大于上限，
+不合法时抛出 LadderRuleError。
+"""
+__version__ = "1.0.0"
+
+import threading
+from bisect import bisect_left
+from functools import lru_cache
+
+
+class LadderRuleError(ValueError):
+    """阶梯规则不合法（未排序、区间重叠或下限大于上限）"""
+
+
+def validate_ladder_rules(ladder_rules: list) -> list:
+    """
+    校验阶梯规则，返回问题描述列表（为空表示规则合法）
+    """
+    problems = []
+    prev = None
+    for i, rule in enumerate(ladder_rules, start=1):
+        min_val = rule.get("min", 0)
+        max_val = rule.get("max", 0)
+        if min_val > max_val:
+            problems.append(f"第{i}档的下限 {min_val:,} 大于上限 {max_val:,}")
+        if prev is not None:
+            prev_min, prev_max = prev
+            if min_val < prev_min:
+                problems.append(f"第{i}档的下限 {min_val:,} 小于第{i - 1}档的下限 {prev_min:,}，规则未按从小到大排列")
+            elif min_val < prev_max:
+                problems.append(f"第{i}档（{min_val:,}-{max_val:,}）与第{i - 1}档（{prev_min:,}-{prev_max:,}）区间重叠")
+        prev = (min_val, max_val)
+    return problems
+
+
+class CompiledLadder:
+    """编译后的阶梯规则（只读）"""
+
+    def __init__(self, rules: tuple):
+        self.mins = [r[0] for r in rules]
+        self.maxs = [r[1] for r in rules]
+        self.bonuses = [r[2] for r in rules]
+
+        # 前缀和按原来的顺序逐档累加，保证浮点结果与逐条计算一致
+        self.prefix = [0]
+        self.prefix_float = [False]
+        for bonus in self.bonuses:
+            self.prefix.append(self.prefix[-1] + bonus)
+            self.prefix_float.append(self.prefix_float[-1] or isinstance(bonus, float))
+
+        self._arrays = None  # numpy 数组，整列计算时才构建
+
+    def bonus(self, score: float) -> float:
+        """计算单个绩效分的阶梯奖金（已保留两位小数）"""
+        # 下限小于分数的档位数；前 k-1 档一定是整档，第 k 档整档或按比例
+        k = bisect_left(self.mins, score)
+        if k == 0:
+            return 0
+
+        last = k - 1
+        total = self.prefix[last]
+        min_val, max_val, bonus = self.mins[last], self.maxs[last], self.bonuses[last]
+        if score >= max_val:
+            total += bonus
+        elif max_val > min_val:
+            total += bonus * ((score - min_val) / (max_val - min_val))
+
+        return round(total, 2)
+
+    def bonus_column(self, scores):
+        """
+        整列计算阶梯奖金（numpy.searchsorted + 一次插值）
+
+        返回 (未四舍五入的奖金列, 是否为小数列)，供批量引擎使用
+        """
+        import numpy as np
+
+        if self._arrays is None:
+            self._arrays = (
+                np.array(self.mins, dtype=np.float64),
+                np.array(self.maxs, dtype=np.float64),
+                np.array(self.bonuses, dtype=np.float64),
+                np.array(self.prefix, dtype=np.float64),
+                np.array(self.prefix_float, dtype=bool),
+                np.array([isinstance(b, float) for b in self.bonuses], dtype=bool),
+            )
+        mins, maxs, bonuses, prefix, prefix_float, bonus_float = self._arrays
+
+        n = len(scores)
+        if not self.mins:
+            return np.zeros(n, dtype=np.float64), np.zeros(n, dtype=bool)
+
+        k = np.searchsorted(mins, scores, side="left")
+        hit = k > 0
+        last = np.where(hit, k - 1, 0)
+
+        min_val, max_val, bonus = mins[last], maxs[last], bonuses[last]
+        full = hit & (scores >= max_val)
+        partial = hit & ~full & (max_val > min_val)
+
+        total = np.where(hit, prefix[last], 0.0)
+        total = np.where(full, total + bonus, total)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = (scores - min_val) / (max_val - min_val)
+        total = np.where(partial, total + bonus * ratio, total)
+
+        is_float = (hit & prefix_float[last]) | (full & bonus_float[last]) | partial
+        return total, is_float
+
+
+@lru_cache(maxsize=256)
+def _compile(rules: tuple) -> CompiledLadder:
+    problems = validate_ladder_rules([{"min": r[0], "max": r[1], "bonus": r[2]} for r in rules])
+    if problems:
+        raise LadderRuleError("；".join(problems))
+    return CompiledLadder(rules)
+
+
+def rules_key(ladder_rules: list) -> tuple:
+    """规则内容的缓存键（说明文字不影响计算，不参与）"""
+    return tuple((r.get("min", 0), r.get("max", 0), r.get("bonus", 0)) for r in ladder_rules)
+
+
+def compile_ladder(ladder_rules: list) -> CompiledLadder:
+    """编译阶梯规则（按规则内容缓存，同样的规则只编译一次）"""
+    return _compile(rules_key(ladder_rules))
+
+
+# 区域ID → (规则内容键, 编译结果)
+_region_ladders = {}
+_region_lock = threading.Lock()
+
+
+def compile_region_ladders(regions: list) -> dict:
+    """
+    编译所有区域的阶梯规则，返回 区域ID → CompiledLadder
+
+    每个区域缓存一份编译结果，规则内容变化时才重新编译。
+    任何区域的规则不合法都会抛出 LadderRuleError（信息中带区域名称）。
+    """
+    ladders = {}
+    for region in regions:
+        key = rules_key(region.get("ladder_rules", []))
+        cached = _region_ladders.get(region["id"])
+        if cached is not None and cached[0] == key:
+            ladders[region["id"]] = cached[1]
+            continue
+
+        try:
+            compiled = _compile(key)
+        except LadderRuleError as e:
+            raise LadderRuleError(f"{region.get('name', region['id'])}：{e}") from None
+
+        with _region_lock:
+            _region_ladders[region["id"]] = (key, compiled)
+        ladders[region["id"]] = compiled
+    return ladders
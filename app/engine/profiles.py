@@ -0,0 +1,92 @@
+"""
+员工计算档案 - 每次计算开始时把员工的角色、达标线一次性解析成查找表
+版本: 1.0.0
+
+原来逐人计算时，每个员工的每个区域都要调用 calculate_employee_threshold：
+在员工列表中线性查找员工、再通过 get_role_by_id 查角色；算工资时又查一遍。
+现在按 员工ID → 档案 建表，计算过程中的查找都是一次字典访问：
+- 角色、角色名称、收入类型、角色设置
+- 各区域的个性化达标线（员工自定义 > 角色倍率 > 区域默认值），
+  同一角色、没有自定义的员工共用同一行达标线
+
+逐人计算（app.calculation）、批量引擎、排名奖金都使用这张表，结果与原来逐分相同。
+"""
+__version__ = "1.0.0"
+
+DEFAULT_INCOME_TYPES = ["skill_salary", "ladder_bonus"]
+DEFAULT_THRESHOLD = 30000
+
+
+class EmployeeProfile:
+    """一个员工在本次计算中的角色和达标线（只读）"""
+
+    __slots__ = ("employee", "role", "role_name", "income_types", "settings",
+                 "thresholds", "_region_pos")
+
+    def __init__(self, employee, role, thresholds: list, region_pos: dict):
+        self.employee = employee
+        self.role = role
+        self.role_name = role.get("name", "未指定") if role else "未指定"
+        self.income_types = role.get("income_types", DEFAULT_INCOME_TYPES) if role else DEFAULT_INCOME_TYPES
+        self.settings = role.get("settings", {}) if role else {}
+        self.thresholds = thresholds  # 按区域顺序的达标线
+        self._region_pos = region_pos
+
+    def threshold(self, region_id: str, default: float = DEFAULT_THRESHOLD) -> float:
+        """该员工在某区域的达标线（不在本次计算的区域中时返回 default）"""
+        pos = self._region_pos.get(region_id)
+        return default if pos is None else self.thresholds[pos]
+
+
+def _threshold_row(employee, role, base_row: list, region_ids: list, role_rows: dict) -> list:
+    """达标线：员工自定义 > 角色倍率 > 区域默认值"""
+    if role:
+        row = role_rows.get(role["id"])
+        if row is None:
+            multiplier = role.get("threshold_multiplier", 1.0)
+            row = [base * multiplier for base in base_row]
+            role_rows[role["id"]] = row
+    else:
+        row = base_row
+
+    custom_settings = employee.get("custom_settings", {}) if employee else {}
+    if custom_settings.get("custom_threshold"):
+        custom = custom_settings.get("thresholds", {})
+        overrides = {i: custom[rid] for i, rid in enumerate(region_ids) if custom.get(rid) is not None}
+        if overrides:
+            row = [overrides.get(i, v) for i, v in enumerate(row)]
+    return row
+
+
+class ProfileTable:
+    """
+    员工ID → EmployeeProfile 的查找表
+
+    员工、角色各建一次 id 索引（重复 id 取第一条，与原来 next(...) 线性查找一致），
+    档案在首次查询时生成并缓存；不存在的员工得到没有角色、区域默认达标线的档案
+    """
+
+    def __init__(self, employees: list, roles: list, regions: list):
+        self.employees = {}
+        for emp in employees:
+            self.employees.setdefault(emp["id"], emp)
+        self.roles = {}
+        for role in roles:
+            self.roles.setdefault(role["id"], role)
+
+        self._region_ids = [r["id"] for r in regions]
+        self._region_pos = {}
+        for i, region_id in enumerate(self._region_ids):
+            self._region_pos.setdefault(region_id, i)
+        self._base_row = [r.get("threshold", DEFAULT_THRESHOLD) for r in regions]
+        self._role_rows = {}  # 角色ID → 该角色在各区域的达标线
+        self._profiles = {}
+
+    def get(self, emp_id: str) -> EmployeeProfile:
+        profile = self._profiles.get(emp_id)
+        if profile is None:
+            emp = self.employees.get(emp_id)
+            role = self.roles.get(emp["role_id"]) if emp and emp.get("role_id") else None
+            row = _threshold_row(emp, role, self._base_row, self._region_ids, self._role_rows)
+            profile = self._profiles[emp_id] = EmployeeProfile(emp, role, row, self._region_pos)
+        return profile
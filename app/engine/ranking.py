@@ -0,0 +1,167 @@
+"""
+排名奖金 - 按奖金池配置对计算结果排名并分配奖金
+版本: 1.0.0
+
+拆成两步，便于增量计算时只重新排名受影响的奖金池：
+- rank_pool / RankingIndex.rank：对一个奖金池排名，返回获奖名单（结果序号 + 奖金明细）
+- apply_allocations：把获奖名单加到计算结果上
+
+多个奖金池共用一个 RankingIndex：
+- 员工按角色分组一次，按角色筛选的奖金池只看对应分组
+- 每种排名依据的分数整列只算一次；按工资总额排名时，前面奖金池的
+  获奖者分数会变，只更新这几个人
+- 分配规则最多奖励前 k 名，用 heapq.nlargest 取前 k 名，不对全部员工排序
+
+同分时排在绩效记录中靠前的员工优先（与原来稳定排序的结果相同），
+同样的输入每次排名结果都相同。
+"""
+__version__ = "1.0.0"
+
+import heapq
+
+
+def pool_is_active(pool: dict) -> bool:
+    """奖金池是否参与分配（已启用且有分配规则）"""
+    return pool.get("enabled", True) and bool(pool.get("distribution_rules", []))
+
+
+def is_eligible(emp: dict, filter_roles: list) -> bool:
+    """员工是否参与该奖金池的排名（按角色筛选）"""
+    if not filter_roles:
+        return True
+    emp_role = emp.get("role_id") if emp else None
+    return emp_role in filter_roles
+
+
+def ranking_score(result: dict, ranking_basis: str) -> float:
+    """计算结果在指定排名依据下的分数"""
+    if ranking_basis == "total_score":
+        # 绩效总分
+        return sum(rd.get("score", 0) for rd in result.get("regions", {}).values())
+    if ranking_basis == "total_salary":
+        # 工资总额（不含排名奖金）
+        return result.get("total_salary", 0) - sum(
+            v.get("amount", 0) for k, v in result.get("extra_income", {}).items()
+            if k == "ranking_bonus"
+        )
+    if ranking_basis.startswith("region_"):
+        # 指定区域绩效
+        return result.get("regions", {}).get(ranking_basis, {}).get("score", 0)
+    return 0
+
+
+class RankingIndex:
+    """一次计算中所有奖金池共用的排名索引（results 为该次计算的结果列表）"""
+
+    def __init__(self, results: list, emp_map: dict):
+        self.results = results
+        self._by_role = {}   # 角色ID → 结果序号列表（没有员工记录或未设角色为 None）
+        for i, r in enumerate(results):
+            emp = emp_map.get(r["employee_id"])
+            self._by_role.setdefault(emp.get("role_id") if emp else None, []).append(i)
+        self._columns = {}   # 排名依据 → 每个结果的分数
+
+    def column(self, ranking_basis: str) -> list:
+        """某排名依据下所有结果的分数（首次使用时计算）"""
+        column = self._columns.get(ranking_basis)
+        if column is None:
+            column = [ranking_score(r, ranking_basis) for r in self.results]
+            self._columns[ranking_basis] = column
+        return column
+
+    def candidates(self, filter_roles: list) -> list:
+        """参与排名的结果序号（按角色筛选，与 is_eligible 一致）"""
+        if not filter_roles:
+            return range(len(self.results))
+        candidates = []
+        for role_id in dict.fromkeys(filter_roles):
+            candidates.extend(self._by_role.get(role_id, []))
+        return candidates
+
+    def rank(self, pool: dict) -> list:
+        """对一个奖金池排名，返回 [(结果序号, 奖金明细), ...]，按分配规则的顺序"""
+        if not pool_is_active(pool):
+            return []
+
+        pool_name = pool.get("name", "排名奖金")
+        rules = pool.get("distribution_rules", [])
+        top_k = max((rule.get("rank", 0) for rule in rules), default=0)
+        if top_k <= 0:
+            return []
+
+        scores = self.column(pool.get("ranking_basis", "total_score"))
+        candidates = self.candidates(pool.get("filter_roles", []))
+        # 分数高者在前，同分时序号小（绩效记录靠前）者在前
+        top = heapq.nlargest(top_k, candidates, key=lambda i: (scores[i], -i))
+
+        allocations = []
+        for rule in rules:
+            rank = rule.get("rank", 0)
+            amount = rule.get("amount", 0)
+            desc = rule.get("description", f"第{rank}名")
+
+            if rank <= 0 or rank > len(top):
+                continue
+
+            allocations.append((top[rank - 1], {
+                "pool_name": pool_name,
+                "rank": rank,
+                "description": desc,
+                "amount": amount
+            }))
+        return allocations
+
+    def apply(self, allocations: list):
+        """分配奖金，并更新获奖者在"工资总额"排名依据下的分数"""
+        apply_allocations(self.results, allocations)
+        column = self._columns.get("total_salary")
+        if column is not None:
+            for i, _ in allocations:
+                column[i] = ranking_score(self.results[i], "total_salary")
+
+
+def rank_pool(pool: dict, results: list, emp_map: dict) -> list:
+    """
+    对一个奖金池排名（单独排名一个奖金池时使用，多个奖金池请共用 RankingIndex）
+
+    emp_map 为 员工ID → 员工记录。
+    返回 [(结果序号, 奖金明细), ...]，按分配规则的顺序
+    """
+    return RankingIndex(results, emp_map).rank(pool)
+
+
+def apply_allocations(results: list, allocations: list):
+    """把一个奖金池的获奖名单加到计算结果的额外收入和总工资上"""
+    for i, detail in allocations:
+        winner = results[i]
+
+        # 添加排名奖金到额外收入
+        if "ranking_bonus" not in winner["extra_income"]:
+            winner["extra_income"]["ranking_bonus"] = {
+                "name": "排名奖金",
+                "details": [],
+                "amount": 0
+            }
+
+        winner["extra_income"]["ranking_bonus"]["details"].append(dict(detail))
+        winner["extra_income"]["ranking_bonus"]["amount"] += detail["amount"]
+        winner["total_salary"] += detail["amount"]
+        winner["total_salary"] = round(winner["total_salary"], 2)
+
+
+def calculate_ranking_bonus(results: list, employees: list, bonus_pools: list,
+                            emp_map: dict = None) -> list:
+    """
+    按奖金池依次排名并分配奖金（在基础工资计算完成后调用）
+
+    emp_map 为已建好的 员工ID → 员工（如 ProfileTable.employees），不传时由 employees 建立
+    """
+    if emp_map is None:
+        emp_map = {}
+        for emp in employees:
+            emp_map.setdefault(emp["id"], emp)
+
+    index = RankingIndex(results, emp_map)
+    for pool in bonus_pools:
+        index.apply(index.rank(pool))
+    return results
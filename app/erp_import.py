@@ -0,0 +1,284 @@
+"""
+ERP 绩效明细流式导入 - 分块读取、按块汇总
+版本: 1.0.0
+
+原来的导入先把整个 ERP 导出文件读成一个 DataFrame，再对每个员工筛选一次
+（df[df['姓名'] == 姓名]）并逐行 iterrows 生成明细，员工多、明细多时是平方级的。
+这里改为：
+- iter_erp_chunks：按块读取文件，每块最多 CHUNK_ROWS 行
+  （HTML 格式用 lxml 增量解析，xlsx 用 openpyxl 只读模式，内存占用与文件大小无关；
+  旧版 xls 由 xlrd 整表读入后分块，xls 本身最多 65536 行）
+- summarize_chunks：每块打上工序分类后做一次 groupby 汇总，累加到各员工的合计；
+  明细按块整列生成，交给 detail_sink 批量写出，不在内存中常驻
+
+本模块不依赖 Streamlit，可在命令行或后台任务中使用。
+"""
+__version__ = "1.0.0"
+
+import re
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 50000
+
+REQUIRED_COLUMNS = ['姓名', '工序', '业务类别', '绩效分']
+DRAWING_TYPES = ['蓝图', '工程图纸']  # 图纸印中的业务类别
+CATEGORIES = ('pre_press', 'drawing_mid', 'digital_mid', 'post_press')
+
+# 明细字段 → ERP 列名
+DETAIL_TEXT_COLUMNS = {
+    'order_no': '订单编号',
+    'customer': '客户名称',
+    'process': '工序',
+    'business_type': '业务类别',
+    'item': '制作项',
+}
+DETAIL_NUMBER_COLUMNS = {
+    'quantity': '数量',
+    'score': '绩效分',
+}
+
+
+# ============ 分块读取 ============
+
+def _open_source(source):
+    """文件路径或上传的文件对象 → 可读的二进制文件对象（回到开头）"""
+    if isinstance(source, (str, bytes)) or hasattr(source, '__fspath__'):
+        return open(source, 'rb'), True
+    source.seek(0)
+    return source, False
+
+
+def _numeric_frame(header: list, rows: list) -> pd.DataFrame:
+    """HTML 单元格都是文本，按 read_html 的方式把整列都是数字的列转成数值"""
+    df = pd.DataFrame(rows, columns=header)
+    for col in df.columns:
+        text = df[col].replace('', np.nan)
+        numbers = pd.to_numeric(text.str.replace(',', '', regex=False), errors='coerce')
+        if numbers.notna().sum() == text.notna().sum():
+            df[col] = numbers
+        else:
+            df[col] = text
+    return df
+
+
+def _html_encoding(head: bytes) -> str:
+    """从文件开头的 meta 标签中取字符集，没有声明时按 UTF-8"""
+    match = re.search(rb'charset=["\']?([\w-]+)', head, re.IGNORECASE)
+    return match.group(1).decode("ascii") if match else "utf-8"
+
+
+def _iter_html_chunks(f, chunksize: int):
+    from lxml import etree
+
+    encoding = _html_encoding(f.read(4096))
+    f.seek(0)
+
+    header = None
+    rows = []
+    for _, el in etree.iterparse(f, events=("end",), tag="tr", html=True, encoding=encoding):
+        cells = ["".join(c.itertext()).strip() for c in el if c.tag in ("td", "th")]
+        # 解析完的行立即释放，保持内存占用稳定
+        el.clear()
+        while el.getprevious() is not None:
+            del el.getparent()[0]
+
+        if header is None:
+            header = cells
+            continue
+        cells = (cells + [''] * len(header))[:len(header)]
+        rows.append(cells)
+        if len(rows) >= chunksize:
+            yield _numeric_frame(header, rows)
+            rows = []
+
+    if header is None:
+        raise ValueError("无法解析HTML")
+    if rows:
+        yield _numeric_frame(header, rows)
+
+
+def _header_names(values) -> list:
+    return [str(v) if v is not None else f"Unnamed: {i}" for i, v in enumerate(values)]
+
+
+def _iter_xlsx_chunks(f, chunksize: int):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(f, read_only=True, data_only=True)
+    try:
+        rows_iter = wb.active.iter_rows(values_only=True)
+        header = _header_names(next(rows_iter, ()))
+        rows = []
+        for values in rows_iter:
+            rows.append(values[:len(header)])
+            if len(rows) >= chunksize:
+                yield pd.DataFrame(rows, columns=header)
+                rows = []
+        if rows:
+            yield pd.DataFrame(rows, columns=header)
+    finally:
+        wb.close()
+
+
+def _iter_xls_chunks(f, chunksize: int):
+    import xlrd
+
+    book = xlrd.open_workbook(file_contents=f.read(), on_demand=True)
+    try:
+        sheet = book.sheet_by_index(0)
+        if sheet.nrows == 0:
+            return
+        header = _header_names(sheet.row_values(0))
+        for start in range(1, sheet.nrows, chunksize):
+            stop = min(start + chunksize, sheet.nrows)
+            rows = [sheet.row_values(i)[:len(header)] for i in range(start, stop)]
+            yield pd.DataFrame(rows, columns=header).replace('', np.nan)
+    finally:
+        book.release_resources()
+
+
+def iter_erp_chunks(source, chunksize: int = CHUNK_ROWS):
+    """
+    分块读取 ERP 导出文件，逐块返回 DataFrame
+
+    source 可以是文件路径或上传的文件对象；按文件头判断格式：
+    xlsx（PK 开头）、旧版 xls（OLE 文件头），其余按 ERP 常用的 HTML 格式解析
+    """
+    f, should_close = _open_source(source)
+    try:
+        magic = f.read(8)
+        f.seek(0)
+        if magic.startswith(b'PK\x03\x04'):
+            yield from _iter_xlsx_chunks(f, chunksize)
+        elif magic.startswith(b'\xd0\xcf\x11\xe0'):
+            yield from _iter_xls_chunks(f, chunksize)
+        else:
+            yield from _iter_html_chunks(f, chunksize)
+    finally:
+        if should_close:
+            f.close()
+
+
+def read_erp_preview(source, rows: int = 10):
+    """读取文件开头的若干行用于预览，返回 (DataFrame, 错误信息)"""
+    try:
+        for chunk in iter_erp_chunks(source, chunksize=rows):
+            return chunk, None
+        return None, "文件为空或无法解析"
+    except Exception as e:
+        return None, f"无法解析文件格式: {e}"
+
+
+# ============ 汇总 ============
+
+def _categorize(chunk: pd.DataFrame) -> np.ndarray:
+    """每行明细的工序分类：印前 / 图纸印中 / 数码印中 / 印后，其他工序为 other"""
+    process = chunk['工序']
+    drawing = chunk['业务类别'].isin(DRAWING_TYPES)
+    mid = process == '印中制作'
+    return np.select(
+        [process == '印前处理', mid & drawing, mid, process == '印后加工'],
+        CATEGORIES,
+        default='other'
+    )
+
+
+def _detail_records(chunk: pd.DataFrame, names: pd.Series, period: str) -> list:
+    """整块生成原始明细记录（用于穿透查询）"""
+    columns = {'period': period, 'employee_name': names}
+    for field, col in DETAIL_TEXT_COLUMNS.items():
+        columns[field] = chunk[col].astype(str) if col in chunk else ''
+    for field, col in DETAIL_NUMBER_COLUMNS.items():
+        columns[field] = pd.to_numeric(chunk[col], errors='coerce').fillna(0).astype(float) if col in chunk else 0.0
+    columns['register_time'] = chunk['登记时间'].astype(str) if '登记时间' in chunk else ''
+
+    frame = pd.DataFrame(columns, index=chunk.index)
+    return frame.to_dict('records')
+
+
+def summarize_chunks(chunks, period: str, detail_sink=None):
+    """
+    分块汇总绩效数据，返回 (结果, 错误信息)
+
+    按姓名汇总：
+    - 印前 = 工序"印前处理"的绩效分合计
+    - 图纸印中 = 工序"印中制作" + 业务类别为"蓝图"或"工程图纸"
+    - 数码印中 = 工序"印中制作" + 其他业务类别
+    - 印后 = 工序"印后加工"的绩效分合计
+
+    detail_sink(records) 每块调用一次，接收该块的原始明细；
+    不传时明细收集在结果的 raw_details 中。
+    结果: {'summary': [...], 'raw_details': [...], 'row_count': 明细行数}
+    """
+    totals = {}  # 姓名 → {分类: 合计}，按姓名首次出现的顺序
+    raw_details = []
+    row_count = 0
+    checked = False
+
+    for chunk in chunks:
+        if not checked:
+            missing_cols = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+            if missing_cols:
+                return None, f"缺少必要的列: {', '.join(missing_cols)}"
+            checked = True
+
+        row_count += len(chunk)
+
+        # 去掉姓名为空的行
+        names = chunk['姓名']
+        valid = names.notna()
+        names = names[valid].astype(str).str.strip()
+        valid_names = names != ''
+        chunk = chunk[valid][valid_names]
+        names = names[valid_names]
+        if chunk.empty:
+            continue
+
+        scores = pd.to_numeric(chunk['绩效分'], errors='coerce')
+        grouped = pd.DataFrame({
+            'name': names,
+            'category': _categorize(chunk),
+            'score': scores,
+        }).groupby(['name', 'category'], sort=False)['score'].sum()
+
+        for (name, category), value in grouped.items():
+            emp_totals = totals.setdefault(name, dict.fromkeys(CATEGORIES, 0.0))
+            if category != 'other':
+                emp_totals[category] += value
+
+        details = _detail_records(chunk, names, period)
+        if detail_sink is not None:
+            detail_sink(details)
+        else:
+            raw_details.extend(details)
+
+    if not checked:
+        return None, "文件为空或无法解析"
+
+    summary = []
+    for name, t in totals.items():
+        summary.append({
+            'employee_name': name,
+            'period': period,
+            'pre_press': float(t['pre_press']),           # 印前
+            'drawing_mid': float(t['drawing_mid']),       # 图纸印中
+            'digital_mid': float(t['digital_mid']),       # 数码印中
+            'mid_press': float(t['drawing_mid'] + t['digital_mid']),  # 印中合计
+            'post_press': float(t['post_press']),         # 印后
+        })
+
+    return {
+        'summary': summary,
+        'raw_details': raw_details,
+        'row_count': row_count
+    }, None
+
+
+def summarize_erp_file(source, period: str, detail_sink=None, chunksize: int = CHUNK_ROWS):
+    """分块读取并汇总 ERP 导出文件，返回 (结果, 错误信息)"""
+    try:
+        return summarize_chunks(iter_erp_chunks(source, chunksize), period, detail_sink)
+    except Exception as e:
+        return None, f"解析失败: {e}"
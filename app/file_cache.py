@@ -0,0 +1,90 @@
+"""
+数据文件缓存 - 按文件缓存、按文件失效
+版本: 1.0.0
+
+原来 load_json 用 @st.cache_data 缓存，任何一次写入都调用
+st.cache_data.clear()，把所有会话、所有文件的缓存一起清掉。
+这里每个文件单独一条缓存，校验键为：
+- 写入版本号：本进程每次写入该文件时加一（evict）
+- 存储后端给出的文件戳：JSON 文件为 (修改时间, 大小)，外部改动文件也能发现；
+  SQLite 后端没有文件戳，只依靠写入版本号
+写入只淘汰被修改的那个文件，其余文件的缓存继续命中。
+
+缓存中保存的是 pickle 后的字节，每次命中都反序列化出一份新的副本
+（与 st.cache_data 相同），调用方修改返回的数据不会影响缓存。
+"""
+__version__ = "1.0.0"
+
+import pickle
+import threading
+
+
+class FileCache:
+    """按文件缓存读取结果，并统计命中、未命中、淘汰次数"""
+
+    def __init__(self, loader, stamp=None):
+        """
+        loader(filename) 读取文件内容；
+        stamp(filename) 返回文件戳（文件变化时随之变化），为 None 表示不检查
+        """
+        self._loader = loader
+        self._stamp = stamp or (lambda filename: None)
+        self._entries = {}   # 文件名 → (校验键, pickle 字节)
+        self._versions = {}  # 文件名 → 写入版本号
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _key(self, filename: str):
+        return self._versions.get(filename, 0), self._stamp(filename)
+
+    def get(self, filename: str):
+        """读取文件内容（返回独立的副本）"""
+        key = self._key(filename)
+        entry = self._entries.get(filename)
+        if entry is not None and entry[0] == key:
+            with self._lock:
+                self.hits += 1
+            return pickle.loads(entry[1])
+
+        data = self._loader(filename)
+        blob = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self.misses += 1
+            # 读取期间文件又被写入时，不缓存这份可能过期的内容
+            if self._key(filename) == key:
+                self._entries[filename] = (key, blob)
+        return pickle.loads(blob)
+
+    def version(self, filename: str) -> int:
+        """文件的写入版本号"""
+        return self._versions.get(filename, 0)
+
+    def evict(self, filename: str):
+        """文件被写入后淘汰它的缓存"""
+        with self._lock:
+            self._versions[filename] = self._versions.get(filename, 0) + 1
+            if self._entries.pop(filename, None) is not None:
+                self.evictions += 1
+
+    def clear(self):
+        """清空全部缓存"""
+        with self._lock:
+            for filename in self._entries:
+                self._versions[filename] = self._versions.get(filename, 0) + 1
+            self.evictions += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """缓存统计：命中、未命中、淘汰次数、命中率、缓存文件数和占用字节数"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "bytes": sum(len(blob) for _, blob in self._entries.values()),
+            }
@@ -0,0 +1,113 @@
+"""
+文件锁 - 多个会话、多个进程读-改-写同一数据文件时互斥
+版本: 1.0.0
+
+每个数据文件对应 data/.locks 下的一个锁文件，用操作系统的咨询锁
+（Linux/macOS 为 fcntl.flock，Windows 为 msvcrt.locking）在进程间互斥，
+同一进程内的多个线程（Streamlit 的多个会话）先经过线程锁排队。
+同一线程可以重入，外层函数加锁后调用的内层函数再加同一把锁不会死锁。
+"""
+__version__ = "1.0.0"
+
+import os
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class LockTimeoutError(TimeoutError):
+    """等待文件锁超时"""
+
+
+def _try_lock(fh) -> bool:
+    try:
+        if fcntl:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fh):
+    if fcntl:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+    else:
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """一个锁文件对应的互斥锁（线程间 + 进程间，同一线程可重入）"""
+
+    def __init__(self, path: Path, timeout: float = 30):
+        self.path = Path(path)
+        self.timeout = timeout
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fh = None
+
+    def acquire(self, timeout: float = None):
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        if not self._thread_lock.acquire(timeout=timeout):
+            raise LockTimeoutError(f"等待文件锁超时: {self.path.name}")
+
+        self._depth += 1
+        if self._depth > 1:
+            return  # 同一线程重入
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fh = open(self.path, "a+b")
+            delay = 0.001
+            while not _try_lock(fh):
+                if time.monotonic() >= deadline:
+                    fh.close()
+                    raise LockTimeoutError(f"等待文件锁超时: {self.path.name}")
+                time.sleep(delay)
+                delay = min(delay * 2, 0.05)
+            self._fh = fh
+        except BaseException:
+            self._depth -= 1
+            self._thread_lock.release()
+            raise
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            try:
+                _unlock(self._fh)
+            finally:
+                self._fh.close()
+                self._fh = None
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def lock_for(path: Path) -> FileLock:
+    """取锁文件对应的锁（同一路径在进程内共用一个对象，保证可重入）"""
+    key = os.path.abspath(path)
+    with _registry_lock:
+        lock = _registry.get(key)
+        if lock is None:
+            lock = _registry[key] = FileLock(Path(key))
+        return lock
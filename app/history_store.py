@@ -0,0 +1,197 @@
+"""
+计算历史分片存储 - 每个期间一个文件 + 小型索引清单
+版本: 1.0.0
+
+原来所有期间的计算结果都存在一个 calculation_history.json 里，
+每次计算、锁定、查看都要读写整个文件。现在改为：
+
+    data/history/manifest.json    索引清单：期间 → 文件名、汇总信息、锁定状态
+    data/history/<期间>_<哈希>.json  该期间的完整计算结果
+
+- 查看列表、判断锁定、锁定/解锁 只读写清单，不碰任何期间的结果文件
+- 加载某个期间只读那一个文件
+- 保存计算结果只写该期间的文件和清单
+
+首次访问时如果还没有清单但存在旧的 calculation_history.json，
+会自动拆分迁移，旧文件移入 backup 目录保存。
+"""
+__version__ = "1.0.0"
+
+import hashlib
+import re
+from datetime import datetime
+
+from app.data_manager import get_revision, get_storage, load_json, locked, save_json, delete_json, update_json
+
+HISTORY_DIR = "history"
+MANIFEST_FILE = f"{HISTORY_DIR}/manifest.json"
+LEGACY_FILE = "calculation_history.json"
+
+# 清单中保存的汇总字段（不含 results）
+META_FIELDS = ("calculated_at", "employee_count", "total_salary",
+               "locked", "locked_at", "locked_scheme_name")
+
+
+def record_period(calc: dict) -> str:
+    """取计算记录的期间（兼容旧数据的 month 字段）"""
+    return calc.get("month") or calc.get("period") or ""
+
+
+def _shard_name(period: str) -> str:
+    """期间 → 分片文件名（保留可读部分，加短哈希避免重名）"""
+    readable = re.sub(r"[^\w\-]", "_", period)[:40]
+    digest = hashlib.md5(period.encode("utf-8")).hexdigest()[:8]
+    return f"{HISTORY_DIR}/{readable}_{digest}.json"
+
+
+def _empty_manifest() -> dict:
+    return {"version": 1, "periods": {}}
+
+
+def migrate_monolithic_history() -> int:
+    """
+    把旧的 calculation_history.json 拆分成按期间存储的分片
+
+    返回迁移的期间数；已经迁移过（清单已存在）时返回 0
+    """
+    with locked(MANIFEST_FILE):
+        if load_json(MANIFEST_FILE):
+            return 0
+
+        manifest = _empty_manifest()
+        legacy_exists = get_storage().exists(LEGACY_FILE)
+        legacy = load_json(LEGACY_FILE) if legacy_exists else {}
+        calculations = legacy.get("calculations", []) if legacy else []
+
+        print(f"[迁移] 正在拆分计算历史，共 {len(calculations)} 条记录...")
+        for calc in calculations:
+            period = record_period(calc)
+            if not period:
+                continue
+            shard = _shard_name(period)
+            # 同一期间有多条时以最后一条为准（与原来覆盖保存的效果一致）
+            save_json(shard, calc, backup=False)
+            entry = {"file": shard}
+            entry.update({k: calc[k] for k in META_FIELDS if k in calc})
+            manifest["periods"].pop(period, None)
+            manifest["periods"][period] = entry
+
+        if calculations:
+            manifest["migrated_from"] = LEGACY_FILE
+            manifest["migrated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        save_json(MANIFEST_FILE, manifest, backup=False)
+
+        # 旧文件移入备份目录，避免之后被误读
+        if legacy_exists:
+            delete_json(LEGACY_FILE)
+            print(f"[迁移] 旧文件已移入备份目录: {LEGACY_FILE}")
+
+        print(f"[迁移] 计算历史迁移完成，共 {len(manifest['periods'])} 个期间")
+        return len(manifest["periods"])
+
+
+def _load_manifest() -> dict:
+    """读取清单（首次访问时自动迁移旧格式）"""
+    manifest = load_json(MANIFEST_FILE)
+    if not manifest:
+        migrate_monolithic_history()
+        manifest = load_json(MANIFEST_FILE) or _empty_manifest()
+    manifest.setdefault("periods", {})
+    return manifest
+
+
+def list_calculations() -> list:
+    """
+    获取所有期间的汇总信息（不含计算结果）
+
+    返回: [{"period": ..., "calculated_at": ..., "employee_count": ...,
+            "total_salary": ..., "locked": ..., ...}, ...]
+    """
+    manifest = _load_manifest()
+    items = []
+    for period, entry in manifest["periods"].items():
+        item = {"period": period}
+        item.update({k: v for k, v in entry.items() if k != "file"})
+        items.append(item)
+    return items
+
+
+def get_calculation_meta(period: str) -> dict:
+    """获取单个期间的汇总信息，不存在返回 None"""
+    entry = _load_manifest()["periods"].get(period)
+    if entry is None:
+        return None
+    meta = {"period": period}
+    meta.update({k: v for k, v in entry.items() if k != "file"})
+    return meta
+
+
+def calculation_revision(period: str):
+    """期间计算结果的版本（每次保存都会变化，锁定不影响），不存在返回 None"""
+    entry = _load_manifest()["periods"].get(period)
+    if entry is None:
+        return None
+    return get_revision(entry["file"])
+
+
+def load_calculation(period: str, cache: bool = True) -> dict:
+    """加载单个期间的完整计算记录（含 results），不存在返回 None
+
+    cache=False 时不经过文件缓存（逐个读取很多期间时内存不随期间数增长）
+    """
+    entry = _load_manifest()["periods"].get(period)
+    if entry is None:
+        return None
+
+    calc = load_json(entry["file"], cache=cache)
+    if not calc:
+        print(f"[错误] 计算结果文件缺失: {entry['file']}")
+        return None
+
+    # 锁定状态以清单为准
+    for key in ("locked", "locked_at", "locked_scheme_name"):
+        calc.pop(key, None)
+        if key in entry:
+            calc[key] = entry[key]
+    return calc
+
+
+def save_calculation(calc: dict) -> bool:
+    """保存（覆盖）一个期间的计算记录"""
+    period = record_period(calc)
+    if not period:
+        print("[错误] 计算记录缺少期间")
+        return False
+
+    shard = _shard_name(period)
+    if not save_json(shard, calc, backup=False):
+        return False
+
+    entry = {"file": shard}
+    entry.update({k: calc[k] for k in META_FIELDS if k in calc})
+    with locked(MANIFEST_FILE):
+        manifest = _load_manifest()
+        manifest["periods"].pop(period, None)
+        manifest["periods"][period] = entry
+        return save_json(MANIFEST_FILE, manifest, backup=False)
+
+
+def set_locked(period: str, locked: bool, scheme_name: str = None) -> bool:
+    """锁定/解锁期间（只修改清单）"""
+    _load_manifest()  # 确保已迁移
+
+    def mutate(manifest):
+        entry = manifest.get("periods", {}).get(period)
+        if entry is None:
+            return False
+
+        entry["locked"] = locked
+        if locked:
+            entry["locked_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            if scheme_name is not None:
+                entry["locked_scheme_name"] = scheme_name
+        else:
+            entry.pop("locked_at", None)
+        return True
+
+    return update_json(MANIFEST_FILE, mutate, backup=False)
@@ -728,7 +728,8 @@ def check_password():
 # ==================== 首页 ====================
 def render_home():
     """渲染首页"""
-    from app.data_manager import get_employees, get_skills, load_json
+    from app.data_manager import get_employees, get_skills, get_cache_stats
+    from app.history_store import list_calculations
     from datetime import datetime
 
     # 顶部标题
@@ -742,10 +743,9 @@ def render_home():
     # 获取数据统计
     employees = get_employees()
     skills = get_skills()
-    history = load_json("calculation_history.json")
-    calculations = history.get("calculations", []) if history else []
+    calculations = list_calculations()
     current_month = datetime.now().strftime("%Y-%m")
-    calculated_this_month = any(c.get("month") == current_month for c in calculations)
+    calculated_this_month = any(c["period"] == current_month for c in calculations)
 
     # 统计卡片
     col1, col2, col3, col4 = st.columns(4)
@@ -845,6 +845,16 @@ def render_home():
             st.session_state.current_page = "scheme"
             st.rerun()
 
+    # 数据缓存统计（调优用）
+    with st.expander("⚙️ 数据缓存统计", expanded=False):
+        stats = get_cache_stats()
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("命中", stats["hits"])
+        c2.metric("未命中", stats["misses"])
+        c3.metric("淘汰", stats["evictions"])
+        c4.metric("命中率", f"{stats['hit_rate']:.1%}")
+        st.caption(f"缓存文件 {stats['entries']} 个，占用 {stats['bytes'] / 1024:,.0f} KB")
+
 # ==================== 返回按钮 ====================
 def render_back_button():
     """渲染返回首页按钮"""
@@ -871,68 +881,77 @@ if "current_page" not in st.session_state:
 # 根据页面状态显示内容
 current_page = st.session_state.current_page
 
-# 在所有页面（除首页外）显示顶部方案工具栏
-if current_page != "home":
-    render_scheme_toolbar()
-
-if current_page == "home":
-    render_home()
-
-elif current_page == "employee":
-    render_back_button()
-    from app.pages import employee_page
-    employee_page.render()
-
-elif current_page == "region":
-    render_back_button()
-    from app.pages import region_page
-    region_page.render()
-
-elif current_page == "skill":
-    render_back_button()
-    from app.pages import skill_page
-    skill_page.render()
-
-elif current_page == "assignment":
-    render_back_button()
-    from app.pages import assignment_page
-    assignment_page.render()
-
-elif current_page == "import":
-    render_back_button()
-    from app.pages import import_page
-    import_page.render()
-
-elif current_page == "calculate":
-    render_back_button()
-    from app.pages import calculate_page
-    calculate_page.render()
-
-elif current_page == "history":
-    render_back_button()
-    from app.pages import history_page
-    history_page.render()
-
-elif current_page == "scheme":
-    render_back_button()
-    from app.pages import scheme_page
-    scheme_page.render()
-
-elif current_page == "role":
-    render_back_button()
-    from app.pages import role_page
-    role_page.render()
-
-elif current_page == "external":
-    render_back_button()
-    from app.pages import external_data_page
-    external_data_page.render()
-
-elif current_page == "bonus_pool":
-    render_back_button()
-    from app.pages import bonus_pool_page
-    bonus_pool_page.render()
-
-else:
-    st.session_state.current_page = "home"
-    st.rerun()
+# 其他会话长时间持有数据文件锁时（等锁超时），提示稍后重试而不是显示异常；
+# 保存失败时提示失败，不会当作已保存
+from app.data_manager import BUSY_MESSAGE, LockTimeoutError, SaveError
+
+try:
+    # 在所有页面（除首页外）显示顶部方案工具栏
+    if current_page != "home":
+        render_scheme_toolbar()
+
+    if current_page == "home":
+        render_home()
+
+    elif current_page == "employee":
+        render_back_button()
+        from app.pages import employee_page
+        employee_page.render()
+
+    elif current_page == "region":
+        render_back_button()
+        from app.pages import region_page
+        region_page.render()
+
+    elif current_page == "skill":
+        render_back_button()
+        from app.pages import skill_page
+        skill_page.render()
+
+    elif current_page == "assignment":
+        render_back_button()
+        from app.pages import assignment_page
+        assignment_page.render()
+
+    elif current_page == "import":
+        render_back_button()
+        from app.pages import import_page
+        import_page.render()
+
+    elif current_page == "calculate":
+        render_back_button()
+        from app.pages import calculate_page
+        calculate_page.render()
+
+    elif current_page == "history":
+        render_back_button()
+        from app.pages import history_page
+        history_page.render()
+
+    elif current_page == "scheme":
+        render_back_button()
+        from app.pages import scheme_page
+        scheme_page.render()
+
+    elif current_page == "role":
+        render_back_button()
+        from app.pages import role_page
+        role_page.render()
+
+    elif current_page == "external":
+        render_back_button()
+        from app.pages import external_data_page
+        external_data_page.render()
+
+    elif current_page == "bonus_pool":
+        render_back_button()
+        from app.pages import bonus_pool_page
+        bonus_pool_page.render()
+
+    else:
+        st.session_state.current_page = "home"
+        st.rerun()
+except LockTimeoutError:
+    st.warning(f"⏳ {BUSY_MESSAGE}")
+except SaveError as e:
+    st.error(f"❌ {e}，修改没有保存")
@@ -10,7 +10,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 from app.data_manager import (
     get_employees, get_skills, get_skills_by_mode,
     get_employee_skills, assign_skill_to_employee, update_employee_skill,
-    remove_employee_skill, batch_assign_skills_to_employee,
+    remove_employee_skill, batch_assign_skills_to_employee, transaction,
     get_modes, get_mode_by_id, get_regions, get_region_by_id,
     save_json, load_json
 )
@@ -94,6 +94,10 @@ def render():
         if not assigned:
             st.info("该员工暂未分配任何技能")
         else:
+            # 本次渲染中检测到的修改：[(技能ID, 更新内容)]，更新内容为 None 表示取消分配。
+            # 全部卡片渲染完后在一个事务中写入，再刷新页面
+            edits = []
+
             # 按区域分组
             assigned_by_region = {}
             for assignment in assigned:
@@ -129,8 +133,7 @@ def render():
                                 key=f"exam_{selected_emp_id}_{skill['id']}"
                             )
                             if new_passed != passed:
-                                update_employee_skill(selected_emp_id, skill["id"], {"passed_exam": new_passed})
-                                st.rerun()
+                                edits.append((skill["id"], {"passed_exam": new_passed}))
 
                             # 获取当前价格设置
                             current_use_system_price = assignment.get("use_system_price", True)
@@ -165,12 +168,11 @@ def render():
                             # 检测达标值变化并保存
                             if use_system != current_use_system or (not use_system and custom_val != current_custom):
                                 if use_system:
-                                    update_employee_skill(selected_emp_id, skill["id"],
-                                        {"use_system_threshold": True, "custom_threshold": None})
+                                    edits.append((skill["id"],
+                                        {"use_system_threshold": True, "custom_threshold": None}))
                                 else:
-                                    update_employee_skill(selected_emp_id, skill["id"],
-                                        {"use_system_threshold": False, "custom_threshold": custom_val})
-                                st.rerun()
+                                    edits.append((skill["id"],
+                                        {"use_system_threshold": False, "custom_threshold": custom_val}))
 
                             # 奖金设置
                             price_option = st.radio(
@@ -197,17 +199,15 @@ def render():
                             # 检测价格变化并保存
                             if use_system_price != current_use_system_price or (not use_system_price and custom_price != current_custom_price):
                                 if use_system_price:
-                                    update_employee_skill(selected_emp_id, skill["id"],
-                                        {"use_system_price": True, "custom_price_on_duty": None})
+                                    edits.append((skill["id"],
+                                        {"use_system_price": True, "custom_price_on_duty": None}))
                                 else:
-                                    update_employee_skill(selected_emp_id, skill["id"],
-                                        {"use_system_price": False, "custom_price_on_duty": custom_price})
-                                st.rerun()
+                                    edits.append((skill["id"],
+                                        {"use_system_price": False, "custom_price_on_duty": custom_price}))
 
                             # 取消分配按钮
                             if st.button("取消分配", key=f"remove_{selected_emp_id}_{skill['id']}", type="secondary"):
-                                remove_employee_skill(selected_emp_id, skill["id"])
-                                st.rerun()
+                                edits.append((skill["id"], None))
 
                     # 每3个重新创建列
                     if col_idx == 2 and idx < len(items) - 1:
@@ -215,6 +215,15 @@ def render():
 
                 st.markdown("")  # 区域之间的间隔
 
+            if edits:
+                with transaction("employee_skills.json"):
+                    for skill_id, updates in edits:
+                        if updates is None:
+                            remove_employee_skill(selected_emp_id, skill_id)
+                        else:
+                            update_employee_skill(selected_emp_id, skill_id, updates)
+                st.rerun()
+
     with tab2:
         if not unassigned_skills:
             st.info("已分配所有可用技能")
@@ -278,9 +287,10 @@ def render():
     with col1:
         if st.button("一键分配所有可用技能", type="secondary"):
             count = 0
-            for skill in unassigned_skills:
-                assign_skill_to_employee(selected_emp_id, skill["id"], passed_exam=False)
-                count += 1
+            with transaction("employee_skills.json"):
+                for skill in unassigned_skills:
+                    assign_skill_to_employee(selected_emp_id, skill["id"], passed_exam=False)
+                    count += 1
             if count > 0:
                 st.success(f"已批量分配 {count} 个技能")
                 st.rerun()
@@ -288,14 +298,15 @@ def render():
     with col2:
         if st.button("一键通过所有已分配技能考核"):
             count = 0
-            for assignment in assigned:
-                if not assignment.get("passed_exam", False):
-                    update_employee_skill(
-                        selected_emp_id,
-                        assignment["skill_id"],
-                        {"passed_exam": True}
-                    )
-                    count += 1
+            with transaction("employee_skills.json"):
+                for assignment in assigned:
+                    if not assignment.get("passed_exam", False):
+                        update_employee_skill(
+                            selected_emp_id,
+                            assignment["skill_id"],
+                            {"passed_exam": True}
+                        )
+                        count += 1
             if count > 0:
                 st.success(f"已通过 {count} 个技能的考核")
                 st.rerun()
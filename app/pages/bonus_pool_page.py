@@ -9,7 +9,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 from app.data_manager import (
     get_bonus_pools, add_bonus_pool, update_bonus_pool, delete_bonus_pool,
-    get_roles, load_json, save_json
+    get_roles
 )
 
 # 排名依据选项
@@ -101,14 +101,12 @@ def render():
                 )
                 if result:
                     # 更新额外配置
-                    data = load_json("bonus_pools.json")
-                    for pool in data.get("pools", []):
-                        if pool["id"] == result["id"]:
-                            pool["description"] = new_desc
-                            pool["ranking_basis"] = new_basis
-                            pool["filter_roles"] = [new_filter_role] if new_filter_role else []
-                            pool["enabled"] = True
-                    save_json("bonus_pools.json", data, backup=False)
+                    update_bonus_pool(result["id"], {
+                        "description": new_desc,
+                        "ranking_basis": new_basis,
+                        "filter_roles": [new_filter_role] if new_filter_role else [],
+                        "enabled": True,
+                    })
 
                     st.success(f"添加成功：{new_name}")
                     st.rerun()
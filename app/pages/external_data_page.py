@@ -10,7 +10,7 @@ from datetime import datetime
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 from app.data_manager import (
     get_employees, get_external_data, save_external_data,
-    load_json, save_json
+    load_json, update_json
 )
 
 
@@ -200,14 +200,15 @@ def render():
 
             if st.button("添加门店"):
                 if new_store_name:
-                    new_store = {
-                        "id": f"store_{len(stores)+1:03d}",
-                        "name": new_store_name,
-                        "description": new_store_desc
-                    }
-                    stores.append(new_store)
-                    ext_data["stores"] = stores
-                    save_json("external_data.json", ext_data, backup=False)
+                    def add_store(data):
+                        stores = data.setdefault("stores", [])
+                        stores.append({
+                            "id": f"store_{len(stores)+1:03d}",
+                            "name": new_store_name,
+                            "description": new_store_desc
+                        })
+
+                    update_json("external_data.json", add_store, backup=False)
                     st.success(f"已添加门店：{new_store_name}")
                     st.rerun()
 
@@ -239,10 +240,11 @@ def render():
                         store_revenues[store_id] = revenue
 
                 if st.form_submit_button("保存门店营业额", type="primary"):
-                    if "store_revenues" not in ext_data:
-                        ext_data["store_revenues"] = {}
-                    ext_data["store_revenues"][month] = store_revenues
-                    save_json("external_data.json", ext_data, backup=False)
+                    update_json(
+                        "external_data.json",
+                        lambda data: data.setdefault("store_revenues", {}).update({month: store_revenues}),
+                        backup=False
+                    )
                     st.success("门店营业额已保存")
 
     # 显示已有数据
@@ -7,10 +7,13 @@ import pandas as pd
 import io
 import sys
 from pathlib import Path
-from st_table_select_cell import st_table_select_cell
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-from app.data_manager import get_regions, load_json, unlock_calculation
+from app.data_manager import get_regions, unlock_calculation
+from app.history_store import calculation_revision, list_calculations, load_calculation
+from app.excel_export import XLSX_MIME
+from app.pages.results_grid import frame_cache, regions_key, render_export, render_results_grid, result_columns
+from app.report_export import export_report
 
 
 def display_region_detail(region: dict, rd: dict, result: dict):
@@ -97,13 +100,75 @@ def show_total_dialog():
     st.markdown(f"**总计：¥{total_salary:,.2f}**")
 
 
+def prepare_export_data(results: list, regions: list, selected_month: str) -> pd.DataFrame:
+    """准备导出数据"""
+    export_data = []
+    for r in results:
+        row = {
+            "员工ID": r.get("employee_id", ""),
+            "姓名": r.get("employee_name", ""),
+            "月份": selected_month,
+        }
+
+        for region in regions:
+            region_id = region["id"]
+            region_name = region["name"]
+            if region_id in r.get("regions", {}):
+                rd = r["regions"][region_id]
+                row[f"{region_name}_绩效分"] = rd.get("score", 0)
+                row[f"{region_name}_在岗"] = "是" if rd.get("is_on_duty") else "否"
+                row[f"{region_name}_技能工资"] = rd.get("skill_salary", 0)
+                row[f"{region_name}_阶梯奖金"] = rd.get("ladder_bonus", 0)
+                row[f"{region_name}_小计"] = rd.get("total", 0)
+
+        row["总工资"] = r.get("total_salary", 0)
+        export_data.append(row)
+
+    return pd.DataFrame(export_data)
+
+
+def render_report_export(calculations: list):
+    """多期间报表：选中的保存名称导出到一个工作簿（汇总 + 每个期间一个工作表）"""
+    st.caption("可选择多个期间或方案，第一个工作表为汇总，之后每个期间一个工作表")
+    names = sorted(c["period"] for c in calculations)
+    selected = st.multiselect("选择要导出的期间", options=names, key="report_names")
+    if not selected:
+        return
+
+    # 报表按 所选期间的结果版本 + 锁定状态 + 区域 缓存，点击后才生成
+    selected = sorted(selected)
+    regions = get_regions()
+    locked_map = {c["period"]: c.get("locked", False) for c in calculations}
+    version = (tuple((n, calculation_revision(n), locked_map.get(n)) for n in selected), regions_key(regions))
+    cache_key = ("history_report", version)
+
+    data = frame_cache.peek(cache_key)
+    if data is None and st.button("生成报表", key="report_prepare"):
+        def build():
+            buffer = io.BytesIO()
+            export_report(selected, buffer, regions)
+            return buffer.getvalue()
+
+        with st.spinner(f"正在生成报表（{len(selected)} 个期间）..."):
+            data = frame_cache.get(cache_key, build)
+
+    if data is not None:
+        suffix = selected[0] if len(selected) == 1 else f"{selected[0]}至{selected[-1]}"
+        st.download_button(
+            label="📥 下载报表",
+            data=data,
+            file_name=f"绩效报表_{suffix}.xlsx",
+            mime=XLSX_MIME,
+            key="report_download",
+        )
+
+
 def render():
     st.title("📜 历史查询")
     st.markdown("---")
 
-    # 加载历史数据
-    history_data = load_json("calculation_history.json")
-    calculations = history_data.get("calculations", []) if history_data else []
+    # 加载历史清单（只含各期间的汇总信息，不读取计算结果）
+    calculations = list_calculations()
 
     if not calculations:
         st.info("暂无历史计算记录")
@@ -111,23 +176,16 @@ def render():
         return
 
     # 按月份排序
-    calculations.sort(key=lambda x: x.get("month", "") or x.get("period", ""), reverse=True)
+    calculations.sort(key=lambda x: x["period"], reverse=True)
 
-    # 获取月份列表（兼容month和period字段）
-    months = []
-    for c in calculations:
-        month = c.get("month") or c.get("period", "")
-        if month:
-            months.append(month)
+    # 获取月份列表
+    months = [c["period"] for c in calculations]
 
     # 选择月份
     selected_month = st.selectbox("选择月份", options=months)
 
-    # 获取选中月份的数据（兼容month和period字段）
-    selected_calc = next(
-        (c for c in calculations if (c.get("month") or c.get("period")) == selected_month),
-        None
-    )
+    # 只加载选中月份的计算结果
+    selected_calc = load_calculation(selected_month)
 
     if not selected_calc:
         st.warning("未找到该月份数据")
@@ -173,6 +231,9 @@ def render():
 
     results = selected_calc.get("results", [])
     regions = get_regions()
+    # 结果版本：表格和导出数据只在该期间重新保存或区域变化后重新构建
+    revision = calculation_revision(selected_month)
+    version = (selected_month, revision, regions_key(regions)) if revision is not None else None
 
     if results:
         # 弹窗宽度样式
@@ -186,32 +247,7 @@ def render():
         </style>
         """, unsafe_allow_html=True)
 
-        # 构建表格数据
-        table_data = []
-        for r in results:
-            row = {
-                "期间": selected_month,
-                "员工ID": r.get("employee_id", ""),
-                "姓名": r.get("employee_name", ""),
-            }
-
-            for region in regions:
-                region_id = region["id"]
-                region_name = region["name"]
-                if region_id in r.get("regions", {}):
-                    rd = r["regions"][region_id]
-                    row[f"{region_name}绩效"] = round(rd.get("score", 0))
-                    row[f"{region_name}金额"] = round(rd.get("total", 0))
-                else:
-                    row[f"{region_name}绩效"] = 0
-                    row[f"{region_name}金额"] = 0
-
-            row["总金额"] = round(r.get("total_salary", 0))
-            table_data.append(row)
-
-        df = pd.DataFrame(table_data)
-
-        # 使用 st_table_select_cell 支持单元格点击
+        # 使用 st_table_select_cell 支持单元格点击（服务端分页，只发送当前页）
         st.markdown("**点击金额列查看该区域明细：**")
 
         # 构建列名到区域ID的映射
@@ -220,42 +256,34 @@ def render():
             col_to_region[f"{region['name']}金额"] = region["id"]
         col_to_region["总金额"] = "total"
 
-        # 获取所有列名
-        columns = df.columns.tolist()
-
-        # 使用 st_table_select_cell 组件
-        cell_clicked = st_table_select_cell(df)
+        columns = result_columns(regions, selected_month)
+        clicked = render_results_grid(results, columns, key=f"history_grid_{selected_month}",
+                                      version=version)
 
         # 处理单元格点击事件 - 使用 session_state 避免重复触发
-        if cell_clicked:
+        if clicked:
+            selected_result, col_name = clicked
             # 生成唯一标识符来判断是否是新的点击
-            click_key = f"{cell_clicked.get('rowId')}_{cell_clicked.get('colIndex')}_{selected_month}"
+            click_key = f"{selected_result.get('employee_id')}_{col_name}_{selected_month}"
             last_click_key = st.session_state.get("history_last_click_key")
 
             # 只有当是新的点击时才触发弹窗
             if click_key != last_click_key:
                 st.session_state.history_last_click_key = click_key
 
-                row_idx = int(cell_clicked.get("rowId", 0))
-                col_idx = cell_clicked.get("colIndex")
-
-                if col_idx is not None and row_idx < len(results):
-                    col_name = columns[col_idx] if col_idx < len(columns) else None
+                # 只有点击金额列才弹窗
+                if col_name in col_to_region:
+                    clicked_region_id = col_to_region[col_name]
 
-                    # 只有点击金额列才弹窗
-                    if col_name in col_to_region:
-                        selected_result = results[row_idx]
-                        clicked_region_id = col_to_region[col_name]
+                    # 存储数据到 session_state
+                    st.session_state.dialog_result = selected_result
+                    st.session_state.dialog_region = clicked_region_id
 
-                        # 存储数据到 session_state
-                        st.session_state.dialog_result = selected_result
-                        st.session_state.dialog_region = clicked_region_id
-
-                        # 调用弹窗
-                        if clicked_region_id == "total":
-                            show_total_dialog()
-                        else:
-                            show_detail_dialog()
+                    # 调用弹窗
+                    if clicked_region_id == "total":
+                        show_total_dialog()
+                    else:
+                        show_detail_dialog()
 
         # 统计信息
         st.markdown("---")
@@ -272,44 +300,11 @@ def render():
         # 导出功能
         st.markdown("---")
 
-        # 准备导出数据
-        export_data = []
-        for r in results:
-            row = {
-                "员工ID": r.get("employee_id", ""),
-                "姓名": r.get("employee_name", ""),
-                "月份": selected_month,
-            }
-
-            for region in regions:
-                region_id = region["id"]
-                region_name = region["name"]
-                if region_id in r.get("regions", {}):
-                    rd = r["regions"][region_id]
-                    row[f"{region_name}_绩效分"] = rd.get("score", 0)
-                    row[f"{region_name}_在岗"] = "是" if rd.get("is_on_duty") else "否"
-                    row[f"{region_name}_技能工资"] = rd.get("skill_salary", 0)
-                    row[f"{region_name}_阶梯奖金"] = rd.get("ladder_bonus", 0)
-                    row[f"{region_name}_小计"] = rd.get("total", 0)
-
-            row["总工资"] = r.get("total_salary", 0)
-            export_data.append(row)
-
-        export_df = pd.DataFrame(export_data)
-
-        # 生成Excel
-        buffer = io.BytesIO()
-        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-            export_df.to_excel(writer, sheet_name=f'{selected_month}绩效工资', index=False)
-
-        buffer.seek(0)
-
-        st.download_button(
-            label="📥 导出Excel",
-            data=buffer,
-            file_name=f"绩效工资_{selected_month}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        # 导出：点击后才生成文件，按结果版本缓存
+        render_export(f"history_export_{selected_month}", version,
+                      lambda: prepare_export_data(results, regions, selected_month),
+                      file_stem=f"绩效工资_{selected_month}", sheet_name=f"{selected_month}绩效工资",
+                      label="📥 导出Excel")
 
     # 计算历史（折叠面板）
     st.markdown("---")
@@ -318,7 +313,7 @@ def render():
         for calc in calculations:
             is_locked_item = calc.get("locked", False)
             locked_at = calc.get("locked_at", "")
-            month = calc.get("month") or calc.get("period", "")
+            month = calc["period"]
             overview_data.append({
                 "状态": "🔒 已锁定" if is_locked_item else "📝 未锁定",
                 "月份": month,
@@ -331,6 +326,10 @@ def render():
         overview_df = pd.DataFrame(overview_data)
         st.dataframe(overview_df, use_container_width=True, hide_index=True)
 
+    # 多期间报表导出（折叠面板）
+    with st.expander("📚 多期间报表导出", expanded=False):
+        render_report_export(calculations)
+
     # 月度对比功能
     st.markdown("---")
     st.subheader("月度对比")
@@ -349,8 +348,9 @@ def render():
             )
 
         if compare_month1 and compare_month2 and compare_month1 != compare_month2:
-            calc1 = next((c for c in calculations if (c.get("month") or c.get("period")) == compare_month1), None)
-            calc2 = next((c for c in calculations if (c.get("month") or c.get("period")) == compare_month2), None)
+            calc_map = {c["period"]: c for c in calculations}
+            calc1 = calc_map.get(compare_month1)
+            calc2 = calc_map.get(compare_month2)
 
             if calc1 and calc2:
                 col1, col2, col3 = st.columns(3)
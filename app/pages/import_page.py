@@ -9,111 +9,37 @@ from datetime import datetime
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 from app.data_manager import (
-    get_employees, add_employee, get_regions,
-    save_json, load_json
+    get_employees, add_employees, get_regions,
+    update_json, BUSY_MESSAGE, LockTimeoutError
 )
+from app.erp_import import iter_erp_chunks, read_erp_preview, summarize_chunks, summarize_erp_file
+from app.detail_store import PeriodDetailWriter, migrate_json_raw_details
 
 
 def parse_erp_excel(uploaded_file):
-    """解析ERP导出的Excel文件（支持HTML格式）"""
+    """解析ERP导出的Excel文件（支持HTML格式），整个文件读成一个 DataFrame"""
     try:
-        # 尝试不同的读取方式
-        try:
-            # 先尝试HTML格式（ERP常用）
-            dfs = pd.read_html(uploaded_file)
-            if dfs:
-                df = dfs[0]
-            else:
-                raise ValueError("无法解析HTML")
-        except:
-            try:
-                # 尝试xlsx格式
-                df = pd.read_excel(uploaded_file, engine='openpyxl')
-            except:
-                try:
-                    # 尝试xls格式
-                    df = pd.read_excel(uploaded_file, engine='xlrd')
-                except Exception as e:
-                    return None, f"无法解析文件格式: {e}"
-
-        return df, None
+        chunks = list(iter_erp_chunks(uploaded_file))
+        if not chunks:
+            return None, "无法解析文件格式: 文件为空"
+        return pd.concat(chunks, ignore_index=True), None
     except Exception as e:
         return None, f"解析失败: {e}"
 
 
 def summarize_performance(df, period):
     """
-    汇总绩效数据
+    汇总绩效数据（已读入内存的 DataFrame）
 
     按姓名分组，汇总：
     - 印前 = 工序"印前处理"的绩效分合计
     - 图纸印中 = 工序"印中制作" + 业务类别为"蓝图"或"工程图纸"
     - 数码印中 = 工序"印中制作" + 其他业务类别
     - 印后 = 工序"印后加工"的绩效分合计
-    """
-    # 确保必要的列存在
-    required_cols = ['姓名', '工序', '业务类别', '绩效分']
-    missing_cols = [col for col in required_cols if col not in df.columns]
-    if missing_cols:
-        return None, f"缺少必要的列: {', '.join(missing_cols)}"
-
-    # 获取所有员工姓名
-    employees = df['姓名'].unique().tolist()
-
-    summary = []
-    raw_details = []  # 保存原始明细用于穿透查询
-
-    for emp_name in employees:
-        if not emp_name or pd.isna(emp_name) or str(emp_name).strip() == '':
-            continue
-
-        emp_name = str(emp_name).strip()
-        emp_df = df[df['姓名'] == emp_name]
-
-        # 汇总各工序绩效分
-        # 印前
-        pre_press = emp_df[emp_df['工序'] == '印前处理']['绩效分'].sum()
-
-        # 印中 - 需要细分
-        mid_press_df = emp_df[emp_df['工序'] == '印中制作']
-        # 图纸印中：蓝图、工程图纸
-        drawing_mid = mid_press_df[mid_press_df['业务类别'].isin(['蓝图', '工程图纸'])]['绩效分'].sum()
-        # 数码印中：其他业务类别
-        digital_mid = mid_press_df[~mid_press_df['业务类别'].isin(['蓝图', '工程图纸'])]['绩效分'].sum()
-
-        # 印后
-        post_press = emp_df[emp_df['工序'] == '印后加工']['绩效分'].sum()
-
-        # 汇总记录
-        summary.append({
-            'employee_name': emp_name,
-            'period': period,
-            'pre_press': float(pre_press),           # 印前
-            'drawing_mid': float(drawing_mid),       # 图纸印中
-            'digital_mid': float(digital_mid),       # 数码印中
-            'mid_press': float(drawing_mid + digital_mid),  # 印中合计
-            'post_press': float(post_press),         # 印后
-        })
-
-        # 保存原始明细
-        for _, row in emp_df.iterrows():
-            raw_details.append({
-                'period': period,
-                'employee_name': emp_name,
-                'order_no': str(row.get('订单编号', '')),
-                'customer': str(row.get('客户名称', '')),
-                'process': str(row.get('工序', '')),
-                'business_type': str(row.get('业务类别', '')),
-                'item': str(row.get('制作项', '')),
-                'quantity': float(row.get('数量', 0)) if pd.notna(row.get('数量')) else 0,
-                'score': float(row.get('绩效分', 0)) if pd.notna(row.get('绩效分')) else 0,
-                'register_time': str(row.get('登记时间', '')),
-            })
 
-    return {
-        'summary': summary,
-        'raw_details': raw_details
-    }, None
+    大文件请直接用 summarize_erp_file 分块读取汇总
+    """
+    return summarize_chunks([df], period)
 
 
 def render():
@@ -154,33 +80,33 @@ def render():
     if uploaded_file:
         st.success(f"已上传: {uploaded_file.name}")
 
-        # 解析文件
+        # 解析文件（只读取开头几行用于预览，汇总时再分块读取整个文件）
         with st.spinner("正在解析文件..."):
-            df, error = parse_erp_excel(uploaded_file)
+            preview_df, error = read_erp_preview(uploaded_file)
 
         if error:
             st.error(error)
             return
 
-        if df is None or df.empty:
+        if preview_df is None or preview_df.empty:
             st.error("文件为空或无法解析")
             return
 
         # 显示数据预览
         st.subheader("原始数据预览")
-        st.dataframe(df.head(10), use_container_width=True)
-        st.caption(f"共 {len(df)} 条明细记录")
+        st.dataframe(preview_df, use_container_width=True)
 
         # 显示列信息
         with st.expander("查看数据列"):
-            st.write(df.columns.tolist())
+            st.write(preview_df.columns.tolist())
 
         st.markdown("---")
 
         # 预览汇总结果
         if st.button("📊 预览汇总结果", type="secondary"):
+            # 预览只需要汇总，明细直接丢弃，不在内存中收集
             with st.spinner("正在汇总数据..."):
-                result, error = summarize_performance(df, import_period)
+                result, error = summarize_erp_file(uploaded_file, import_period, detail_sink=_discard_details)
 
             if error:
                 st.error(error)
@@ -205,39 +131,31 @@ def render():
 
             preview_df = pd.DataFrame(preview_data)
             st.dataframe(preview_df, use_container_width=True)
-            st.caption(f"共 {len(summary)} 名员工")
+            st.caption(f"共 {result['row_count']} 条明细记录，{len(summary)} 名员工")
 
-            # 保存到session_state供导入使用
-            st.session_state['pending_import'] = result
+            # 只把汇总保存到session_state，明细在确认导入时分块写入
+            st.session_state['pending_import'] = {'summary': summary, 'row_count': result['row_count']}
             st.session_state['pending_period'] = import_period
 
         # 导入按钮
         st.markdown("---")
 
         if st.button("🚀 确认导入", type="primary"):
-            # 检查是否已预览
-            if 'pending_import' not in st.session_state:
-                # 先执行汇总
-                with st.spinner("正在汇总数据..."):
-                    result, error = summarize_performance(df, import_period)
-
-                if error:
-                    st.error(error)
-                    return
-            else:
-                result = st.session_state['pending_import']
-                # 更新期间（以防用户修改了）
-                if st.session_state.get('pending_period') != import_period:
-                    # 期间变了，重新汇总
-                    with st.spinner("正在汇总数据..."):
-                        result, error = summarize_performance(df, import_period)
-                    if error:
-                        st.error(error)
-                        return
+            # 重新分块读取文件：汇总的同时把每块明细追加写入该期间的明细文件，
+            # 整个导入过程中内存里只有一块明细
+            detail_writer = PeriodDetailWriter(import_period)
+            with st.spinner("正在汇总数据..."):
+                result, error = summarize_erp_file(uploaded_file, import_period,
+                                                   detail_sink=detail_writer.append)
+
+            if error:
+                detail_writer.abort()
+                st.error(error)
+                return
 
             # 开始导入
             with st.spinner("正在导入数据..."):
-                import_result = do_import(result, import_period)
+                import_result = do_import(result, import_period, detail_writer)
 
             if import_result["success"]:
                 st.success(f"""
@@ -263,45 +181,51 @@ def render():
                 st.error(f"导入失败: {import_result.get('error', '未知错误')}")
 
 
-def do_import(result, import_period):
-    """执行导入操作"""
+def _discard_details(records):
+    """预览汇总时不需要明细"""
+
+
+def do_import(result, import_period, detail_writer: PeriodDetailWriter = None):
+    """执行导入操作
+
+    detail_writer 为汇总时已分块写入明细的 PeriodDetailWriter，在这里补上员工ID，
+    绩效记录保存成功后提交；
+    不传时使用 result 中收集的 raw_details
+    """
+    if detail_writer is None:
+        detail_writer = PeriodDetailWriter(import_period)
+        detail_writer.append(result.get('raw_details', []))
+
     try:
         employees = get_employees()
         emp_name_map = {e["name"]: e for e in employees}
 
         summary = result['summary']
-        raw_details = result['raw_details']
 
-        # 加载绩效数据
-        perf_data = load_json("performance.json")
-        if not perf_data:
-            perf_data = {"records": [], "imports": [], "raw_details": []}
-
-        records = perf_data.get("records", [])
-        imports = perf_data.get("imports", [])
-        existing_raw = perf_data.get("raw_details", [])
+        # 明细单独按期间存储，不在 performance.json 中
+        migrate_json_raw_details()
 
+        records = []
         new_employees = 0
         imported_records = 0
         details = []
 
-        # 移除该期间的旧记录
-        records = [r for r in records if r.get("period") != import_period]
-        existing_raw = [r for r in existing_raw if r.get("period") != import_period]
+        # 未匹配的员工一次性批量新增
+        new_names = [item['employee_name'] for item in summary if item['employee_name'] not in emp_name_map]
+        if new_names:
+            emp_name_map.update(add_employees(new_names, "mode_002"))  # 默认中央工厂
+        new_name_set = set(new_names)
 
         for item in summary:
             emp_name = item['employee_name']
 
             # 查找或创建员工
-            if emp_name in emp_name_map:
-                emp = emp_name_map[emp_name]
-                status = "匹配"
-            else:
-                # 新增员工
-                emp = add_employee(emp_name, None, "mode_002")  # 默认中央工厂
-                emp_name_map[emp_name] = emp
+            emp = emp_name_map[emp_name]
+            if emp_name in new_name_set:
                 new_employees += 1
                 status = "新增"
+            else:
+                status = "匹配"
 
             # 创建绩效记录（新格式，包含印中细分）
             record = {
@@ -335,37 +259,40 @@ def do_import(result, import_period):
                 "印后": f"{item['post_press']:,.0f}",
             })
 
-        # 添加原始明细（用于穿透查询）
-        # 为每条明细关联员工ID
-        for detail in raw_details:
-            emp_name = detail['employee_name']
-            if emp_name in emp_name_map:
-                detail['employee_id'] = emp_name_map[emp_name]['id']
-            existing_raw.append(detail)
-
-        # 记录导入历史
-        imports.append({
-            "period": import_period,
-            "imported_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "record_count": imported_records,
-            "detail_count": len(raw_details),
-            "new_employees": new_employees
-        })
-
-        perf_data["records"] = records
-        perf_data["imports"] = imports
-        perf_data["raw_details"] = existing_raw
-
-        save_json("performance.json", perf_data)
+        # 原始明细（用于穿透查询）先写到临时文件，写出时为每条明细关联员工ID；
+        # 绩效记录保存成功后才替换该期间的明细，保存失败时原有的明细不变
+        emp_id_map = {name: emp['id'] for name, emp in emp_name_map.items()}
+        detail_writer.prepare(emp_id_map)
+        detail_count = detail_writer.row_count
+
+        # 加锁替换该期间的记录并记录导入历史（其他会话同时导入的期间不会丢失）
+        def mutate(perf_data):
+            perf_data["records"] = [r for r in perf_data.get("records", [])
+                                    if r.get("period") != import_period] + records
+            perf_data.setdefault("imports", []).append({
+                "period": import_period,
+                "imported_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "record_count": imported_records,
+                "detail_count": detail_count,
+                "new_employees": new_employees
+            })
+
+        update_json("performance.json", mutate)
+        detail_writer.commit()
 
         return {
             "success": True,
             "new_employees": new_employees,
             "imported_records": imported_records,
-            "detail_records": len(raw_details),
+            "detail_records": detail_count,
             "details": details
         }
 
+    except LockTimeoutError:
+        detail_writer.abort()
+        return {"success": False, "error": BUSY_MESSAGE}
+
     except Exception as e:
         import traceback
+        detail_writer.abort()
         return {"success": False, "error": f"{str(e)}\n{traceback.format_exc()}"}
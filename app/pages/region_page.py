@@ -8,6 +8,7 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 from app.data_manager import get_regions, update_region, add_region, save_json, load_json
+from app.engine import validate_ladder_rules
 
 
 def render():
@@ -190,19 +191,25 @@ def render():
         col1, col2 = st.columns(2)
         with col1:
             if st.button("💾 保存所有修改", type="primary"):
-                updates = {
-                    "erp_column": erp_column or None,
-                    "threshold": threshold,
-                    "ladder_rules": editing_rules
-                }
-
-                if update_region(selected_region_id, updates):
-                    st.success("保存成功！")
-                    # 清除编辑状态
-                    del st.session_state[f"editing_rules_{selected_region_id}"]
-                    st.rerun()
+                # 先校验阶梯规则（排序、重叠）
+                problems = validate_ladder_rules(editing_rules)
+                if problems:
+                    for problem in problems:
+                        st.error(problem)
                 else:
-                    st.error("保存失败")
+                    updates = {
+                        "erp_column": erp_column or None,
+                        "threshold": threshold,
+                        "ladder_rules": editing_rules
+                    }
+
+                    if update_region(selected_region_id, updates):
+                        st.success("保存成功！")
+                        # 清除编辑状态
+                        del st.session_state[f"editing_rules_{selected_region_id}"]
+                        st.rerun()
+                    else:
+                        st.error("保存失败")
 
         with col2:
             if st.button("🔄 重置修改"):
@@ -0,0 +1,258 @@
+"""
+计算结果表格 - 服务端分页、排序、筛选的可点击单元格表格
+版本: 1.0.0
+
+原来计算页面和计算历史页面每次重新运行都为全部员工构建 DataFrame，
+整张表以 JSON 发送到浏览器并逐行渲染，几千人时每次点击都很慢。现在：
+- 筛选、排序在服务端按列取值完成，排好的行顺序按视图缓存在 session_state 中，
+  翻页、点击单元格引起的重新运行不再重新排序
+- 只为当前页的行构建 DataFrame 发送给 st_table_select_cell 组件，
+  浏览器中的行数不超过每页行数（组件前端只有打包好的文件，用服务端分页代替虚拟滚动）
+- 组件使用稳定的 key（表格名 + 视图），同一视图重新运行时不重新挂载；
+  换页、换排序后旧的点击不会对应到新页面的另一行
+- 行顺序、当前页的 DataFrame 和导出用的 DataFrame 按 (表格, 结果版本, 视图) 缓存在
+  进程内有上限的 LRU 中，点击单元格打开弹窗引起的重新运行不再构建任何表格
+- 导出文件只在用户点击「生成导出文件」后才生成（见 app/excel_export.py），
+  按结果版本缓存，之后的重新运行直接提供下载
+"""
+__version__ = "1.0.0"
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+import st_table_select_cell as table_component
+
+from app.excel_export import CSV_MIME, XLSX_MIME, frame_to_csv, frame_to_xlsx
+
+PAGE_SIZES = [20, 50, 100, 200]
+DEFAULT_PAGE_SIZE = 50
+EXPORT_FORMATS = {"Excel": ("xlsx", XLSX_MIME), "CSV": ("csv", CSV_MIME)}
+
+
+class FrameCache:
+    """
+    有上限的 LRU 缓存：(表格, 结果版本, ...) → 构建好的 DataFrame 或行顺序
+
+    进程内所有会话共用，超过上限时淘汰最久未使用的一条；
+    缓存的对象会被多次返回，调用方只读不改
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        """取缓存，没有时调用 build() 构建并缓存"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+        value = build()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def peek(self, key):
+        """只取已缓存的值，没有时返回 None（不构建）"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+frame_cache = FrameCache()
+
+
+def regions_key(regions: list) -> tuple:
+    """区域配置中影响表格列的部分，作为缓存键的一部分"""
+    return tuple((r["id"], r["name"]) for r in regions)
+
+
+def cached_frame(kind: str, version, build) -> pd.DataFrame:
+    """按 (用途, 结果版本) 缓存的 DataFrame；version 为 None 时不缓存"""
+    if version is None:
+        return build()
+    return frame_cache.get((kind, version), build)
+
+
+def _extra_total(r: dict) -> int:
+    total = sum(v.get("amount", 0) for v in r.get("extra_income", {}).values())
+    return round(total) if total > 0 else 0
+
+
+def _region_value(region_id: str, field: str):
+    def getter(r):
+        rd = r.get("regions", {}).get(region_id)
+        return round(rd.get(field, 0)) if rd is not None else 0
+    return getter
+
+
+def result_columns(regions: list, period: str, role: bool = False, extra: bool = False) -> list:
+    """
+    结果表格的列定义 [(列名, 取值函数)]
+
+    列与原来的表格相同：期间、员工ID、姓名、[角色]、各区域绩效/金额、[额外收入]、总金额
+    """
+    columns = [
+        ("期间", lambda r: period),
+        ("员工ID", lambda r: r.get("employee_id", "")),
+        ("姓名", lambda r: r.get("employee_name", "")),
+    ]
+    if role:
+        columns.append(("角色", lambda r: r.get("role_name", "未指定")))
+    for region in regions:
+        columns.append((f"{region['name']}绩效", _region_value(region["id"], "score")))
+        columns.append((f"{region['name']}金额", _region_value(region["id"], "total")))
+    if extra:
+        columns.append(("额外收入", _extra_total))
+    columns.append(("总金额", lambda r: round(r.get("total_salary", 0))))
+    return columns
+
+
+def filter_rows(results: list, text: str) -> list:
+    """按员工ID、姓名、角色筛选（不区分大小写的包含匹配），返回结果下标"""
+    text = text.strip().lower()
+    if not text:
+        return list(range(len(results)))
+    return [i for i, r in enumerate(results)
+            if text in str(r.get("employee_id", "")).lower()
+            or text in str(r.get("employee_name", "")).lower()
+            or text in str(r.get("role_name", "")).lower()]
+
+
+def sort_rows(results: list, rows: list, getter, descending: bool = False) -> list:
+    """按某列排序结果下标（稳定排序，值相同时保持原顺序）"""
+    if getter is None:
+        return rows
+    return sorted(rows, key=lambda i: getter(results[i]), reverse=descending)
+
+
+def page_frame(results: list, rows: list, columns: list) -> pd.DataFrame:
+    """只为一页的行构建 DataFrame"""
+    return pd.DataFrame([{name: getter(results[i]) for name, getter in columns} for i in rows],
+                        columns=[name for name, _ in columns])
+
+
+def _view_order(key: str, version, results: list, columns: list, text: str, sort_by: str,
+                descending: bool) -> list:
+    """筛选排序后的结果下标"""
+    def build():
+        getter = dict(columns).get(sort_by)
+        return sort_rows(results, filter_rows(results, text), getter, descending)
+
+    if version is None:
+        return build()
+    names = tuple(name for name, _ in columns)
+    return frame_cache.get((key, "order", version, names, text, sort_by, descending), build)
+
+
+def render_results_grid(results: list, columns: list, key: str, version=None):
+    """
+    显示分页的结果表格
+
+    version 为结果版本（结果或列变化时随之变化的可哈希值），
+    给出时行顺序和每页的 DataFrame 都按版本缓存；为 None 时每次重新构建。
+    返回 (点击的结果, 点击的列名)，没有点击时返回 None
+    """
+    names = tuple(name for name, _ in columns)
+
+    col_search, col_sort, col_order, col_size = st.columns([3, 2, 1, 1])
+    with col_search:
+        text = st.text_input("筛选", key=f"{key}_filter", placeholder="员工ID / 姓名 / 角色")
+    with col_sort:
+        sort_by = st.selectbox("排序", ["默认顺序", *names[1:]], key=f"{key}_sort")
+    with col_order:
+        descending = st.selectbox("顺序", ["降序", "升序"], key=f"{key}_desc") == "降序"
+    with col_size:
+        page_size = st.selectbox("每页", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE),
+                                 key=f"{key}_size")
+
+    order = _view_order(key, version, results, columns, text, sort_by, descending)
+    if not order:
+        st.info("没有符合筛选条件的员工")
+        return None
+
+    # 筛选、排序、每页行数变化后回到第一页；结果变少时页码不超过总页数
+    pages = -(-len(order) // page_size)
+    view = f"{len(results)}|{text}|{sort_by}|{descending}|{page_size}"
+    page_key = f"{key}_page"
+    if st.session_state.get(f"{key}_view") != view:
+        st.session_state[f"{key}_view"] = view
+        st.session_state[page_key] = 1
+    st.session_state[page_key] = min(max(int(st.session_state.get(page_key, 1)), 1), pages)
+    page = st.session_state[page_key]
+    if pages > 1:
+        page = st.number_input(f"页码（共 {pages} 页，{len(order)} 人）", min_value=1, max_value=pages,
+                               step=1, key=page_key)
+    rows = order[(page - 1) * page_size:page * page_size]
+    if version is None:
+        df = page_frame(results, rows, columns)
+    else:
+        df = frame_cache.get((key, "page", version, names, text, sort_by, descending, page_size, page),
+                             lambda: page_frame(results, rows, columns))
+
+    # 同一视图重新运行时 key 不变；换页、换排序时换 key，组件重新挂载，不保留上一页的点击
+    view_key = f"{key}_{hashlib.md5(f'{view}|{page}'.encode('utf-8')).hexdigest()[:8]}"
+    cell_clicked = table_component.st_table_select_cell(df, key=view_key)
+
+    if not cell_clicked:
+        return None
+    row_idx = int(cell_clicked.get("rowId", 0))
+    col_idx = cell_clicked.get("colIndex")
+    if col_idx is None or not 0 <= row_idx < len(rows) or col_idx >= len(names):
+        return None
+    return results[rows[row_idx]], names[col_idx]
+
+
+def render_export(key: str, version, build_frame, file_stem: str, sheet_name: str,
+                  label: str = "下载Excel"):
+    """
+    导出按钮：点击「生成导出文件」后才构建导出数据并生成文件
+
+    build_frame() 返回导出用的 DataFrame；生成的文件按 (表格, 格式, 结果版本) 缓存，
+    同一版本之后的重新运行直接显示下载按钮；version 为 None 时只在本次运行中有效
+    """
+    fmt = st.radio("导出格式", list(EXPORT_FORMATS), horizontal=True, key=f"{key}_format",
+                   help="人数很多时 CSV 生成最快，Excel 可直接打开")
+    ext, mime = EXPORT_FORMATS[fmt]
+    cache_key = (key, "file", fmt, version)
+
+    data = frame_cache.peek(cache_key) if version is not None else None
+    if data is None and st.button("生成导出文件", key=f"{key}_prepare"):
+        def build():
+            df = cached_frame(f"{key}_export", version, build_frame)
+            return frame_to_xlsx(df, sheet_name) if ext == "xlsx" else frame_to_csv(df)
+
+        with st.spinner("正在生成导出文件..."):
+            data = build() if version is None else frame_cache.get(cache_key, build)
+
+    if data is not None:
+        st.download_button(
+            label=label if ext == "xlsx" else label.replace("Excel", "CSV"),
+            data=data,
+            file_name=f"{file_stem}.{ext}",
+            mime=mime,
+            key=f"{key}_download",
+        )
@@ -2,6 +2,11 @@
 方案管理页面 - 管理配置方案
 """
 import streamlit as st
+import pandas as pd
+from app.calculation import list_periods
+from app.engine import LadderRuleError
+from app.scheme_compare import compare_schemes, CURRENT
+from app.scheme_store import has_snapshot
 from app.data_manager import (
     get_schemes, get_active_scheme, get_scheme_by_id,
     save_as_scheme, update_scheme_info, delete_scheme,
@@ -118,6 +123,9 @@ def render():
                             st.session_state[f"confirm_delete_{scheme_id}"] = False
                             st.rerun()
 
+    st.markdown("---")
+    render_compare(schemes)
+
     # 使用说明
     with st.expander("💡 使用说明", expanded=False):
         st.markdown("""
@@ -129,10 +137,95 @@ def render():
         1. **创建方案**：点击「新建方案」，输入名称和描述
         2. **切换方案**：点击「切换到此方案」，当前配置会被替换为该方案的内容
         3. **更新快照**：修改配置后，点击「更新快照」保存到当前方案
-        4. **对比测算**：在绩效计算页面，切换不同方案分别计算，对比结果
+        4. **对比测算**：在下方「方案对比」中选择期间和多个方案，直接计算并对比每个员工、每个区域的差异（不会切换或改动当前配置）
 
         **注意事项**
         - 切换方案会覆盖当前配置，请先保存
         - 不能删除当前使用中的方案
         - 删除操作不可恢复
         """)
+
+
+def scheme_labels(schemes: list) -> dict:
+    """方案ID → 显示的列名；方案重名（或与其他列同名）时加序号区分"""
+    used = {"姓名", "区域"}
+    labels = {}
+    for scheme in schemes:
+        label = base = scheme["name"]
+        i = 2
+        while label in used or f"{label}_差额" in used:
+            label = f"{base}({i})"
+            i += 1
+        used.update({label, f"{label}_差额"})
+        labels[scheme["id"]] = label
+    return labels
+
+
+def render_compare(schemes: list):
+    """方案对比：多个方案在内存中计算同一期间，显示与基准方案的差异"""
+    st.markdown("### 📊 方案对比")
+
+    periods = list_periods()
+    if not periods:
+        st.info("暂无绩效数据，导入绩效后可对比方案")
+        return
+
+    options = {CURRENT: "当前配置"}
+    options.update({s["id"]: s["name"] for s in schemes if has_snapshot(s)})
+
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        period = st.selectbox("对比期间", options=periods, key="compare_period")
+    with col2:
+        selected = st.multiselect(
+            "对比方案（第一个为基准）",
+            options=list(options),
+            default=list(options)[:2],
+            format_func=lambda sid: options[sid],
+            key="compare_schemes"
+        )
+
+    if st.button("开始对比", key="do_compare", disabled=len(selected) < 2):
+        with st.spinner("正在计算..."):
+            try:
+                # 在当前进程中计算：启动进程、传送数据的开销比几个方案的计算本身大得多
+                st.session_state["compare_result"] = compare_schemes(period, selected)
+            except (LadderRuleError, ValueError) as e:
+                st.error(f"对比失败：{e}")
+
+    result = st.session_state.get("compare_result")
+    if not result or result["period"] != period:
+        return
+
+    labels = scheme_labels(result["schemes"])
+    cols = st.columns(len(result["schemes"]))
+    for col, scheme in zip(cols, result["schemes"]):
+        with col:
+            st.metric(labels[scheme["id"]], f"¥{scheme['total_salary']:,.2f}",
+                      delta=f"{scheme['delta']:+,.2f}" if scheme["delta"] else None)
+
+    only_changed = st.checkbox("只显示有差异的行", value=True, key="compare_only_changed")
+    base_id = result["schemes"][0]["id"]
+    # 列按方案ID区分，方案名只用作显示的列名
+    headers = {"name": "姓名", "region": "区域"}
+    for sid, label in labels.items():
+        headers[("value", sid)] = label
+        if sid != base_id:
+            headers[("delta", sid)] = f"{label}_差额"
+    table_data = []
+    for row in result["rows"]:
+        if only_changed and not row["changed"]:
+            continue
+        item = {"name": row["employee_name"], "region": row["region_name"]}
+        for sid in labels:
+            item[("value", sid)] = row["values"][sid]
+            if sid != base_id:
+                item[("delta", sid)] = row["deltas"][sid]
+        table_data.append(item)
+
+    if table_data:
+        df = pd.DataFrame(table_data, columns=list(headers))
+        df.columns = list(headers.values())
+        st.dataframe(df, use_container_width=True, hide_index=True)
+    else:
+        st.info("所选方案的计算结果没有差异")
@@ -8,7 +8,7 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 from app.data_manager import (
-    get_skills, add_skill, update_skill, batch_update_skills,
+    get_skills, add_skill, update_skill, batch_update_skills, transaction,
     get_modes, get_mode_by_id, get_regions, get_region_by_id,
     save_json, load_json
 )
@@ -197,6 +197,21 @@ def render():
         if col_idx == 4 and idx < len(filtered_skills) - 1:
             cols = st.columns(5)
 
+    # 一次保存所有改动过工资的技能（一个事务，只写一次文件）
+    changed = [
+        (skill, st.session_state.get(f"on_{skill['id']}", skill.get("salary_on_duty", 200)),
+         st.session_state.get(f"off_{skill['id']}", skill.get("salary_off_duty", 100)))
+        for skill in filtered_skills
+    ]
+    changed = [(skill, on, off) for skill, on, off in changed
+               if on != skill.get("salary_on_duty", 200) or off != skill.get("salary_off_duty", 100)]
+    if st.button(f"💾 保存全部修改（{len(changed)}个）", disabled=not changed):
+        with transaction("skills.json"):
+            for skill, new_on, new_off in changed:
+                update_skill(skill["id"], {"salary_on_duty": new_on, "salary_off_duty": new_off})
+        st.success(f"已保存 {len(changed)} 个技能的工资")
+        st.rerun()
+
     # 统计信息
     st.markdown("---")
     st.caption(f"共 {len(filtered_skills)} 个技能，已选中 {len(st.session_state.selected_skills)} 个")
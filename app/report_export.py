@@ -0,0 +1,142 @@
+"""
+多期间报表导出 - 把多个已保存的计算结果逐行写入同一个工作簿
+版本: 1.0.0
+
+用法:
+    python -m app.report_export 2025-01:2025-12 -o 2025年报.xlsx
+    python -m app.report_export 2025-12,2025-12-方案一 -o 对比.xlsx
+    python -m app.report_export all -o 全部.xlsx
+
+- 选择的是计算历史中的保存名称（期间或 "期间-方案名"），
+  写法与 app.batch_runner 的期间参数相同：逗号分隔、"起:止" 区间（含两端）或 all
+- 第一个工作表是汇总（每个保存名称一行，取自历史清单，不读取计算结果），
+  之后每个保存名称一个工作表，列与历史查询页面的导出相同
+- 按顺序逐个读取期间的结果文件，边读边写入（见 app/excel_export.py），
+  同一时间只有一个期间的结果在内存中，内存不随期间数增长
+"""
+__version__ = "1.0.0"
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.data_manager import get_regions
+from app.excel_export import MAX_SHEET_NAME, sheet_title, write_xlsx
+from app.history_store import list_calculations, load_calculation
+
+SUMMARY_SHEET = "汇总"
+SUMMARY_HEADER = ["保存名称", "计算时间", "人数", "工资总额", "人均工资", "锁定"]
+REGION_FIELDS = (("绩效分", "score"), ("在岗", "is_on_duty"), ("技能工资", "skill_salary"),
+                 ("阶梯奖金", "ladder_bonus"), ("小计", "total"))
+
+
+def period_header(regions: list) -> list:
+    """期间工作表的表头（与历史查询页面导出的列相同）"""
+    header = ["员工ID", "姓名", "月份"]
+    for region in regions:
+        header.extend(f"{region['name']}_{label}" for label, _ in REGION_FIELDS)
+    header.append("总工资")
+    return header
+
+
+def period_rows(results: list, regions: list, name: str):
+    """一个期间的数据行（逐行生成，没有该区域的员工对应的列留空）"""
+    for r in results:
+        row = [r.get("employee_id", ""), r.get("employee_name", ""), name]
+        for region in regions:
+            rd = r.get("regions", {}).get(region["id"])
+            if rd is None:
+                row.extend([None] * len(REGION_FIELDS))
+                continue
+            for _, field in REGION_FIELDS:
+                if field == "is_on_duty":
+                    row.append("是" if rd.get(field) else "否")
+                else:
+                    row.append(rd.get(field, 0))
+        row.append(r.get("total_salary", 0))
+        yield row
+
+
+def summary_rows(calculations: list):
+    """汇总工作表的数据行（取自历史清单中的汇总信息）"""
+    for calc in calculations:
+        count = calc.get("employee_count", 0)
+        total = calc.get("total_salary", 0)
+        yield [calc["period"], calc.get("calculated_at", ""), count, round(total, 2),
+               round(total / count, 2) if count else 0, "是" if calc.get("locked") else "否"]
+
+
+def select_calculations(names: list) -> list:
+    """按给出的顺序取保存名称对应的历史汇总信息，不存在的名称抛出 ValueError"""
+    available = {c["period"]: c for c in list_calculations()}
+    missing = [n for n in names if n not in available]
+    if missing:
+        raise ValueError(f"计算历史中没有: {'、'.join(missing)}")
+    return [available[n] for n in names]
+
+
+def _sheet_names(names: list) -> list:
+    """每个保存名称的工作表名（截断到 31 个字符后重名的加序号）"""
+    used = {SUMMARY_SHEET}
+    titles = []
+    for name in names:
+        title = base = sheet_title(name)
+        i = 2
+        while title in used:
+            suffix = f"_{i}"
+            title = base[:MAX_SHEET_NAME - len(suffix)] + suffix
+            i += 1
+        used.add(title)
+        titles.append(title)
+    return titles
+
+
+def _sheets(calculations: list, regions: list):
+    """依次生成 (工作表名, 表头, 行)；期间结果在写到它时才读取"""
+    yield SUMMARY_SHEET, SUMMARY_HEADER, summary_rows(calculations)
+
+    header = period_header(regions)
+    names = [c["period"] for c in calculations]
+    for name, title in zip(names, _sheet_names(names)):
+        calc = load_calculation(name, cache=False) or {}
+        yield title, header, period_rows(calc.get("results", []), regions, name)
+
+
+def export_report(names: list, target, regions: list = None):
+    """
+    把多个保存名称的计算结果导出到一个工作簿
+
+    target 为文件路径或可写的二进制文件对象；regions 默认取当前区域配置
+    """
+    calculations = select_calculations(names)
+    write_xlsx(target, _sheets(calculations, get_regions() if regions is None else regions))
+
+
+def main(argv=None) -> int:
+    from app.batch_runner import parse_periods
+
+    parser = argparse.ArgumentParser(description="多期间报表导出")
+    parser.add_argument("names", help="保存名称：2025-12 / 2025-01,2025-02 / 2025-01:2025-12 / all")
+    parser.add_argument("-o", "--output", required=True, help="输出的 xlsx 文件")
+    args = parser.parse_args(argv)
+
+    names = parse_periods(args.names, [c["period"] for c in list_calculations()])
+    if not names:
+        print("[错误] 没有符合条件的计算历史")
+        return 1
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        export_report(names, output)
+    except ValueError as e:
+        print(f"[错误] {e}")
+        return 1
+    print(f"[报表] 已导出 {len(names)} 个期间: {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+内存索引仓库 - 为JSON数据文件建立哈希索引
+版本: 1.0.0
+
+每个数据文件在一个"数据版本"内只建立一次索引：
+- 主键索引：id → 记录（员工-技能关联为 (employee_id, skill_id) → 记录）
+- 分组索引：字段值 → 记录列表（如 employee_id → 该员工的所有技能关联）
+
+数据版本由两部分组成：本进程的写入计数（save_json 写入时由 data_manager 调用
+invalidate 加一）和存储后端的文件戳（与 load_json 的缓存校验键相同），
+其他进程或外部工具修改文件后索引也会重建。查询不再对整个列表做线性扫描。
+"""
+__version__ = "1.0.0"
+
+import threading
+
+# 数据文件 → (列表字段名, 主键字段)
+COLLECTIONS = {
+    "employees.json": ("employees", ("id",)),
+    "modes.json": ("modes", ("id",)),
+    "regions.json": ("regions", ("id",)),
+    "skills.json": ("skills", ("id",)),
+    "employee_skills.json": ("employee_skills", ("employee_id", "skill_id")),
+    "schemes.json": ("schemes", ("id",)),
+    "roles.json": ("roles", ("id",)),
+    "bonus_pools.json": ("pools", ("id",)),
+    "income_rules.json": ("rules", ("type",)),
+}
+
+
+def record_key(record: dict, key_fields: tuple):
+    """取记录的主键（单字段返回值本身，多字段返回元组）"""
+    if len(key_fields) == 1:
+        return record.get(key_fields[0])
+    return tuple(record.get(f) for f in key_fields)
+
+
+class _FileIndex:
+    """单个文件在某一数据版本下的索引"""
+
+    def __init__(self, version, records: list, key_fields: tuple):
+        self.version = version
+        self.records = records
+        self.by_key = {}      # 主键 → 记录
+        self.positions = {}   # 主键 → 在列表中的位置
+        self.groups = {}      # 字段名 → {字段值 → [记录]}（按需构建）
+
+        for pos, record in enumerate(records):
+            key = record_key(record, key_fields)
+            # 重复主键时保留第一条，与原来线性查找的结果一致
+            if key not in self.by_key:
+                self.by_key[key] = record
+                self.positions[key] = pos
+
+
+class Repository:
+    """
+    带哈希索引的只读数据仓库
+
+    loader: 读取数据文件的函数（通常是 data_manager.load_json）
+    stamp:  stamp(filename) 返回文件戳（文件被外部修改时随之变化），为 None 表示不检查
+
+    注意：get / group 返回的记录是索引内部的共享对象，调用方只能读取，
+    需要修改时请走 data_manager 的更新函数。
+    """
+
+    def __init__(self, loader, stamp=None):
+        self._loader = loader
+        self._stamp = stamp or (lambda filename: None)
+        self._versions = {}   # 文件名 → 本进程的写入计数
+        self._indexes = {}    # 文件名 → _FileIndex
+        self._lock = threading.Lock()
+
+    def version(self, filename: str) -> tuple:
+        """获取文件当前的数据版本：(本进程写入计数, 文件戳)"""
+        return self._versions.get(filename, 0), self._stamp(filename)
+
+    def invalidate(self, filename: str):
+        """文件被写入后调用：版本号加一并丢弃旧索引"""
+        with self._lock:
+            self._versions[filename] = self._versions.get(filename, 0) + 1
+            self._indexes.pop(filename, None)
+
+    def _get_index(self, filename: str) -> _FileIndex:
+        """获取文件索引，当前版本尚未建立时才读取文件并构建"""
+        version = self.version(filename)
+        index = self._indexes.get(filename)
+        if index is not None and index.version == version:
+            return index
+
+        list_key, key_fields = COLLECTIONS[filename]
+        with self._lock:
+            index = self._indexes.get(filename)
+            if index is not None and index.version == version:
+                return index
+            data = self._loader(filename) or {}
+            index = _FileIndex(version, data.get(list_key, []), key_fields)
+            # 构建期间文件可能又被写入，此时不缓存旧版本的索引
+            if self.version(filename) == version:
+                self._indexes[filename] = index
+        return index
+
+    def get(self, filename: str, key):
+        """按主键获取记录，不存在返回 None"""
+        return self._get_index(filename).by_key.get(key)
+
+    def all(self, filename: str) -> list:
+        """获取文件中的全部记录"""
+        return self._get_index(filename).records
+
+    def position(self, filename: str, key):
+        """获取记录在列表中的位置，不存在返回 None"""
+        return self._get_index(filename).positions.get(key)
+
+    def group(self, filename: str, field: str, value) -> list:
+        """按字段值分组获取记录（分组索引在首次使用时构建）"""
+        index = self._get_index(filename)
+        groups = index.groups.get(field)
+        if groups is None:
+            groups = {}
+            for record in index.records:
+                groups.setdefault(record.get(field), []).append(record)
+            index.groups[field] = groups
+        return groups.get(value, [])
+
+    def locate(self, filename: str, records: list, key):
+        """
+        在调用方刚读取的列表中定位记录（供更新/删除使用）
+
+        先用位置索引直接命中，若该位置的主键不符（列表与索引不同步）
+        才退回线性查找，保证结果正确。
+        返回 (位置, 记录)，找不到返回 (None, None)
+        """
+        key_fields = COLLECTIONS[filename][1]
+        pos = self.position(filename, key)
+        if pos is None:
+            return None, None
+        if pos < len(records) and record_key(records[pos], key_fields) == key:
+            return pos, records[pos]
+
+        for i, record in enumerate(records):
+            if record_key(record, key_fields) == key:
+                return i, record
+        return None, None
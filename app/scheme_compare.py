@@ -0,0 +1,149 @@
+"""
+方案对比 - 用多个方案快照在内存中计算同一期间，输出逐人、逐区域的差异表
+版本: 1.0.0
+
+原来对比方案要先 load_scheme_to_current（覆盖 skills.json、regions.json、
+employee_skills.json 并备份），计算后再切换回来。现在：
+- 员工、角色、奖金池、外部数据、绩效记录只读一次
+- 每个方案只替换快照中的技能、区域、技能指派，在内存中计算，不读写配置文件
+- 多个方案可以在多个进程中并行计算（计算函数不访问数据文件）；
+  每个进程要重新导入 pandas 并接收全部输入，只在方案很多、人数很多时才划算，
+  界面中使用默认的 workers=1
+
+结果中的差异都以第一个方案为基准。
+"""
+__version__ = "1.0.0"
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from app.calculation import (
+    apply_snapshot, calculate_with_inputs, get_period_records, get_scheme_snapshot, load_inputs
+)
+from app.data_manager import get_scheme_by_id
+
+CURRENT = "current"          # 代表当前配置的方案ID
+TOTAL_ROW = "total_salary"   # 每个员工总工资那一行的区域ID
+
+
+def _calculate(args: tuple) -> list:
+    period_records, period, inputs = args
+    return calculate_with_inputs(period_records, period, inputs)
+
+
+def _region_totals(result: dict) -> dict:
+    totals = {region_id: rd["total"] for region_id, rd in result["regions"].items()}
+    totals[TOTAL_ROW] = result["total_salary"]
+    return totals
+
+
+def build_delta_table(schemes: list, results: dict) -> list:
+    """
+    由各方案的计算结果生成差异表
+
+    schemes 为 [{"id": ..., "name": ..., "regions": [...]}, ...]，第一个为基准；
+    results 为 方案ID → 计算结果。
+    返回每个员工每个区域一行（另有一行总工资）：
+    {"employee_id", "employee_name", "region_id", "region_name",
+     "values": {方案ID: 金额}, "deltas": {方案ID: 与基准的差额}, "changed": 是否有差异}
+    """
+    base_id = schemes[0]["id"]
+
+    # 所有方案中出现过的区域（按出现顺序）
+    region_names = {}
+    for scheme in schemes:
+        for region in scheme["regions"]:
+            region_names.setdefault(region["id"], region["name"])
+    region_names[TOTAL_ROW] = "总工资"
+
+    # 员工顺序以基准方案的结果为准，其余方案中多出的员工排在后面
+    employees = {}
+    totals = {}
+    for scheme in schemes:
+        per_emp = {}
+        for result in results[scheme["id"]]:
+            employees.setdefault(result["employee_id"], result["employee_name"])
+            per_emp.setdefault(result["employee_id"], _region_totals(result))
+        totals[scheme["id"]] = per_emp
+
+    rows = []
+    for emp_id, emp_name in employees.items():
+        for region_id, region_name in region_names.items():
+            values = {sid: totals[sid].get(emp_id, {}).get(region_id, 0) for sid in totals}
+            base = values[base_id]
+            deltas = {sid: round(v - base, 2) for sid, v in values.items()}
+            rows.append({
+                "employee_id": emp_id,
+                "employee_name": emp_name,
+                "region_id": region_id,
+                "region_name": region_name,
+                "values": values,
+                "deltas": deltas,
+                "changed": any(deltas.values()),
+            })
+    return rows
+
+
+def compare_schemes(period: str, scheme_ids: list, period_records: list = None,
+                    workers: int = 1) -> dict:
+    """
+    用多个方案计算同一期间并对比
+
+    Args:
+        period: 期间
+        scheme_ids: 方案ID列表，"current" 表示当前配置；第一个为对比基准
+        period_records: 该期间的绩效记录，不传时从 performance.json 读取
+        workers: 并行进程数，1 表示在当前进程中依次计算
+
+    返回:
+    {
+        "period": 期间,
+        "schemes": [{"id", "name", "employee_count", "total_salary", "delta"}],
+        "rows": build_delta_table 的差异表
+    }
+    """
+    if not scheme_ids:
+        raise ValueError("至少选择一个方案")
+    if period_records is None:
+        period_records = get_period_records(period)
+
+    # 非方案相关的数据只读一次，各方案只替换快照中的部分
+    shared = load_inputs(period)
+    schemes = []
+    jobs = []
+    for scheme_id in dict.fromkeys(scheme_ids):
+        if scheme_id == CURRENT:
+            name, inputs = "当前配置", shared
+        else:
+            inputs = apply_snapshot(shared, get_scheme_snapshot(scheme_id))
+            name = get_scheme_by_id(scheme_id)["name"]
+        schemes.append({"id": scheme_id, "name": name, "regions": inputs["regions"]})
+        jobs.append((period_records, period, inputs))
+
+    if workers > 1 and len(jobs) > 1:
+        # spawn：界面进程中有多个线程，不 fork
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=context) as pool:
+            outputs = list(pool.map(_calculate, jobs))
+    else:
+        outputs = [_calculate(job) for job in jobs]
+
+    results = {scheme["id"]: output for scheme, output in zip(schemes, outputs)}
+    rows = build_delta_table(schemes, results)
+
+    base_total = None
+    summary = []
+    for scheme in schemes:
+        total = round(sum(r["total_salary"] for r in results[scheme["id"]]), 2)
+        base_total = total if base_total is None else base_total
+        summary.append({
+            "id": scheme["id"],
+            "name": scheme["name"],
+            "employee_count": len(results[scheme["id"]]),
+            "total_salary": total,
+            "delta": round(total - base_total, 2),
+        })
+
+    print(f"[方案对比] {period}: {len(schemes)} 个方案，{len(period_records)} 人")
+    return {"period": period, "schemes": summary, "rows": rows}
+
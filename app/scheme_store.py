@@ -0,0 +1,168 @@
+"""
+方案快照存储 - 按内容寻址的共享实体 + 方案中只保存引用
+版本: 1.0.0
+
+原来每个方案的 snapshot 都完整复制一份技能、区域、技能指派，
+方案越多 schemes.json 越大，而工具栏每次渲染都要解析它。现在：
+
+    data/scheme_blobs.json   blobs:     实体哈希 → 实体内容（技能、区域、技能指派各一条一个）
+                             snapshots: 快照ID → {分区: [实体哈希, ...]}（按原顺序）
+    data/schemes.json        每个方案只保存 snapshot_id 和 snapshot_digests：{分区: 分区摘要}
+
+- 多个方案中相同的技能、区域、指派只存一份，内容相同的快照也只存一份
+- 比较分区摘要就能知道哪些分区不同，不需要读取实体
+- 方案删除或更新后，没有方案引用的快照和实体会被清理
+
+旧格式（方案中内嵌 snapshot）在首次读取 schemes.json 时自动迁移。
+"""
+__version__ = "1.0.0"
+
+import hashlib
+import json
+
+from app.data_manager import load_json, locked, save_json
+
+BLOBS_FILE = "scheme_blobs.json"
+SECTIONS = ("skills", "regions", "employee_skills")
+
+
+def entity_hash(entity) -> str:
+    """实体内容的哈希（键排序后的 JSON，内容相同则哈希相同）"""
+    content = json.dumps(entity, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.md5(content.encode("utf-8")).hexdigest()[:16]
+
+
+def section_refs(items: list) -> list:
+    """一个分区（如全部技能）的引用列表，顺序与原列表一致"""
+    return [entity_hash(item) for item in items]
+
+
+def refs_digest(hashes: list) -> str:
+    """一个分区的摘要（由按顺序的实体哈希得到，分区内容相同则摘要相同）"""
+    return hashlib.md5(",".join(hashes).encode("ascii")).hexdigest()[:16]
+
+
+def section_digest(items: list) -> str:
+    """直接由分区内容计算摘要（与 refs_digest(section_refs(items)) 相同）"""
+    return refs_digest(section_refs(items))
+
+
+def has_snapshot(scheme: dict) -> bool:
+    """方案是否保存了配置快照"""
+    return bool(scheme and scheme.get("snapshot_id"))
+
+
+def _load_blobs() -> dict:
+    data = load_json(BLOBS_FILE)
+    data.setdefault("version", 1)
+    data.setdefault("blobs", {})
+    data.setdefault("snapshots", {})
+    return data
+
+
+def _store_refs(data: dict, refs: dict) -> tuple:
+    """在已读出的存储中登记快照引用，返回 (快照ID, 分区摘要)"""
+    digests = {section: refs_digest(refs.get(section, [])) for section in SECTIONS}
+    snapshot_id = hashlib.md5(json.dumps(digests, sort_keys=True).encode("ascii")).hexdigest()[:16]
+    data["snapshots"].setdefault(snapshot_id, {section: refs.get(section, []) for section in SECTIONS})
+    return snapshot_id, digests
+
+
+def store_snapshot(snapshot: dict) -> dict:
+    """
+    保存快照，返回要写入方案的字段 {"snapshot_id": ..., "snapshot_digests": {...}}
+
+    已存在的实体和快照不重复保存；都已存在时不写文件
+    """
+    refs = {}
+    new_blobs = {}
+    for section in SECTIONS:
+        refs[section] = []
+        for item in snapshot.get(section, []):
+            h = entity_hash(item)
+            refs[section].append(h)
+            new_blobs.setdefault(h, item)
+
+    with locked(BLOBS_FILE):
+        data = _load_blobs()
+        added = {h: item for h, item in new_blobs.items() if h not in data["blobs"]}
+        data["blobs"].update(added)
+        snapshot_count = len(data["snapshots"])
+        snapshot_id, digests = _store_refs(data, refs)
+        if added or len(data["snapshots"]) != snapshot_count:
+            save_json(BLOBS_FILE, data, backup=False)
+        if added:
+            print(f"[方案] 新增快照实体 {len(added)} 个")
+    return {"snapshot_id": snapshot_id, "snapshot_digests": digests}
+
+
+def load_snapshot(snapshot_id: str, sections: tuple = SECTIONS) -> dict:
+    """由快照ID还原快照，只还原 sections 中的分区"""
+    data = _load_blobs()
+    refs = data["snapshots"].get(snapshot_id)
+    if refs is None:
+        raise KeyError(f"方案快照不存在: {snapshot_id}")
+
+    blobs = data["blobs"]
+    snapshot = {}
+    for section in sections:
+        hashes = refs.get(section, [])
+        missing = [h for h in hashes if h not in blobs]
+        if missing:
+            raise KeyError(f"方案快照实体缺失（{section}）: {missing[0]}")
+        snapshot[section] = [blobs[h] for h in hashes]
+    return snapshot
+
+
+def collect_garbage(schemes: list) -> int:
+    """删除没有任何方案引用的快照和实体，返回删除的实体数量"""
+    used_snapshots = {s["snapshot_id"] for s in schemes if has_snapshot(s)}
+
+    with locked(BLOBS_FILE):
+        data = _load_blobs()
+        unused_snapshots = [sid for sid in data["snapshots"] if sid not in used_snapshots]
+        for sid in unused_snapshots:
+            del data["snapshots"][sid]
+
+        used = set()
+        for refs in data["snapshots"].values():
+            for hashes in refs.values():
+                used.update(hashes)
+        unused = [h for h in data["blobs"] if h not in used]
+        for h in unused:
+            del data["blobs"][h]
+
+        if unused_snapshots or unused:
+            save_json(BLOBS_FILE, data, backup=False)
+        if unused:
+            print(f"[方案] 清理未引用的快照实体 {len(unused)} 个")
+    return len(unused)
+
+
+def needs_migration(schemes: list) -> bool:
+    """是否有旧格式（内嵌 snapshot 或内嵌引用列表）的方案"""
+    return any("snapshot" in s or "snapshot_refs" in s for s in schemes)
+
+
+def migrate_embedded_snapshots(schemes: list) -> int:
+    """
+    把旧格式方案改为快照ID + 分区摘要（直接修改 schemes 中的方案）
+
+    返回迁移的方案数，调用方负责保存 schemes.json
+    """
+    count = 0
+    for scheme in schemes:
+        if "snapshot" in scheme:
+            snapshot = scheme.pop("snapshot")
+            if snapshot:
+                scheme.update(store_snapshot(snapshot))
+            count += 1
+        elif "snapshot_refs" in scheme:
+            refs = scheme.pop("snapshot_refs")
+            with locked(BLOBS_FILE):
+                data = _load_blobs()
+                snapshot_id, digests = _store_refs(data, refs)
+                save_json(BLOBS_FILE, data, backup=False)
+            scheme.update({"snapshot_id": snapshot_id, "snapshot_digests": digests})
+            count += 1
+    return count
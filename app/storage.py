@@ -0,0 +1,464 @@
+"""
+存储后端 - data_manager 读写数据的底层实现
+版本: 1.0.0
+
+两种后端，对 data_manager 提供相同的接口：
+- JsonStorage：原来的方式，每个数据文件一个 JSON 文件（默认）
+- SqliteStorage：所有数据存在 data/gongzhi.db 里（WAL 模式），
+  员工、技能、员工技能、绩效记录、绩效明细、计算历史各有带索引的表，
+  单条记录的修改只更新那一行，不再整文件重写
+
+两种后端的 stamp() 都是数据文件的"版本"，每次写入都会变化：
+JSON 为 (inode, 修改时间, 大小)，SQLite 为 revisions 表中的写入计数。
+data_manager 用它判断缓存是否过期，以及读-改-写期间是否被其他会话改动。
+
+选择后端：环境变量 GONGZHI_STORAGE=sqlite，或 data/config.json 中
+"storage_backend": "sqlite"。切换前先运行一次导入：
+
+    python -m app.storage import
+"""
+__version__ = "1.0.0"
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+from app.repository import COLLECTIONS, record_key
+
+DB_NAME = "gongzhi.db"
+HISTORY_PREFIX = "history/"
+HISTORY_MANIFEST = "history/manifest.json"
+
+# 数据文件中需要拆成数据表的列表：文件名 → [(列表字段名, 表名, 索引列)]
+TABLES = {
+    "employees.json": [("employees", "employees", ("id", "name"))],
+    "skills.json": [("skills", "skills", ("id", "region_id", "mode_id"))],
+    "employee_skills.json": [("employee_skills", "employee_skills", ("employee_id", "skill_id"))],
+    "performance.json": [("records", "performance_records", ("period", "employee_id"))],
+}
+
+# 各表需要建立的索引（除 pos 主键外）
+TABLE_INDEXES = {
+    "employees": [("id",), ("name",)],
+    "skills": [("id",), ("region_id",), ("mode_id",)],
+    "employee_skills": [("employee_id", "skill_id")],
+    "performance_records": [("period",), ("employee_id",)],
+}
+
+
+def _dumps(data) -> str:
+    return json.dumps(data, ensure_ascii=False)
+
+
+class ConcurrentModificationError(RuntimeError):
+    """读-改-写期间数据文件已被其他会话或进程修改"""
+
+
+def _fsync_dir(directory: Path):
+    """把目录项（重命名）刷到磁盘；Windows 不支持打开目录，跳过"""
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_atomic(file_path: Path, content: bytes):
+    """
+    原子写入：先写同目录下的临时文件并 fsync，再重命名替换原文件
+
+    写到一半崩溃时原文件保持完整，读取方也不会读到写了一半的内容
+    """
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{file_path.name}.", suffix=".tmp",
+                                    dir=file_path.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp 创建的文件只有本人可读写，沿用原文件的权限
+        try:
+            os.chmod(tmp_path, file_path.stat().st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    _fsync_dir(file_path.parent)
+
+
+class JsonStorage:
+    """JSON 文件后端：每个数据文件对应 data 目录下的一个 .json 文件"""
+
+    name = "json"
+    supports_rows = False  # 没有行级写入，由 data_manager 读-改-写整个文件
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+
+    def path_of(self, filename: str) -> Path:
+        """数据文件在磁盘上的路径"""
+        return self.data_dir / filename
+
+    def exists(self, filename: str) -> bool:
+        return self.path_of(filename).exists()
+
+    def stamp(self, filename: str):
+        """文件戳 (inode, 修改时间, 大小)，用于发现缓存之外的改动；文件不存在返回 None"""
+        try:
+            st = self.path_of(filename).stat()
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def read(self, filename: str):
+        """读取数据，文件不存在返回 None（JSON 格式错误时抛出 JSONDecodeError）"""
+        file_path = self.path_of(filename)
+        if not file_path.exists():
+            return None
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def write(self, filename: str, data: dict):
+        """原子写入（见 write_atomic）：写到一半崩溃时原文件保持完整"""
+        content = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+        write_atomic(self.path_of(filename), content)
+
+    def delete(self, filename: str):
+        file_path = self.path_of(filename)
+        if file_path.exists():
+            file_path.unlink()
+
+
+class SqliteStorage:
+    """
+    SQLite 后端
+
+    - 拆表的列表（见 TABLES）每条记录一行：pos 保持原来的列表顺序，
+      索引列单独存放便于查询，完整记录以 JSON 存在 data 列
+    - 计算历史分片（history/ 下除清单外的文件）存在 history 表
+    - 其余文件（角色、区域、方案等小文件，以及拆表文件中列表以外的字段
+      如 next_id）整份存在 documents 表
+    """
+
+    name = "sqlite"
+    supports_rows = True
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._init_schema()
+
+    # ---------- 连接与建表 ----------
+
+    def _conn(self) -> sqlite3.Connection:
+        """每个线程一个连接（Streamlit 的会话运行在不同线程中）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS documents (filename TEXT PRIMARY KEY, data TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS history ("
+                         "filename TEXT PRIMARY KEY, period TEXT, data TEXT NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_period ON history(period)")
+            conn.execute("CREATE TABLE IF NOT EXISTS revisions (filename TEXT PRIMARY KEY, rev INTEGER NOT NULL)")
+            for specs in TABLES.values():
+                for _, table, columns in specs:
+                    cols = ", ".join(f"{c} TEXT" for c in columns)
+                    conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ("
+                                 f"pos INTEGER PRIMARY KEY, {cols}, data TEXT NOT NULL)")
+            for table, indexes in TABLE_INDEXES.items():
+                for columns in indexes:
+                    name = f"idx_{table}_{'_'.join(columns)}"
+                    conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(columns)})")
+            self._fold_legacy_details(conn)
+
+    def _fold_legacy_details(self, conn):
+        """
+        旧版本把 performance.json 的 raw_details 拆到 raw_details 表，现在明细由 app.detail_store 存储；
+        表中还有明细时放回 performance.json 的文档（由 migrate_json_raw_details 迁移出去），然后删除该表
+        """
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'raw_details'").fetchone() is None:
+            return
+        rows = conn.execute("SELECT data FROM raw_details ORDER BY pos").fetchall()
+        if rows:
+            doc = self._read_document(conn, "performance.json") or {}
+            doc["raw_details"] = [json.loads(r[0]) for r in rows]
+            self._write_document(conn, "performance.json", doc)
+            self._bump(conn, "performance.json")
+            print(f"[存储] 旧版 raw_details 表中的 {len(rows)} 条明细已放回 performance.json，等待迁移")
+        conn.execute("DROP TABLE raw_details")
+
+    # ---------- 文档级读写 ----------
+
+    def path_of(self, filename: str):
+        return None  # 数据不在独立文件中
+
+    def stamp(self, filename: str):
+        """写入计数（每次写入该文件加一），其他进程的写入也能发现；从未写入过返回 None"""
+        row = self._conn().execute("SELECT rev FROM revisions WHERE filename = ?", (filename,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _bump(conn, filename: str):
+        """在写入的同一事务内增加文件的写入计数"""
+        conn.execute("INSERT INTO revisions (filename, rev) VALUES (?, 1) "
+                     "ON CONFLICT(filename) DO UPDATE SET rev = rev + 1", (filename,))
+
+    @staticmethod
+    def _is_history_shard(filename: str) -> bool:
+        return filename.startswith(HISTORY_PREFIX) and filename != HISTORY_MANIFEST
+
+    def _read_document(self, conn, filename: str):
+        row = conn.execute("SELECT data FROM documents WHERE filename = ?", (filename,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _write_document(self, conn, filename: str, data: dict):
+        conn.execute("INSERT INTO documents (filename, data) VALUES (?, ?) "
+                     "ON CONFLICT(filename) DO UPDATE SET data = excluded.data",
+                     (filename, _dumps(data)))
+
+    def exists(self, filename: str) -> bool:
+        conn = self._conn()
+        if self._is_history_shard(filename):
+            return conn.execute("SELECT 1 FROM history WHERE filename = ?", (filename,)).fetchone() is not None
+        return conn.execute("SELECT 1 FROM documents WHERE filename = ?", (filename,)).fetchone() is not None
+
+    def read(self, filename: str):
+        """读取数据（拆表的文件从各表重新组装成原来的结构），不存在返回 None"""
+        conn = self._conn()
+        if self._is_history_shard(filename):
+            row = conn.execute("SELECT data FROM history WHERE filename = ?", (filename,)).fetchone()
+            return json.loads(row[0]) if row else None
+
+        data = self._read_document(conn, filename)
+        if filename not in TABLES or data is None:
+            return data
+
+        for list_key, table, _ in TABLES[filename]:
+            rows = conn.execute(f"SELECT data FROM {table} ORDER BY pos").fetchall()
+            data[list_key] = [json.loads(r[0]) for r in rows]
+        return data
+
+    def write(self, filename: str, data: dict):
+        """整份写入（拆表的文件在一个事务内替换全部行）"""
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                self._bump(conn, filename)
+                if self._is_history_shard(filename):
+                    period = data.get("month") or data.get("period")
+                    conn.execute("INSERT INTO history (filename, period, data) VALUES (?, ?, ?) "
+                                 "ON CONFLICT(filename) DO UPDATE SET period = excluded.period, data = excluded.data",
+                                 (filename, period, _dumps(data)))
+                    return
+
+                if filename not in TABLES:
+                    self._write_document(conn, filename, data)
+                    return
+
+                rest = dict(data)
+                for list_key, table, columns in TABLES[filename]:
+                    items = rest.pop(list_key, [])
+                    conn.execute(f"DELETE FROM {table}")
+                    self._insert_rows(conn, table, columns, items, start=0)
+                self._write_document(conn, filename, rest)
+
+    def delete(self, filename: str):
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                self._bump(conn, filename)
+                if self._is_history_shard(filename):
+                    conn.execute("DELETE FROM history WHERE filename = ?", (filename,))
+                    return
+                for _, table, _ in TABLES.get(filename, []):
+                    conn.execute(f"DELETE FROM {table}")
+                conn.execute("DELETE FROM documents WHERE filename = ?", (filename,))
+
+    # ---------- 行级读写 ----------
+
+    @staticmethod
+    def _insert_rows(conn, table: str, columns: tuple, items: list, start: int):
+        placeholders = ", ".join("?" for _ in range(len(columns) + 2))
+        conn.executemany(
+            f"INSERT INTO {table} (pos, {', '.join(columns)}, data) VALUES ({placeholders})",
+            ((start + i, *[item.get(c) for c in columns], _dumps(item)) for i, item in enumerate(items))
+        )
+
+    @staticmethod
+    def _row_table(filename: str):
+        """文件对应的行级表 (表名, 索引列, 主键列)；不是拆表文件时返回 None"""
+        if filename not in TABLES or filename not in COLLECTIONS:
+            return None
+        list_key, key_fields = COLLECTIONS[filename]
+        for lk, table, columns in TABLES[filename]:
+            if lk == list_key:
+                return table, columns, key_fields
+        return None
+
+    def _find_row(self, conn, table: str, key_fields: tuple, key):
+        values = (key,) if len(key_fields) == 1 else tuple(key)
+        where = " AND ".join(f"{f} = ?" for f in key_fields)
+        return conn.execute(f"SELECT pos, data FROM {table} WHERE {where} ORDER BY pos LIMIT 1",
+                            values).fetchone()
+
+    def _ensure_document(self, conn, filename: str):
+        if self._read_document(conn, filename) is None:
+            self._write_document(conn, filename, {})
+
+    def update_row(self, filename: str, key, updates: dict):
+        """更新一条记录，返回更新后的记录；找不到返回 None"""
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                spec = self._row_table(filename)
+                if spec is None:
+                    return self._update_in_document(conn, filename, key, updates)
+
+                table, columns, key_fields = spec
+                row = self._find_row(conn, table, key_fields, key)
+                if row is None:
+                    return None
+                record = json.loads(row[1])
+                record.update(updates)
+                self._bump(conn, filename)
+                assignments = ", ".join(f"{c} = ?" for c in columns)
+                conn.execute(f"UPDATE {table} SET {assignments}, data = ? WHERE pos = ?",
+                             (*[record.get(c) for c in columns], _dumps(record), row[0]))
+                return record
+
+    def insert_rows(self, filename: str, records: list, meta: dict = None):
+        """追加记录，meta 为需要同时更新的文件级字段（如 next_id）"""
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                self._bump(conn, filename)
+                spec = self._row_table(filename)
+                if spec is None:
+                    data = self._read_document(conn, filename) or {}
+                    list_key = COLLECTIONS[filename][0]
+                    data.setdefault(list_key, []).extend(records)
+                    data.update(meta or {})
+                    self._write_document(conn, filename, data)
+                    return
+
+                table, columns, _ = spec
+                start = conn.execute(f"SELECT COALESCE(MAX(pos), -1) + 1 FROM {table}").fetchone()[0]
+                self._insert_rows(conn, table, columns, records, start=start)
+                doc = self._read_document(conn, filename) or {}
+                doc.update(meta or {})
+                self._write_document(conn, filename, doc)
+
+    def delete_row(self, filename: str, key):
+        """删除一条记录，返回被删除的记录；找不到返回 None"""
+        with self._write_lock:
+            conn = self._conn()
+            with conn:
+                spec = self._row_table(filename)
+                if spec is None:
+                    return self._update_in_document(conn, filename, key, None)
+
+                table, _, key_fields = spec
+                row = self._find_row(conn, table, key_fields, key)
+                if row is None:
+                    return None
+                conn.execute(f"DELETE FROM {table} WHERE pos = ?", (row[0],))
+                self._bump(conn, filename)
+                return json.loads(row[1])
+
+    def _update_in_document(self, conn, filename: str, key, updates):
+        """整份存储的小文件：在事务内读-改-写（updates 为 None 表示删除）"""
+        data = self._read_document(conn, filename)
+        if not data:
+            return None
+        list_key, key_fields = COLLECTIONS[filename]
+        items = data.get(list_key, [])
+        for i, record in enumerate(items):
+            if record_key(record, key_fields) == key:
+                if updates is None:
+                    items.pop(i)
+                else:
+                    record.update(updates)
+                self._write_document(conn, filename, data)
+                self._bump(conn, filename)
+                return record
+        return None
+
+
+def create_storage(data_dir: Path):
+    """
+    按配置创建存储后端
+
+    优先读取环境变量 GONGZHI_STORAGE，其次 data/config.json 的 storage_backend
+    """
+    data_dir = Path(data_dir)
+    backend = os.environ.get("GONGZHI_STORAGE")
+    if not backend:
+        try:
+            with open(data_dir / "config.json", 'r', encoding='utf-8') as f:
+                backend = json.load(f).get("storage_backend")
+        except Exception:
+            backend = None
+
+    if backend == "sqlite":
+        print(f"[存储] 使用 SQLite 后端: {data_dir / DB_NAME}")
+        return SqliteStorage(data_dir / DB_NAME)
+    return JsonStorage(data_dir)
+
+
+def import_json_to_sqlite(data_dir: Path, db_path: Path = None) -> dict:
+    """
+    一次性把 data 目录下的所有 JSON 文件导入 SQLite
+
+    返回 {文件名: 记录数}；重复运行会用 JSON 文件的内容覆盖数据库中的同名数据
+    """
+    data_dir = Path(data_dir)
+    source = JsonStorage(data_dir)
+    target = SqliteStorage(db_path or data_dir / DB_NAME)
+
+    imported = {}
+    for path in sorted(data_dir.rglob("*.json")):
+        filename = path.relative_to(data_dir).as_posix()
+        try:
+            data = source.read(filename)
+        except json.JSONDecodeError as e:
+            print(f"[错误] JSON格式错误，已跳过: {filename} - {e}")
+            continue
+        if data is None:
+            continue
+
+        target.write(filename, data)
+        count = sum(len(data.get(list_key, [])) for list_key, _, _ in TABLES.get(filename, []))
+        imported[filename] = count
+        print(f"[导入] {filename}" + (f"（{count} 条记录）" if count else ""))
+
+    print(f"[导入] 完成，共导入 {len(imported)} 个文件到 {target.db_path}")
+    return imported
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "import":
+        default_dir = Path(__file__).parent.parent / "data"
+        import_json_to_sqlite(Path(sys.argv[2]) if len(sys.argv) >= 3 else default_dir)
+    else:
+        print("用法: python -m app.storage import [数据目录]")
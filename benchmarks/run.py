@@ -0,0 +1,214 @@
+"""
+性能基准测试 - 计算、导入、存储的关键路径
+版本: 1.0.0
+
+在临时数据目录中用合成数据（固定随机种子）按不同员工规模计时，
+不需要启动 Streamlit，也不会改动 data 目录中的真实数据。
+
+用法:
+    python -m benchmarks.run                          # 默认 100 / 1000 / 10000 人
+    python -m benchmarks.run --scales 100,1000,10000,100000
+    python -m benchmarks.run --output bench.json      # 结果写入 JSON
+    python -m benchmarks.run --check                  # 超过 thresholds.json 的上限时返回 1
+    python -m benchmarks.run --baseline old.json      # 与上次结果比较，变慢超过 --tolerance 倍时返回 1
+"""
+__version__ = "1.0.0"
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.synthetic import make_dataset, make_erp_frame
+
+DEFAULT_SCALES = [100, 1000, 10000]
+THRESHOLDS_FILE = Path(__file__).parent / "thresholds.json"
+
+
+def _use_data_dir(data_dir: Path):
+    """把 data_manager 指向临时目录，并丢弃已有的存储后端和缓存"""
+    from app import data_manager
+
+    data_manager.DATA_DIR = data_dir / "data"
+    data_manager.BACKUP_DIR = data_dir / "backup"
+    data_manager._storage = None
+    data_manager.ensure_dirs()
+    data_manager.clear_cache()
+
+
+def _write_dataset(dataset: dict):
+    from app.data_manager import get_schemes, save_json
+
+    for filename, content in dataset.items():
+        if filename.endswith(".json"):
+            save_json(filename, content, backup=False)
+    # 合成数据中的方案是内嵌快照的旧格式，先迁移，避免计入计时
+    get_schemes()
+
+
+def _time(fn, setup=None, repeat: int = 3) -> list:
+    """执行 repeat 次，返回每次的耗时（秒）；setup 的耗时不计入"""
+    timings = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        # 屏蔽被测函数的日志输出
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn(arg)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_scale(scale: int, repeat: int, only: set = None, seed: int = 42) -> list:
+    """在一个员工规模下运行全部基准，返回结果列表"""
+    from app.data_manager import is_config_modified, load_scheme_to_current
+    from app.engine import calculate_batch
+    from app.calculation import calculate_ranking_bonus, do_calculate, save_results
+    from app.pages.import_page import do_import, summarize_performance
+
+    tmp = Path(tempfile.mkdtemp(prefix="gongzhi_bench_"))
+    try:
+        _use_data_dir(tmp)
+        dataset = make_dataset(scale, seed=seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            _write_dataset(dataset)
+
+        period = dataset["period"]
+        records = dataset["period_records"]
+        employees = dataset["employees.json"]["employees"]
+        erp_df = make_erp_frame(scale, seed=seed)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            base_results = calculate_batch(
+                records, dataset["regions.json"]["regions"], dataset["skills.json"]["skills"],
+                dataset["employee_skills.json"]["employee_skills"], employees,
+                dataset["roles.json"]["roles"]
+            )
+            results = do_calculate(records, period)
+            summary, _ = summarize_performance(erp_df, "2025-11")
+
+        benches = [
+            ("do_calculate", lambda _: do_calculate(records, period), None),
+            ("calculate_ranking_bonus", lambda r: calculate_ranking_bonus(r, employees),
+             lambda: copy.deepcopy(base_results)),
+            ("summarize_performance", lambda _: summarize_performance(erp_df, "2025-11"), None),
+            ("do_import", lambda s: do_import(s, "2025-11"), lambda: copy.deepcopy(summary)),
+            ("save_results", lambda _: save_results(results, period), None),
+            ("load_scheme_to_current", lambda _: load_scheme_to_current("scheme_001"), None),
+            ("is_config_modified", lambda _: is_config_modified(), None),
+        ]
+
+        out = []
+        for name, fn, setup in benches:
+            if only and name not in only:
+                continue
+            timings = _time(fn, setup, repeat)
+            item = {
+                "name": name,
+                "scale": scale,
+                "runs": len(timings),
+                "min": min(timings),
+                "median": statistics.median(timings),
+                "max": max(timings),
+            }
+            out.append(item)
+            print(f"[基准] {name:<24} {scale:>7} 人  最快 {item['min'] * 1000:10.1f} ms  "
+                  f"中位 {item['median'] * 1000:10.1f} ms")
+        return out
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def check_thresholds(results: list, thresholds: dict) -> list:
+    """与 thresholds.json 中的上限（秒，按最快一次比较）比较，返回超限项"""
+    failures = []
+    for item in results:
+        limit = thresholds.get(item["name"], {}).get(str(item["scale"]))
+        if limit is not None and item["min"] > limit:
+            failures.append({**item, "limit": limit,
+                             "reason": f"超过上限 {limit}s"})
+    return failures
+
+
+def check_baseline(results: list, baseline: dict, tolerance: float) -> list:
+    """与上次的结果比较，最快一次慢于基线 tolerance 倍时视为退化"""
+    base = {(b["name"], b["scale"]): b for b in baseline.get("results", [])}
+    failures = []
+    for item in results:
+        old = base.get((item["name"], item["scale"]))
+        if old and item["min"] > old["min"] * tolerance:
+            failures.append({**item, "baseline": old["min"],
+                             "reason": f"比基线慢 {item['min'] / old['min']:.2f} 倍"})
+    return failures
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="绩效系统性能基准测试")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="员工规模，逗号分隔（默认 100,1000,10000）")
+    parser.add_argument("--repeat", type=int, default=3, help="每项重复次数")
+    parser.add_argument("--only", default="", help="只运行指定的基准，逗号分隔")
+    parser.add_argument("--seed", type=int, default=42, help="合成数据的随机种子")
+    parser.add_argument("--output", help="结果写入的 JSON 文件")
+    parser.add_argument("--check", action="store_true", help="按 thresholds.json 检查性能上限")
+    parser.add_argument("--thresholds", default=str(THRESHOLDS_FILE), help="性能上限配置文件")
+    parser.add_argument("--baseline", help="作为基线比较的上次结果 JSON")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="相对基线允许变慢的倍数")
+    args = parser.parse_args(argv)
+
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    only = {s.strip() for s in args.only.split(",") if s.strip()}
+
+    results = []
+    for scale in scales:
+        # 大规模数据只跑一次，避免耗时过长
+        repeat = args.repeat if scale <= 10000 else 1
+        results.extend(run_scale(scale, repeat, only, args.seed))
+
+    failures = []
+    if args.check:
+        with open(args.thresholds, 'r', encoding='utf-8') as f:
+            failures += check_thresholds(results, json.load(f))
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            failures += check_baseline(results, json.load(f), args.tolerance)
+
+    import numpy
+    import pandas
+    report = {
+        "meta": {
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": numpy.__version__,
+            "pandas": pandas.__version__,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": results,
+        "failures": failures,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[基准] 结果已写入: {args.output}")
+
+    for fail in failures:
+        print(f"[退化] {fail['name']} {fail['scale']} 人: {fail['reason']}（本次 {fail['min']:.3f}s）")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
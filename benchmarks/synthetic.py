@@ -0,0 +1,160 @@
+"""
+基准测试用的合成数据生成器
+版本: 1.0.0
+
+按员工规模生成一整套可复现（固定随机种子）的数据：
+角色、区域（含阶梯规则）、技能、员工、技能指派、奖金池、方案、
+某期间的绩效记录，以及对应的 ERP 绩效明细表。
+"""
+__version__ = "1.0.0"
+
+import random
+from datetime import datetime
+
+PROCESSES = ['印前处理', '印中制作', '印后加工']
+BUSINESS_TYPES = ['蓝图', '工程图纸', '数码快印', '写真喷绘', '装订']
+
+
+def make_dataset(employees: int, skills: int = None, regions: int = 4, ladder_tiers: int = 6,
+                 bonus_pools: int = 3, skills_per_employee: int = 8, seed: int = 42) -> dict:
+    """
+    生成一套完整的配置和绩效数据
+
+    返回 {文件名: 文件内容, ...}，另含 "period" 和 "period_records"
+    """
+    rnd = random.Random(seed)
+    skills = skills or max(20, min(400, employees // 25))
+    now = datetime(2025, 12, 31).strftime("%Y-%m-%d %H:%M:%S")
+
+    roles = [{
+        "id": f"role_{i + 1:03d}",
+        "name": f"角色{i + 1}",
+        "threshold_multiplier": rnd.choice([0.4, 0.8, 1.0, 1.2]),
+        "income_types": rnd.sample(["skill_salary", "ladder_bonus", "order_bonus",
+                                    "management_allowance", "revenue_commission"], rnd.randint(2, 4)),
+        "settings": {"order_bonus_per_unit": 2, "management_allowance": rnd.choice([0, 500]),
+                     "commission_rate": 0.01},
+    } for i in range(5)]
+
+    region_list = []
+    for r in range(regions):
+        rules = []
+        low = 0
+        for _ in range(ladder_tiers):
+            high = low + rnd.choice([10000, 20000, 50000])
+            rules.append({"min": low, "max": high, "bonus": rnd.choice([100, 200, 300])})
+            low = high
+        region_list.append({
+            "id": f"region_{r + 1:03d}",
+            "name": f"区域{r + 1}",
+            "threshold": rnd.choice([20000, 30000, 50000]),
+            "ladder_rules": rules,
+        })
+
+    skill_list = [{
+        "id": f"skill_{k + 1:03d}",
+        "name": f"技能{k + 1}",
+        "mode_id": "mode_002",
+        "region_id": region_list[k % regions]["id"],
+        "salary_on_duty": rnd.choice([100, 200, 300]),
+        "salary_off_duty": rnd.choice([50, 100]),
+    } for k in range(skills)]
+
+    employee_list = []
+    for e in range(employees):
+        emp = {
+            "id": f"emp_{e + 1:04d}",
+            "name": f"员工{e + 1}",
+            "employee_no": f"E{e + 1:04d}",
+            "mode_id": "mode_002",
+            "role_id": rnd.choice(roles)["id"],
+            "created_at": now,
+        }
+        employee_list.append(emp)
+
+    emp_skills = []
+    for emp in employee_list:
+        for k in rnd.sample(range(skills), min(skills, skills_per_employee)):
+            emp_skills.append({
+                "employee_id": emp["id"],
+                "skill_id": skill_list[k]["id"],
+                "passed_exam": rnd.random() < 0.8,
+                "use_system_threshold": True,
+                "custom_threshold": None,
+                "use_system_price": True,
+                "custom_price_on_duty": None,
+                "created_at": now,
+            })
+
+    pools = [{
+        "id": f"pool_{i + 1:03d}",
+        "name": f"奖金池{i + 1}",
+        "enabled": True,
+        "ranking_basis": ["total_score", "total_salary", region_list[0]["id"]][i % 3],
+        "filter_roles": [] if i % 2 == 0 else [roles[0]["id"], roles[1]["id"]],
+        "distribution_rules": [{"rank": k, "amount": 1000 - k * 100} for k in range(1, 6)],
+    } for i in range(bonus_pools)]
+
+    period = "2025-12"
+    records = [{
+        "employee_id": emp["id"],
+        "employee_name": emp["name"],
+        "period": period,
+        "scores": {region["id"]: round(rnd.uniform(0, 150000), 2) for region in region_list},
+        "mid_detail": {"drawing": 0, "digital": 0},
+        "imported_at": now,
+    } for emp in employee_list]
+
+    external = [{
+        "employee_id": emp["id"],
+        "month": period,
+        "order_count": rnd.randint(0, 200),
+        "store_revenue": round(rnd.uniform(0, 500000), 2),
+    } for emp in employee_list if rnd.random() < 0.3]
+
+    snapshot = {"skills": skill_list, "regions": region_list, "employee_skills": emp_skills}
+    schemes = [{
+        "id": "scheme_001",
+        "name": "基准方案",
+        "is_active": True,
+        "created_at": now,
+        "updated_at": now,
+        "description": "",
+        "snapshot": snapshot,
+    }]
+
+    return {
+        "roles.json": {"roles": roles, "next_id": len(roles) + 1},
+        "regions.json": {"regions": region_list},
+        "skills.json": {"skills": skill_list, "next_id": skills + 1},
+        "employees.json": {"employees": employee_list, "next_id": employees + 1},
+        "employee_skills.json": {"employee_skills": emp_skills},
+        "bonus_pools.json": {"pools": pools, "next_id": bonus_pools + 1},
+        "schemes.json": {"schemes": schemes, "next_id": 2},
+        "performance.json": {"records": records, "imports": []},
+        "external_data.json": {"records": external},
+        "modes.json": {"modes": [{"id": "mode_002", "name": "中央工厂"}]},
+        "period": period,
+        "period_records": records,
+    }
+
+
+def make_erp_frame(employees: int, lines_per_employee: int = 10, seed: int = 42):
+    """生成 ERP 绩效明细表（与导入页面要求的列一致）"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    n = employees * lines_per_employee
+    emp_index = rng.integers(1, employees + 1, n)
+    return pd.DataFrame({
+        '订单编号': [f"D{i:08d}" for i in range(n)],
+        '客户名称': '客户',
+        '姓名': [f"员工{i}" for i in emp_index],
+        '工序': rng.choice(PROCESSES, n),
+        '业务类别': rng.choice(BUSINESS_TYPES, n),
+        '制作项': '制作',
+        '数量': rng.integers(1, 100, n).astype(float),
+        '绩效分': rng.uniform(0, 3000, n).round(2),
+        '登记时间': '2025-12-15 10:00:00',
+    })
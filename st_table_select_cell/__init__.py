@@ -44,7 +44,7 @@ else:
 # `declare_component` and call it done. The wrapper allows us to customize
 # our component's API: we can pre-process its input args, post-process its
 # output value, and add a docstring for users.
-def st_table_select_cell(data):
+def st_table_select_cell(data, key=None):
     """Create a new instance of "table_select_cell".
 
     Parameters
@@ -74,7 +74,7 @@ def st_table_select_cell(data):
     #
     # "default" is a special argument that specifies the initial return
     # value of the component before the user has interacted with it., selectColIndex=-1, selectRowIndex=-1
-    component_value = _component_func(data=data, title=None, default=False)
+    component_value = _component_func(data=data, title=None, default=False, key=key)
 
     # We could modify the value returned from the component if we wanted.
     # There's no need to do this in our simple example - but it's an option.